@@ -0,0 +1,54 @@
+'''
+Benchmarks compiling many outlines: one process against
+compiler.compile_outlines with one worker per core.
+
+Usage (from the repository root): python benchmarks/compile.py
+'''
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import compiler
+
+SIZES = [50, 500]
+COURSES = 40
+REPEAT = 3
+
+def make_outline(num_courses: int, prefix: str) -> str:
+    '''Generates an outline of num_courses courses, like a whole program.'''
+    lines = []
+    for c in range(num_courses):
+        lines += [
+            "Course:", f"{prefix} {c}", "",
+            "Assessments:",
+            "10 drop 2 Assignment 20%", "12 drop 3 Quiz 10%",
+            "2 Midterm 30%", "1 Final 40%", "",
+            "Scale:", "A 80%", "B 70%", "C 60%", "D 50%", ""
+        ]
+    return "\n".join(lines)
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        # outlines are read from outlines/
+        os.chdir(directory)
+        os.mkdir("outlines")
+        print(f"{os.cpu_count()} cores, {COURSES} courses per outline")
+        print(f"{'outlines':>8} {'serial':>10} {'parallel':>10}")
+        for size in SIZES:
+            filenames = []
+            for i in range(size):
+                filename = f"{size}-{i}.txt"
+                with open(os.path.join("outlines", filename), "w") as f:
+                    f.write(make_outline(COURSES, f"Program {i}"))
+                filenames.append(filename)
+
+            serial = min(timeit.repeat(lambda: compiler.compile_outlines(filenames, workers=1), number=1, repeat=REPEAT))
+            parallel = min(timeit.repeat(lambda: compiler.compile_outlines(filenames), number=1, repeat=REPEAT))
+
+            print(f"{size:>8} {serial * 1000:>8.1f}ms {parallel * 1000:>8.1f}ms")
+
+if __name__ == "__main__":
+    main()
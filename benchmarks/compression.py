@@ -0,0 +1,48 @@
+'''
+Benchmarks archiving data files: the size of each format supported by
+file_management (see CODECS), and the time to serialize and compress
+data, and to decompress and parse it.
+
+Usage (from the repository root): python benchmarks/compression.py
+'''
+import os
+import sys
+import json
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.load import make_data
+from utils import file_management as files
+
+SIZES = [200, 2000]
+REPEAT = 3
+
+def main():
+    print(f"{'courses':>8} {'format':>9} {'size':>10} {'ratio':>7} {'write':>9} {'read':>9}")
+    for size in SIZES:
+        data = make_data(size)
+        _raw, plain = files.serialize(data)
+
+        for ext in files.DATA_EXTENSIONS:
+            _raw, content = files.serialize(data, ext)
+            codec = files.CODECS.get(ext)
+
+            def read():
+                raw = content if codec is None else codec.decompress(content)
+                return json.loads(raw)
+
+            assert read() == data
+
+            write = min(timeit.repeat(lambda: files.serialize(data, ext), number=1, repeat=REPEAT))
+            load = min(timeit.repeat(read, number=1, repeat=REPEAT))
+
+            kb = len(content) / 1024
+            ratio = len(plain) / len(content)
+            print(
+                f"{size:>8} {ext:>9} {kb:>8.0f}KB {ratio:>6.1f}x"
+                f" {write * 1000:>7.1f}ms {load * 1000:>7.1f}ms"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+'''
+Benchmarks loading a data file: the previous pipeline (parse twice,
+then jsonschema.validate) against file_management.load_data.
+
+Usage (from the repository root): python benchmarks/load.py
+'''
+import os
+import sys
+import json
+import random
+import tempfile
+import timeit
+
+import jsonschema
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import file_management as files
+from utils import manifest
+from utils import snapshot
+from utils.validation import DATA_SCHEMA
+
+SIZES = [10, 200, 2000]
+REPEAT = 5
+
+def make_data(num_courses: int, seed = 0) -> dict:
+    '''Generates num_courses courses, like several semesters of outlines.'''
+    rng = random.Random(seed)
+    data = {}
+    for c in range(num_courses):
+        assessments = {}
+        for name, weight, amount, dropped in [
+            ("Assignment", 20, 10, 2), ("Quiz", 10, 12, 3),
+            ("Midterm", 30, 2, 0), ("Final", 40, 1, 0)
+        ]:
+            assessments[name] = {
+                "weight": weight,
+                "amount": amount,
+                "dropped": dropped,
+                "grades": [
+                    None if rng.random() < 0.3 else round(rng.uniform(40, 100), 1)
+                    for _ in range(amount)
+                ]
+            }
+        data[f"Course {c}"] = {
+            "assessments": assessments,
+            "scale": {"A": 80, "B": 70, "C": 60, "D": 50}
+        }
+    return data
+
+def previous_load(filepath) -> dict:
+    with open(filepath, 'r') as f:
+        json.load(f)
+    with open(filepath, 'r') as f:
+        data = json.load(f)
+    jsonschema.validate(data, DATA_SCHEMA)
+    return data
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        # load_data keeps its snapshots in data/.cache
+        os.chdir(directory)
+        os.mkdir("data")
+        print(f"{'courses':>8} {'size':>10} {'previous':>10} {'load_data':>10} {'speedup':>8}")
+        for size in SIZES:
+            filepath = os.path.join("data", f"bench{size}.json")
+            with open(filepath, 'w') as f:
+                json.dump(make_data(size), f, indent=4)
+
+            assert files.load_data(filepath) == previous_load(filepath)
+
+            # without a snapshot, or a manifest entry that would let
+            # load_data skip validation (see benchmarks/startup.py)
+            def cold():
+                snapshot.remove(f"bench{size}")
+                manifest.remove(f"bench{size}")
+
+            before = min(timeit.repeat(lambda: previous_load(filepath), number=1, repeat=REPEAT))
+            after = min(timeit.repeat(lambda: files.load_data(filepath), setup=cold, number=1, repeat=REPEAT))
+
+            kb = os.path.getsize(filepath) / 1024
+            print(f"{size:>8} {kb:>8.0f}KB {before * 1000:>8.1f}ms {after * 1000:>8.1f}ms {before / after:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+'''
+Benchmarks loading a data file at startup with file_management.load_data:
+without a snapshot or manifest entry (cold), without a snapshot but with
+a manifest entry that lets it skip validation (trusted), and from its
+snapshot (warm).
+
+Usage (from the repository root): python benchmarks/startup.py
+'''
+import os
+import sys
+import json
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.load import make_data
+from utils import file_management as files
+from utils import manifest
+from utils import snapshot
+
+SIZES = [10, 200, 2000]
+REPEAT = 5
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        # snapshots are kept in data/.cache
+        os.chdir(directory)
+        os.mkdir("data")
+        print(f"{'courses':>8} {'size':>10} {'cold':>10} {'trusted':>10} {'warm':>10} {'speedup':>8}")
+        for size in SIZES:
+            name = f"bench{size}"
+            filepath = os.path.join("data", f"{name}.json")
+            with open(filepath, 'w') as f:
+                json.dump(make_data(size), f, indent=4)
+
+            cold_data = files.load_data(filepath)
+            assert files.load_data(filepath) == cold_data
+
+            def forget():
+                snapshot.remove(name)
+                manifest.remove(name)
+
+            cold = min(timeit.repeat(
+                lambda: files.load_data(filepath),
+                setup=forget, number=1, repeat=REPEAT
+            ))
+            trusted = min(timeit.repeat(
+                lambda: files.load_data(filepath),
+                setup=lambda: snapshot.remove(name), number=1, repeat=REPEAT
+            ))
+            warm = min(timeit.repeat(lambda: files.load_data(filepath), number=1, repeat=REPEAT))
+
+            kb = os.path.getsize(filepath) / 1024
+            print(
+                f"{size:>8} {kb:>8.0f}KB {cold * 1000:>8.1f}ms {trusted * 1000:>8.1f}ms"
+                f" {warm * 1000:>8.1f}ms {cold / warm:>7.2f}x"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+'''
+Benchmarks validating data before a save: jsonschema.validate on
+every course against validation.validate_schema, on every course
+and on one dirty course.
+
+Usage (from the repository root): python benchmarks/validate.py
+'''
+import os
+import sys
+import timeit
+
+import jsonschema
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.load import make_data
+from utils.validation import DATA_SCHEMA, validate_schema
+
+SIZES = [10, 200, 2000]
+REPEAT = 5
+
+def main():
+    print(f"{'courses':>8} {'jsonschema':>11} {'compiled':>10} {'one dirty':>10}")
+    for size in SIZES:
+        data = make_data(size)
+        dirty = {next(iter(data))}
+
+        reference = min(timeit.repeat(lambda: jsonschema.validate(data, DATA_SCHEMA), number=1, repeat=REPEAT))
+        compiled = min(timeit.repeat(lambda: validate_schema(data), number=1, repeat=REPEAT))
+        incremental = min(timeit.repeat(lambda: validate_schema(data, dirty), number=1, repeat=REPEAT))
+
+        print(f"{size:>8} {reference * 1000:>9.2f}ms {compiled * 1000:>8.2f}ms {incremental * 1000:>8.3f}ms")
+
+if __name__ == "__main__":
+    main()
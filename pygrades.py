@@ -1,6 +1,8 @@
 import cmd
 import sys
 import signal
+import threading
+import time
 from tabulate import tabulate
 
 if sys.platform == "win32":
@@ -10,6 +12,17 @@ if sys.platform == "win32":
 from utils import file_management as files
 from utils import input_output as io
 from utils import stats
+from utils import drops
+from utils import engine
+from utils import solver
+from utils import forecast
+from utils import whatif
+from utils import storage
+from utils import compiler
+from utils import sync
+from utils.autosave import Autosaver
+from utils.cache import StatsCache
+from utils.models import courses_from_json
 
 class CmdParseException(Exception): pass 
 
@@ -20,10 +33,11 @@ SPLASH = tabulate([[SPLASH_MESSAGE]], tablefmt="rounded_grid")
 HELP_ORDER = [
     "Evaluation:",
     "grade", "overview", "summary",
-    "scale", "max", "needed",
+    "scale", "max", "min", "needed", "forecast", "whatif",
     "adjust", "dropnum",
     "Program:",
-    "switch", "save", "exit", "quit", "help"
+    "switch", "sync", "compile", "archive", "history", "restore",
+    "save", "autosave", "exit", "quit", "help"
 ]
 
 class PyGrades(cmd.Cmd):
@@ -54,10 +68,23 @@ class PyGrades(cmd.Cmd):
                 self.do_exit("")
 
     def preloop(self):
+        # guards the data against the autosave thread, only while
+        # commands change it (never while they wait for input)
+        self.lock = threading.RLock()
+        # serializes writes to the data file
+        self.save_lock = threading.RLock()
+        self.autosaver = None
+
         print(SPLASH)
-        data, filename = files.setup_cmd()
+        self.storage = storage.from_env()
+        data, filename = files.setup_cmd(self.storage)
         self.courses = data
         self.filename = filename
+        self.cache = StatsCache(self.courses)
+        self.journal = self.storage.open_journal(self.filename)
+        # edited courses, by the number of their last edit
+        self.dirty = {}
+        self.num_edits = 0
         print(f"\nLoaded data for {self.filename}.")
 
     def onecmd(self, line):
@@ -123,7 +150,8 @@ class PyGrades(cmd.Cmd):
             print(f"Assessments for {course}:")
             assessment = self.select_assessment(course)
 
-        grades = self.courses[course]["assessments"][assessment]["grades"]
+        data = self.courses[course].assessments[assessment]
+        grades = data.grades
 
         if num is None:
             num = self.select_assessment_number(course, assessment)
@@ -149,7 +177,7 @@ class PyGrades(cmd.Cmd):
         if new_grade == -1:
             new_grade = None
 
-        current_grade = grades[num]
+        current_grade = data.get(num)
 
         if current_grade is not None:
             message = assessment_str + f" already has the grade {current_grade}%."
@@ -163,10 +191,11 @@ class PyGrades(cmd.Cmd):
                 print("Cancelled updating grade.")
                 return
         
-        if new_grade is not None:
-            grades[num] = float(new_grade)
-        else:
-            grades[num] = None
+        with self.lock:
+            data.set(num, None if new_grade is None else float(new_grade))
+            self.journal.grade(course, assessment, num, data.get(num))
+            self.cache.invalidate(course, assessment)
+            self.edited(course)
         print(f"Updated {course} {assessment_str} to {new_grade}{'%' * (new_grade is not None)}.")
 
     def do_summary(self, line):
@@ -180,8 +209,9 @@ class PyGrades(cmd.Cmd):
         '''
         show_all = line == "all"
         if show_all:
+            summaries = self.cache.summaries()
             for course in self.courses:
-                self.do_summary(course)
+                self.print_summary(course, summaries[course])
                 print()
             return
 
@@ -189,87 +219,7 @@ class PyGrades(cmd.Cmd):
         if not course:
             course = self.select_course()
 
-        table = []
-        assessments = self.courses[course]["assessments"]
-
-        for name, data in assessments.items():
-            grades: list = data["grades"]
-            kept, dropped = stats.filter_dropped(data)
-            graded = len(stats.filter_ungraded(grades))
-
-            # find the index of the last grade that is not None
-            rev_grades = grades[::-1]
-            last_grade = next((i for i, g in enumerate(rev_grades) if g is not None), len(grades))
-            latest_grade = len(grades) - last_grade - 1
-
-            # copies for iterative mutation
-            kept_copy = kept[:]
-            dropped_copy = dropped[:]
-
-            # create formatted strings for grades column
-            grades_str = ""
-            i = 0
-            for grade in grades:
-                if grade is not None:
-                    fraction = grade != int(grade)
-                    grade_str = f"{grade:.1f}" if fraction else f"{grade:.0f}"
-
-                    if grade in dropped_copy:
-                        grades_str += f"~{grade_str}~"
-                        dropped_copy.remove(grade)
-                    else:
-                        grades_str += f"{grade_str}"
-                        kept_copy.remove(grade)
-
-                    if i != latest_grade:
-                        grades_str += ", "
-                
-                elif len(kept) > 0 <= i < latest_grade:
-                    grades_str += "None, "
-
-                i += 1
-
-            ungraded = grades.count(None)
-            to_drop = data["dropped"] - len(dropped)
-
-            if ungraded > 0 or to_drop > 0:
-                pending_str = " pending"
-                dropped_str = (" more " if len(dropped) > 0 else " ") + "to drop"
-                grades_str += "\n" if len(grades) > 1 else ""
-                grades_str += "("
-                if ungraded and not to_drop:
-                    grades_str += f"{ungraded}{pending_str}"
-                elif to_drop and not ungraded:
-                    grades_str += to_drop + dropped_str
-                else:
-                    grades_str += f"{ungraded}{pending_str}, {to_drop}{dropped_str}"
-                grades_str += ")"
-
-            # calculate and format assessment stats
-            weight = data["weight"]
-
-            achieved = stats.achieved_weight(data)
-            average = stats.interim_weight(kept)
-
-            achieved_str = f"{achieved:.2f} %" if graded else "n/a"
-            average_str = f"{average:.2f} %" if graded else "n/a"
-
-            weight_str = f"{weight} %"
-
-            # add row to table
-            table.append([name, grades_str, average_str, achieved_str, weight_str])
-
-        # add totals to table
-        weighted_average_str, total_achieved_str = stats.course_totals(self.courses[course])
-        table.append(["•", "Weighted Totals:", weighted_average_str, total_achieved_str, "100 %"])
-
-        print(tabulate(
-            table,
-            headers=[f"{course}", "Grades", "Average", "Achieved", "Weight"],
-            tablefmt="rounded_grid",
-            stralign="right",
-            colalign=("right", "left",)
-        ))
+        self.print_summary(course, self.cache.summary(course))
 
     def do_overview(self, line):
         '''
@@ -278,8 +228,16 @@ class PyGrades(cmd.Cmd):
         Syntax: overview
         '''
         table = []
-        for name, data in self.courses.items():
-            weighted_average_str, total_achieved_str = stats.course_totals(data)
+        summaries = self.cache.summaries()
+        for name in self.courses:
+            summary = summaries[name]
+            letters = self.cache.letters(name)
+            weighted_average_str = stats.format_total(
+                summary["weighted_average"], letters["weighted_average"]
+            )
+            total_achieved_str = stats.format_total(
+                summary["achieved"], letters["achieved"]
+            )
 
             table.append([name, weighted_average_str, total_achieved_str])
 
@@ -304,27 +262,27 @@ class PyGrades(cmd.Cmd):
             course_name = self.select_course()
         course = self.courses[course_name]
 
-        scale = course["scale"]
-        sorted_scale = sorted(
-            scale.items(),
-            reverse = True,
-            key = lambda x: x[1]
-        )
+        scale = course.scale
 
         # handle sentinel value representing no scale
         if "None" in scale.keys():
             print(f"{course_name} has no grade scale.")
             return
 
-        weighted_avg = stats.total_weighted_average(course["assessments"])
-        placement = stats.get_letter_grade(course, weighted_avg)
+        weighted_avg = self.cache.summary(course_name)["weighted_average"]
+        placement = self.cache.letters(course_name)["weighted_average"]
 
         rows = [f"- {course_name}"]
-        for letter, minimum in sorted_scale:
+        for letter, minimum in scale.descending():
             rows.append(f"| {letter}\t{minimum}%")
             if placement is not None and letter == placement:
                 rows[-1] += f" <- Current ({weighted_avg:.2f}%)"
 
+        next_letter = scale.next_letter(weighted_avg)
+        if next_letter is not None:
+            letter, distance = next_letter
+            rows.append(f"{distance:.2f}% away from {letter}.")
+
         for row in rows: print(row)
 
     def do_adjust(self, line):
@@ -355,7 +313,7 @@ class PyGrades(cmd.Cmd):
             scale_key = parts[0]
             new_grade = parts[1]
 
-        scale: dict = course["scale"]
+        scale = course.scale
         scale_keys = list(scale.keys())
         # create lowered key map to match input
         keys_lower_map = {key.lower(): key for key in scale_keys}
@@ -395,7 +353,11 @@ class PyGrades(cmd.Cmd):
             lambda c: io.yes_or_no(c)
         )
         if conf == 'y':
-            scale[scale_key] = new_grade
+            with self.lock:
+                scale[scale_key] = new_grade
+                self.journal.scale(course_name, scale_key, new_grade)
+                self.cache.invalidate_scale(course_name)
+                self.edited(course_name)
             print(f"Updated {scale_key} for {course_name}.")
         else:
             print("Cancelled adjustment.")
@@ -416,7 +378,7 @@ class PyGrades(cmd.Cmd):
             course_name = self.select_course()
 
         course = self.courses[course_name]
-        assessments = course["assessments"]
+        assessments = course.assessments
         assessments_keys = list(assessments.keys())
 
         # create lowered key map to match input
@@ -440,7 +402,7 @@ class PyGrades(cmd.Cmd):
         else:
             print(io.numbered_list(
                 assessments,
-                suffix = lambda key: f" ({assessments[key]["dropped"]} out of {assessments[key]["amount"]} dropped)"
+                suffix = lambda key: f" ({assessments[key].dropped} out of {assessments[key].amount} dropped)"
             ))
             choice = io.input_until_valid(
                 "Enter the assessment to update: ",
@@ -449,7 +411,7 @@ class PyGrades(cmd.Cmd):
             assessment_name = assessments_keys[int(choice) - 1]
 
         assessment = assessments[assessment_name]
-        kept = assessment["amount"]
+        kept = assessment.amount
         
         if new_number is None or not new_number.isnumeric() or not (0 <= int(new_number) < kept):
             new_number = int(io.input_until_valid(
@@ -460,7 +422,7 @@ class PyGrades(cmd.Cmd):
         else:
             new_number = int(new_number)
 
-        current_number = assessment["dropped"]
+        current_number = assessment.dropped
         if current_number == new_number:
             print(f"{assessment_name} already drops {new_number}.")
         else:
@@ -469,7 +431,11 @@ class PyGrades(cmd.Cmd):
                 lambda c: io.yes_or_no(c)
             )
             if conf == 'y':
-                assessment["dropped"] = new_number
+                with self.lock:
+                    assessment.dropped = new_number
+                    self.journal.dropped(course_name, assessment_name, new_number)
+                    self.cache.invalidate(course_name, assessment_name)
+                    self.edited(course_name)
                 print(f"Updated {assessment_name}.")
             else:
                 print("Cancelled update.")
@@ -479,11 +445,18 @@ class PyGrades(cmd.Cmd):
         - See how well you need to do to achieve a target grade.
 
         Optional arguments:
-        [course] \t -> Course identifier
-        [grade] \t -> Target grade (can be a percentage or scale key, ex. A+)
+        [course] \t -> Course identifier, or "all" for every course
+        [grade] \t -> Target grade (can be a percentage, scale key, ex. A+, or "all")
 
         Syntax: needed [course] [grade]
         '''
+        # show every grade in the scale of one or all courses
+        course_name, rest = self.match_course(line)
+        if rest == "all":
+            courses = [course_name] if course_name else list(self.courses)
+            self.print_needed(courses)
+            return
+
         course_name, target = self.parse_needed(line)
         if not course_name:
             course_name = self.select_course()
@@ -496,13 +469,13 @@ class PyGrades(cmd.Cmd):
             target = self.match_grade(target, course_name)
 
         course = self.courses[course_name]
-        assessments = course["assessments"]
-        scale = course["scale"]
+        scale = course.scale
 
-        needed = stats.needed_for_target(assessments, target)
+        needed = solver.solve(self.cache.solver(course_name), target)
+        estimate = engine.needed_for_target(self.cache.summary(course_name), target)
         
         target_str = f"{target:.1f}%"
-        scale_key = stats.get_letter_grade(course, target)
+        scale_key = scale.letter(target)
         if scale_key is not None and scale[scale_key] == target:
             target_str += f" ({scale_key})"
 
@@ -514,6 +487,126 @@ class PyGrades(cmd.Cmd):
             print(f"You have already achieved {target_str} in {course_name}.")
         else:
             print(f"{needed:.2f}% needed on remaining assessments to achieve {target_str}.")
+            # the estimate ignores remaining grades that could be dropped
+            if estimate is not None and abs(needed - estimate) >= 0.005:
+                print(f"(Differs from the linear estimate of {estimate:.2f}% by {needed - estimate:+.2f}%.)")
+
+    def do_forecast(self, line):
+        '''
+        - Estimate your chances of getting each grade in a course.
+
+        Optional argument:
+        [course] -> Course identifier
+
+        Syntax: forecast [course]
+        '''
+        if not forecast.HAS_NUMPY:
+            print("The forecast command requires NumPy (pip install numpy).")
+            return
+
+        course_name, _ = self.match_course(line)
+        if not course_name:
+            course_name = self.select_course()
+        course = self.courses[course_name]
+        scale = course.scale
+
+        result = forecast.forecast(course)
+
+        # handle sentinel value representing no scale
+        if "None" not in scale.keys():
+            table = []
+            for letter, probability in result["probabilities"].items():
+                if letter is not None:
+                    table.append([letter, f"{scale[letter]} %", f"{probability * 100:.1f} %"])
+
+            below = result["probabilities"][None]
+            if below > 0:
+                table.append(["•", "Below scale", f"{below * 100:.1f} %"])
+
+            print(tabulate(
+                table,
+                headers=[course_name, "Minimum", "Chance"],
+                tablefmt="rounded_grid",
+                stralign="right",
+                disable_numparse=True
+            ))
+
+        print(f"Expected final grade: {result["mean"]:.2f}% (90% of outcomes between "
+              f"{result["low"]:.2f}% and {result["high"]:.2f}%).")
+        print(f"Based on {forecast.DRAWS:,} simulations of your remaining assessments.")
+
+    def do_whatif(self, line):
+        '''
+        - Try out hypothetical grades without changing your data.
+
+        Optional arguments:
+        [course] \t -> Course identifier
+        [scenarios] \t -> Grades to try, as in the grade command.
+        \t\t    Separate grades with commas and scenarios with semicolons.
+
+        Syntax: whatif [course] [assessment] [number] [grade], ... ; ...
+        '''
+        course_name, rest = self.match_course(line)
+        if not course_name:
+            course_name = self.select_course()
+            rest = line
+
+        texts = [text.strip() for text in rest.split(";") if text.strip()]
+        if not texts:
+            while True:
+                text = io.input_until_valid(
+                    "Enter a scenario (ex. midterm 1 70, final 80), or nothing to finish: ",
+                    lambda c: c is not None
+                )
+                if not text:
+                    break
+                texts.append(text.lower())
+
+        scenarios = []
+        for text in texts:
+            scenario = self.parse_scenario(text, course_name)
+            if scenario is None:
+                return
+            scenarios.append(scenario)
+
+        # the current grades are evaluated alongside as a baseline
+        results = whatif.evaluate(self.cache, course_name, [{}] + scenarios)
+
+        scale = self.courses[course_name].scale
+        table = []
+        for text, result in zip(["Current"] + texts, results):
+            weighted_average_str = stats.format_total(
+                result["weighted_average"], result["letters"]["weighted_average"]
+            )
+            achieved_str = stats.format_total(
+                result["achieved"], result["letters"]["achieved"]
+            )
+
+            # the average needed to reach the next letter
+            next_letter = scale.next_letter(result["weighted_average"])
+            if next_letter is None or not result["needed"]:
+                needed_str = "n/a"
+            else:
+                letter, _ = next_letter
+                needed = result["needed"][letter]
+                if needed is None:
+                    needed_str = "All graded"
+                elif needed > 100:
+                    needed_str = f"{letter}: Not possible"
+                elif needed <= 0:
+                    needed_str = f"{letter}: Achieved"
+                else:
+                    needed_str = f"{letter}: {needed:.2f} %"
+
+            table.append([text.replace(", ", ",\n"), weighted_average_str, achieved_str, needed_str])
+
+        print(tabulate(
+            table,
+            headers=[course_name, "Wtd. Average", "Achieved", "Needed"],
+            tablefmt="rounded_grid",
+            stralign="right",
+            disable_numparse=True
+        ))
 
     def do_max(self, line):
         '''
@@ -528,19 +621,40 @@ class PyGrades(cmd.Cmd):
         if not course:
             course = self.select_course()
         
-        max = stats.max_grade_possible(self.courses[course]["assessments"])
-        scale_key = stats.get_letter_grade(self.courses[course], max)
+        _, max = self.cache.bounds(course)
+        scale_key = self.courses[course].scale.letter(max)
 
         s = f"The maximum grade possible for {course} is {max:.2f}%"
         if scale_key:
             s += f" ({scale_key})"
         print(s)
 
+    def do_min(self, line):
+        '''
+        - See what the minimum grade you can get in a course is.
+
+        Optional argument:
+        [course] -> Course identifier
+
+        Syntax: min [course]
+        '''
+        course, _ = self.match_course(line)
+        if not course:
+            course = self.select_course()
+
+        min, _ = self.cache.bounds(course)
+        scale_key = self.courses[course].scale.letter(min)
+
+        s = f"The minimum grade possible for {course} is {min:.2f}%"
+        if scale_key:
+            s += f" ({scale_key})"
+        print(s)
+
     def do_save(self, line):
         '''
         - Save changes.
         '''
-        success = files.write_data(self.courses, self.filename)
+        success = self.save_changes()
         if success:
             print("Saved changes.")
         else:
@@ -557,26 +671,285 @@ class PyGrades(cmd.Cmd):
         
         print()
         if save == 'y':
-            files.write_data(self.courses, self.filename)
+            self.save_changes(closing = True)
             print("Successfully saved data.")
+            unsaved = []
         else:
             print("NOTICE: Continuing without saving.")
             print("(You can cancel this command with Ctrl + C)")
+            with self.lock:
+                unsaved = self.journal.discard()
         print()
 
-        data, filename = files.setup_cmd(startup=False)
-        self.courses = data
-        self.filename = filename
+        try:
+            data, filename = files.setup_cmd(self.storage, startup=False)
+        except KeyboardInterrupt:
+            # keep the unsaved changes of the current data
+            with self.lock:
+                for record in unsaved:
+                    self.journal.append(record)
+            raise
+
+        with self.lock:
+            self.journal.close()
+            self.courses = data
+            self.filename = filename
+            self.cache = StatsCache(self.courses)
+            self.journal = self.storage.open_journal(self.filename, sync = self.autosaver is None)
+            self.dirty = {}
         print(f"\nLoaded data for {self.filename}.")
         print(self.intro, end="")
 
+    def do_sync(self, line):
+        '''
+        - Sync data with another data folder, such as a copy on a USB drive.
+        Only the courses changed since the last sync are copied, both ways.
+        Courses changed on both sides are conflicts, which are left as they
+        are unless you choose the side to keep.
+
+        Optional arguments:
+        [path] \t -> Path of the other data folder
+        [keep] \t -> "here" or "there", the side to keep in conflicts
+
+        Syntax: sync [path] [keep]
+        '''
+        words = line.split()
+        prefer = None
+        if words and words[-1] in (sync.HERE, sync.THERE):
+            prefer = words.pop()
+
+        path = " ".join(words)
+        if not path:
+            path = io.input_until_valid(
+                message = "Path of the data folder to sync with: ",
+                func = lambda c: bool(c)
+            )
+
+        # an autosave copied before the sync must not write over the
+        # received courses: clearing the journal makes it skip its write
+        with self.lock, self.save_lock:
+            loaded = {self.filename: self.storage.to_json(self.courses)}
+            try:
+                changes, received = sync.sync(self.storage, path, loaded, prefer)
+            except sync.SyncError as e:
+                print(e)
+                return
+
+            if self.filename in received:
+                # the journaled edits were written along with the received courses
+                self.journal.clear()
+                self.courses = courses_from_json(received[self.filename])
+                self.cache = StatsCache(self.courses)
+                self.dirty = {}
+
+        if len(changes) == 0:
+            print(f"Already in sync with {path}.")
+            return
+
+        print(tabulate(
+            changes,
+            headers=["Data", "Course", "Change"],
+            tablefmt="rounded_grid",
+            stralign="right",
+            disable_numparse=True
+        ))
+        counts = {
+            change: sum(1 for _name, _course, c in changes if c == change)
+            for change in (sync.SENT, sync.RECEIVED, sync.REMOVED_HERE, sync.REMOVED_THERE, sync.CONFLICT)
+        }
+        print(f"Synced with {path}: " + ", ".join(
+            f"{count} {change}" + ("s" if change == sync.CONFLICT and count != 1 else "")
+            for change, count in counts.items() if count
+        ) + ".")
+        if counts[sync.CONFLICT]:
+            print(f"Use 'sync {path} here' or 'sync {path} there' to keep the courses on one side.")
+
+    def do_compile(self, line):
+        '''
+        - Create data from every outline in outlines/ at once.
+        Outlines are parsed in parallel, and errors are listed at the end.
+
+        Optional argument:
+        [overwrite] \t -> Replace existing data (except the loaded data)
+
+        Syntax: compile [overwrite]
+        '''
+        overwrite = line == "overwrite"
+        if overwrite:
+            conf = io.input_until_valid(
+                "Replace existing data with its outline? (y/n) ",
+                lambda c: io.yes_or_no(c)
+            )
+            if conf != 'y':
+                return
+
+        with self.save_lock:
+            report = compiler.compile_all(self.storage, overwrite, self.filename)
+        compiler.print_report(*report)
+
+    def do_archive(self, line):
+        '''
+        - Compress data that is not loaded, such as a past semester.
+        Archived data can still be loaded as usual.
+
+        Optional arguments:
+        [data]   \t -> Name of the data to archive
+        [format] \t -> "xz" (smallest, default), "gz" (fastest),
+        \t\t    or "zip" (moves it into data/archive.zip with other semesters)
+
+        Syntax: archive [data] [format]
+        '''
+        words = line.split()
+        ext = ".json.xz"
+        if words and words[-1] == "zip":
+            ext = f".{words.pop()}"
+        elif words and words[-1] in ("gz", "xz"):
+            ext = f".json.{words.pop()}"
+
+        names = [name for name in self.storage.list() if name != self.filename]
+        if len(names) == 0:
+            print("There is no other data to archive.")
+            return
+
+        name = " ".join(words)
+        matches = [n for n in names if n.lower() == name]
+        if matches:
+            name = matches[0]
+        else:
+            if name:
+                print(f"No other data named {name}.")
+            print(io.numbered_list(names))
+            message = "Please select data to archive: "
+            choice = io.input_until_valid(
+                message = message,
+                repeat_message = "Invalid choice. " + message,
+                func = lambda c:
+                    io.in_range(c, 1, len(names) + 1)
+            )
+            name = names[int(choice) - 1]
+
+        try:
+            success = self.storage.archive(name, ext)
+        except storage.StorageError as e:
+            print(e)
+            return
+
+        if success and ext == ".zip":
+            print(f"Archived {name} in {self.storage.packed.path}.")
+        elif success:
+            print(f"Archived {name} as {name}{ext}.")
+
+    def do_history(self, line):
+        '''
+        - List the saved versions of the loaded data.
+        '''
+        try:
+            versions = self.storage.versions(self.filename)
+        except storage.StorageError as e:
+            print(e)
+            return
+
+        if len(versions) == 0:
+            print(f"No versions of {self.filename} have been saved yet.")
+            return
+
+        self.print_versions(versions)
+
+    def do_restore(self, line):
+        '''
+        - Restore the loaded data to a saved version.
+        The current data is saved as a new version first.
+
+        Optional argument:
+        [version] \t -> Version number (see history)
+
+        Syntax: restore [version]
+        '''
+        try:
+            versions = self.storage.versions(self.filename)
+        except storage.StorageError as e:
+            print(e)
+            return
+
+        if len(versions) == 0:
+            print(f"No versions of {self.filename} have been saved yet.")
+            return
+
+        if line.isdigit() and io.in_range(line, 1, len(versions) + 1):
+            number = int(line)
+        else:
+            self.print_versions(versions)
+            message = "Please select a version: "
+            number = int(io.input_until_valid(
+                message = message,
+                repeat_message = "Invalid choice. " + message,
+                func = lambda c:
+                    io.in_range(c, 1, len(versions) + 1)
+            ))
+        version = versions[number - 1]
+
+        saved = time.strftime("%Y-%m-%d %H:%M", time.localtime(version["saved"]))
+        conf = io.input_until_valid(
+            f"Restore {self.filename} to version {number} (saved {saved})? (y/n) ",
+            lambda c: io.yes_or_no(c)
+        )
+        if conf != 'y':
+            return
+
+        try:
+            data = self.storage.version(self.filename, version["hash"])
+        except storage.StorageError as e:
+            print(e)
+            return
+
+        with self.lock, self.save_lock:
+            # keep the current data, so the restore can be undone
+            current = self.storage.to_json(self.courses)
+            if not self.storage.write(self.filename, current):
+                return
+            if not self.storage.write(self.filename, data):
+                return
+
+            self.journal.clear()
+            self.courses = courses_from_json(data)
+            self.cache = StatsCache(self.courses)
+            self.dirty = {}
+        print(f"Restored {self.filename} to version {number}.")
+
+    def do_autosave(self, line):
+        '''
+        - Turn saving changes automatically on or off.
+
+        Optional argument:
+        [on/off] -> Whether to autosave
+
+        Syntax: autosave [on/off]
+        '''
+        if line not in ("on", "off"):
+            state = "on" if self.autosaver is not None else "off"
+            print(f"Autosave is {state}. Use 'autosave on' or 'autosave off' to change it.")
+            return
+
+        if line == "on" and self.autosaver is None:
+            self.autosaver = Autosaver(self.autosave)
+        elif line == "off" and self.autosaver is not None:
+            self.autosaver.stop()
+            self.autosaver = None
+
+        # edits are flushed to disk when the autosave thread commits them
+        with self.lock:
+            self.journal.sync = self.autosaver is None
+        print(f"Autosave is {line}.")
+
     def do_exit(self, line):
         '''
         - Save and exit the program.
         '''
         print("Saving and Exiting...")
-        if hasattr(self, "courses") and hasattr(self, "filename"):
-            files.write_data(self.courses, self.filename)
+        if getattr(self, "autosaver", None) is not None:
+            self.autosaver.stop()
+        if hasattr(self, "courses") and hasattr(self, "journal"):
+            self.save_changes(closing = True)
         self.exit = True
         return True
     
@@ -592,9 +965,82 @@ class PyGrades(cmd.Cmd):
             print("You can save and exit by typing 'exit'.")
         else:
             print("Quitting...")
+            if self.autosaver is not None:
+                self.autosaver.stop()
+            with self.lock:
+                self.journal.discard()
             self.exit = True
             return True
 
+    # ==== #
+    # Data #
+    # ==== #
+
+    def save_changes(self, closing = False) -> bool:
+        '''
+        Saves changes by committing the journal. Once the journal grows
+        past its threshold, or when the data is closed, writes the data
+        and clears the journal.
+        Returns true if successful.
+        '''
+        with self.lock:
+            if not self.journal.needs_compaction(closing):
+                self.journal.commit()
+                return True
+
+            with self.save_lock:
+                data = self.storage.to_json(self.courses, set(self.dirty))
+                success = self.storage.write(self.filename, data, set(self.dirty))
+                if success:
+                    self.journal.clear()
+                    self.dirty = {}
+            return success
+
+    def autosave(self):
+        '''
+        Saves changes from the autosave thread. The data is only locked
+        while the journal is committed and the edited courses are copied:
+        the journal is flushed to disk and the data file written without it.
+        '''
+        with self.lock:
+            journal = self.journal
+            flush = journal.commit_unsynced()
+            compact = journal.needs_compaction()
+            if compact:
+                dirty = dict(self.dirty)
+                data = self.storage.to_json(self.courses, set(dirty))
+                filename = self.filename
+                generation = journal.generation
+                size = journal.committed_size
+
+        flush()
+        if not compact:
+            return
+
+        with self.save_lock:
+            # skip the write if newer data was saved in the meantime
+            if journal.generation != generation:
+                return
+            success = self.storage.write(filename, data, set(dirty))
+
+        with self.lock:
+            if success and journal is self.journal and journal.generation == generation:
+                journal.forget(size)
+                # courses edited again since the copy stay dirty
+                for course, edit in dirty.items():
+                    if self.dirty.get(course) == edit:
+                        del self.dirty[course]
+
+    def edited(self, course: str):
+        '''
+        Marks a course to be validated on the next save,
+        and schedules an autosave if autosave is on.
+        '''
+        self.num_edits += 1
+        self.dirty[course] = self.num_edits
+        if self.autosaver is not None:
+            self.autosaver.touch()
+
     # ======= #
     # Parsers #
     # ======= #
@@ -640,7 +1086,7 @@ class PyGrades(cmd.Cmd):
         '''
         # try as scale key
         if course in self.courses.keys() and type(grade) == str:
-            scale = self.courses[course]["scale"]
+            scale = self.courses[course].scale
             scale_lower = {
                 key.lower(): val for key, val in scale.items()
             }
@@ -676,7 +1122,7 @@ class PyGrades(cmd.Cmd):
             
             # match assessment
             assessment = None
-            assessments = self.courses[course]["assessments"]
+            assessments = self.courses[course].assessments
             for a in assessments:
                 if a.lower() in line:
                     assessment = a
@@ -687,7 +1133,7 @@ class PyGrades(cmd.Cmd):
             if assessment is None:
                 raise CmdParseException()
             
-            grades = assessments[assessment]["grades"]
+            grades = assessments[assessment].grades
 
             line = line.split()
 
@@ -758,10 +1204,219 @@ class PyGrades(cmd.Cmd):
 
         return course, target
     
+    def parse_scenario(self, text: str, course: str) -> dict[str, dict[int, float | None]] | None:
+        '''
+        Parses the grades of a whatif scenario, separated by commas.
+        Returns None if any grade is invalid.
+        '''
+        scenario = {}
+        try:
+            assessments = self.courses[course].assessments
+            for part in text.split(","):
+                part = part.strip()
+
+                # match assessment
+                assessment = None
+                for a in assessments:
+                    if a.lower() in part:
+                        assessment = a
+                        # remove identifier from part
+                        part = part.replace(a.lower(), "").strip()
+                        break
+
+                if assessment is None:
+                    raise CmdParseException(f"No valid assessment in: {part}")
+
+                grades = assessments[assessment].grades
+                args = part.split()
+
+                # both number and grade given
+                if len(args) == 2:
+                    number, grade = args
+                # grade given for unique assessment
+                elif len(args) == 1 and len(grades) == 1:
+                    number, grade = 1, args[0]
+                else:
+                    raise CmdParseException(f"Unknown syntax: {part}")
+
+                try:
+                    number = int(number) - 1
+                    if grade == "none":
+                        grade = None
+                    else:
+                        grade = float(grade.replace("%", ""))
+                except ValueError:
+                    raise CmdParseException(f"Unknown syntax: {part}")
+
+                if number not in range(0, len(grades)):
+                    raise CmdParseException(f"Invalid assessment number: {number + 1}")
+
+                scenario.setdefault(assessment, {})[number] = grade
+
+        except CmdParseException as e:
+            print(e)
+            return None
+
+        return scenario
+
+    # ====== #
+    # Tables #
+    # ====== #
+
+    def print_summary(self, course: str, summary: dict):
+        '''Prints the summary table of a course from its cached summary.'''
+        table = []
+        assessments = self.courses[course].assessments
+        # drop policies can move drops between assessments
+        resolved = drops.resolve(assessments)
+
+        for name, data in assessments.items():
+            grades = data.grade_list()
+            kept, dropped = self.cache.drops(course, name)
+            drop_mask = self.cache.drop_mask(course, name)
+            graded = summary["assessments"][name]["graded"]
+
+            # find the index of the last grade that is not None
+            rev_grades = grades[::-1]
+            last_grade = next((i for i, g in enumerate(rev_grades) if g is not None), len(grades))
+            latest_grade = len(grades) - last_grade - 1
+
+            # create formatted strings for grades column
+            grades_str = ""
+            i = 0
+            for grade in grades:
+                if grade is not None:
+                    fraction = grade != int(grade)
+                    grade_str = f"{grade:.1f}" if fraction else f"{grade:.0f}"
+
+                    # replaced by a drop policy
+                    counted = resolved[name].grades[i]
+                    if counted != grade:
+                        grade_str += f"->{counted:.1f}" if counted != int(counted) else f"->{counted:.0f}"
+
+                    if drop_mask[i]:
+                        grades_str += f"~{grade_str}~"
+                    else:
+                        grades_str += f"{grade_str}"
+
+                    if i != latest_grade:
+                        grades_str += ", "
+                
+                elif len(kept) > 0 <= i < latest_grade:
+                    grades_str += "None, "
+
+                i += 1
+
+            ungraded = grades.count(None)
+            to_drop = resolved[name].dropped - len(dropped)
+
+            if ungraded > 0 or to_drop > 0:
+                pending_str = " pending"
+                dropped_str = (" more " if len(dropped) > 0 else " ") + "to drop"
+                grades_str += "\n" if len(grades) > 1 else ""
+                grades_str += "("
+                if ungraded and not to_drop:
+                    grades_str += f"{ungraded}{pending_str}"
+                elif to_drop and not ungraded:
+                    grades_str += f"{to_drop}{dropped_str}"
+                else:
+                    grades_str += f"{ungraded}{pending_str}, {to_drop}{dropped_str}"
+                grades_str += ")"
+
+            # calculate and format assessment stats
+            weight = data.weight
+
+            achieved = summary["assessments"][name]["achieved"]
+            average = summary["assessments"][name]["average"]
+
+            achieved_str = f"{achieved:.2f} %" if graded else "n/a"
+            average_str = f"{average:.2f} %" if graded else "n/a"
+
+            weight_str = f"{weight} %"
+
+            # add row to table
+            table.append([name, grades_str, average_str, achieved_str, weight_str])
+
+        # add totals to table
+        letters = self.cache.letters(course)
+        weighted_average_str = stats.format_total(
+            summary["weighted_average"], letters["weighted_average"]
+        )
+        total_achieved_str = stats.format_total(
+            summary["achieved"], letters["achieved"]
+        )
+        table.append(["•", "Weighted Totals:", weighted_average_str, total_achieved_str, "100 %"])
+
+        print(tabulate(
+            table,
+            headers=[f"{course}", "Grades", "Average", "Achieved", "Weight"],
+            tablefmt="rounded_grid",
+            stralign="right",
+            colalign=("right", "left",)
+        ))
+
+    def print_needed(self, courses: list[str]):
+        '''Prints the average needed for every grade in the scales of the given courses.'''
+        table = []
+        for course in courses:
+            data = self.courses[course]
+
+            # handle sentinel value representing no scale
+            if "None" in data.scale.keys():
+                table.append([course, "n/a", "n/a", "No grade scale"])
+                continue
+
+            prepared = self.cache.solver(course)
+            needed = {
+                letter: solver.solve(prepared, minimum)
+                for letter, minimum in data.scale.items()
+            }
+
+            first = True
+            for letter, value in needed.items():
+                if value is None:
+                    needed_str = "All graded"
+                elif value > 100:
+                    needed_str = "Not possible"
+                elif value <= 0:
+                    needed_str = "Achieved"
+                else:
+                    needed_str = f"{value:.2f} %"
+
+                minimum = data.scale[letter]
+                table.append([course if first else "", letter, f"{minimum} %", needed_str])
+                first = False
+
+        print(tabulate(
+            table,
+            headers=[self.filename, "Grade", "Minimum", "Needed"],
+            tablefmt="rounded_grid",
+            stralign="right",
+            disable_numparse=True
+        ))
+
     # ======================= #
     # Numbered List Selectors #
     # ======================= #
 
+    def print_versions(self, versions: list[dict]):
+        table = [
+            [
+                i,
+                time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(version["saved"])),
+                version["courses"],
+                version["hash"][:8] + (" (latest)" if i == len(versions) else "")
+            ]
+            for i, version in enumerate(versions, 1)
+        ]
+        print(tabulate(
+            table,
+            headers=[self.filename, "Saved", "Courses", "Version"],
+            tablefmt="rounded_grid",
+            stralign="right",
+            disable_numparse=True
+        ))
+
     def select_course(self) -> str | None:
         print(io.numbered_list(self.courses))
         message = "Please select a course: "
@@ -778,16 +1433,17 @@ class PyGrades(cmd.Cmd):
         
     def select_assessment(self, course) -> tuple[str, int] | None:
         '''Returns the chosen assessment name.'''
-        assessments = self.courses[course]["assessments"]
+        assessments = self.courses[course].assessments
 
         def suffix(assessment):
             s = ""
-            grades = assessments[assessment]["grades"]
-            filtered_grades = stats.filter_ungraded(grades)
+            data = assessments[assessment]
+            grades = data.grades
+            filtered_grades = data.graded()
             if len(grades) > 1:
                 s += f" ({len(filtered_grades)}/{len(grades)} graded)"
-            elif grades[0] is not None:
-                s += f" ({grades[0]}%)"
+            elif data.get(0) is not None:
+                s += f" ({data.get(0)}%)"
             else:
                 s += " (pending)"
             return s
@@ -815,7 +1471,7 @@ class PyGrades(cmd.Cmd):
         return assessment
     
     def select_assessment_number(self, course, assessment):
-        grades = self.courses[course]["assessments"][assessment]["grades"]
+        grades = self.courses[course].assessments[assessment].grade_list()
 
         if len(grades) > 1:
             print(f"Grades for {assessment}: ")
@@ -0,0 +1,54 @@
+'''
+Fixtures shared by the tests.
+'''
+import os
+import random
+import tempfile
+import unittest
+
+from utils import file_management as files
+
+DATA = {
+    "Math 101": {
+        "assessments": {
+            "Final": {"weight": 100, "amount": 1, "dropped": 0, "grades": [None]}
+        },
+        "scale": {"A": 80}
+    }
+}
+
+def make_data(num_courses: int, seed = 0) -> dict:
+    '''Generates num_courses courses with some grades set, some dropped.'''
+    rng = random.Random(seed)
+    data = {}
+    for c in range(num_courses):
+        assessments = {}
+        for name, weight, amount, dropped in [
+            ("Assignment", 20, 10, 2), ("Quiz", 10, 12, 3),
+            ("Midterm", 30, 2, 0), ("Final", 40, 1, 0)
+        ]:
+            assessments[name] = {
+                "weight": weight,
+                "amount": amount,
+                "dropped": dropped,
+                "grades": [
+                    None if rng.random() < 0.3 else round(rng.uniform(40, 100), 1)
+                    for _ in range(amount)
+                ]
+            }
+        data[f"Course {c}"] = {
+            "assessments": assessments,
+            "scale": {"A": 80, "B": 70, "C": 60, "D": 50}
+        }
+    return data
+
+class DataDirTestCase(unittest.TestCase):
+    '''Runs every test in a new temporary directory, with data/ set up.'''
+    def setUp(self):
+        cwd = os.getcwd()
+        directory = tempfile.TemporaryDirectory()
+        os.chdir(directory.name)
+        # cleanups run last in, first out
+        self.addCleanup(directory.cleanup)
+        self.addCleanup(os.chdir, cwd)
+        files.setup_dirs()
@@ -0,0 +1,91 @@
+import unittest
+
+from utils import drops
+from utils import engine
+from utils import solver
+from utils import stats
+from utils.cache import StatsCache
+from utils.models import courses_from_json
+
+def course_data(quizzes_a, quizzes_b, assignments, final) -> dict:
+    return {
+        "Math 101": {
+            "assessments": {
+                "Quiz-A": {
+                    "weight": 10, "amount": 3, "dropped": 1, "grades": quizzes_a,
+                    "drops": {"policy": "lowest-per-category", "category": "Quizzes"}
+                },
+                "Quiz-B": {
+                    "weight": 10, "amount": 3, "dropped": 1, "grades": quizzes_b,
+                    "drops": {"policy": "lowest-per-category", "category": "Quizzes"}
+                },
+                "Assignment": {
+                    "weight": 30, "amount": 3, "dropped": 0, "grades": assignments,
+                    "drops": {"policy": "replace-lowest-with-final", "final": "Final"}
+                },
+                "Final": {"weight": 50, "amount": 1, "dropped": 0, "grades": final},
+            },
+            "scale": {"A": 80, "B": 70}
+        }
+    }
+
+class DropPolicyTest(unittest.TestCase):
+    def test_category_drops_the_lowest_grades_across_its_assessments(self):
+        courses = courses_from_json(course_data([80, 90, 70], [40, 45, 95], [None] * 3, [None]))
+        resolved = drops.resolve(courses["Math 101"].assessments)
+
+        self.assertEqual(resolved["Quiz-A"].dropped, 0)
+        self.assertEqual(resolved["Quiz-B"].dropped, 2)
+        self.assertEqual(drops.drop_lowest(resolved["Quiz-B"]), [True, True, False])
+
+    def test_every_assessment_of_a_category_keeps_a_grade(self):
+        data = course_data([80, 90, 70], [10, 20, 30], [None] * 3, [None])
+        for quiz in ("Quiz-A", "Quiz-B"):
+            data["Math 101"]["assessments"][quiz]["dropped"] = 2
+        resolved = drops.resolve(courses_from_json(data)["Math 101"].assessments)
+
+        self.assertEqual(resolved["Quiz-B"].dropped, 2)
+        self.assertEqual(resolved["Quiz-A"].dropped, 2)
+        self.assertEqual(drops.drop_lowest(resolved["Quiz-A"]), [True, False, True])
+
+    def test_lowest_grade_is_replaced_with_the_final_average(self):
+        courses = courses_from_json(course_data([None] * 3, [None] * 3, [60, 70, 80], [85]))
+        assessments = courses["Math 101"].assessments
+        resolved = drops.resolve(assessments)
+
+        self.assertEqual(list(resolved["Assignment"].grades), [85, 70, 80])
+        # the stored grades are unchanged, and resolving again changes nothing
+        self.assertEqual(list(assessments["Assignment"].grades), [60, 70, 80])
+        self.assertIs(drops.resolve(resolved), resolved)
+
+        courses = courses_from_json(course_data([None] * 3, [None] * 3, [60, 70, 80], [50]))
+        resolved = drops.resolve(courses["Math 101"].assessments)
+        self.assertEqual(list(resolved["Assignment"].grades), [60, 70, 80])
+
+    def test_stats_engine_and_solver_apply_policies(self):
+        courses = courses_from_json(course_data([50, 90, None], [40, 45, 95], [60, 70, None], [85]))
+        course = courses["Math 101"]
+
+        summary = engine.summarize(courses)["Math 101"]
+        # Quiz-B keeps 95, Quiz-A keeps 50 and 90, and the final replaces 60
+        self.assertAlmostEqual(summary["weighted_average"], 9.5 + 7 + 23.25 + 42.5)
+        self.assertAlmostEqual(summary["weighted_average"], stats.total_weighted_average(course.assessments))
+        self.assertAlmostEqual(summary["achieved"], stats.total_achieved(course.assessments))
+
+        prepared = solver.prepare(course.assessments)
+        self.assertAlmostEqual(solver.final_grade(prepared, 0), stats.min_grade_possible(course.assessments))
+        self.assertAlmostEqual(solver.final_grade(prepared, 100), stats.max_grade_possible(course.assessments))
+
+    def test_cache_recomputes_the_course_when_a_final_changes(self):
+        courses = courses_from_json(course_data([None] * 3, [None] * 3, [60, 70, 80], [None]))
+        cache = StatsCache(courses)
+        before = cache.entries("Math 101")["Assignment"]["average"]
+
+        courses["Math 101"].assessments["Final"].set(0, 85)
+        cache.invalidate("Math 101", "Final")
+
+        self.assertAlmostEqual(before, 70)
+        self.assertAlmostEqual(cache.entries("Math 101")["Assignment"]["average"], (85 + 70 + 80) / 3)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+from unittest import mock
+
+from tests.helpers import make_data
+from utils import drops
+from utils import engine
+from utils import stats
+from utils.models import courses_from_json
+
+def sample_courses() -> dict:
+    data = make_data(30)
+    # nothing graded yet
+    for assessment in data["Course 1"]["assessments"].values():
+        assessment["grades"] = [None] * len(assessment["grades"])
+    # everything graded
+    for assessment in data["Course 2"]["assessments"].values():
+        assessment["grades"] = [50.0 + i for i in range(len(assessment["grades"]))]
+    # fewer grades than drops
+    data["Course 3"]["assessments"]["Quiz"]["grades"] = [None] * 10 + [70.0, 90.0]
+    data["Course 4"]["assessments"]["Midterm"]["drops"] = {
+        "policy": "replace-lowest-with-final", "final": "Final"
+    }
+    return courses_from_json(data)
+
+class SummarizeTest(unittest.TestCase):
+    def assert_matches_stats(self, summaries: dict, courses: dict):
+        for name, course in courses.items():
+            summary = summaries[name]
+            assessments = course.assessments
+            achieved_weighted_sum, remaining_fraction_sum = stats.needed_sums(assessments)
+
+            with self.subTest(course = name):
+                self.assertAlmostEqual(summary["weighted_average"], stats.total_weighted_average(assessments))
+                self.assertAlmostEqual(summary["achieved"], stats.total_achieved(assessments))
+                self.assertAlmostEqual(summary["graded_weight"], stats.total_graded_weight(assessments))
+                self.assertAlmostEqual(summary["achieved_weighted_sum"], achieved_weighted_sum)
+                self.assertAlmostEqual(summary["remaining_fraction_sum"], remaining_fraction_sum)
+
+            for assessment_name, a in drops.resolve(assessments).items():
+                entry = summary["assessments"][assessment_name]
+                kept, _dropped = stats.filter_dropped(a)
+
+                with self.subTest(course = name, assessment = assessment_name):
+                    self.assertAlmostEqual(entry["achieved"], stats.achieved_weight(a))
+                    self.assertAlmostEqual(entry["average"], stats.interim_weight(kept))
+                    self.assertAlmostEqual(entry["graded_weight"], stats.graded_weight(a))
+                    self.assertEqual(entry["graded"], len(stats.filter_ungraded(a.grades)))
+
+    @unittest.skipUnless(engine.HAS_NUMPY, "NumPy is not installed")
+    def test_numpy_summary_matches_stats(self):
+        courses = sample_courses()
+        self.assert_matches_stats(engine.summarize(courses), courses)
+
+    def test_python_summary_matches_stats(self):
+        courses = sample_courses()
+        with mock.patch.object(engine, "HAS_NUMPY", False):
+            summaries = engine.summarize(courses)
+        self.assert_matches_stats(summaries, courses)
+
+    def test_combined_entries_match_the_summary(self):
+        courses = sample_courses()
+        for name, summary in engine.summarize(courses).items():
+            combined = engine.combine(summary["assessments"])
+            for key in ("weighted_average", "achieved", "graded_weight"):
+                with self.subTest(course = name, total = key):
+                    self.assertAlmostEqual(combined[key], summary[key])
+
+if __name__ == "__main__":
+    unittest.main()
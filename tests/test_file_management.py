@@ -0,0 +1,37 @@
+import os
+import io
+import gzip
+import json
+import unittest
+from contextlib import redirect_stdout
+
+from tests.helpers import DATA, DataDirTestCase
+from utils import file_management as files
+
+class LoadDataTest(DataDirTestCase):
+    def test_corrupted_gzip_payload_is_moved_aside(self):
+        content = bytearray(gzip.compress(json.dumps(DATA).encode()))
+        # an invalid deflate block type, right after the 10 byte gzip header
+        content[10] = 0x07
+        filepath = os.path.join("data", "Example.json.gz")
+        with open(filepath, 'wb') as f:
+            f.write(content)
+
+        with redirect_stdout(io.StringIO()) as output:
+            data = files.load_data(filepath)
+
+        self.assertIsNone(data)
+        self.assertIn("Could not decompress data file", output.getvalue())
+        self.assertFalse(os.path.exists(filepath))
+        self.assertTrue(os.path.exists(os.path.join("data", "corrupt", "Example(corrupt).json.gz")))
+
+    def test_compressed_data_is_loaded(self):
+        filepath = os.path.join("data", "Example.json.gz")
+        with open(filepath, 'wb') as f:
+            f.write(gzip.compress(json.dumps(DATA).encode()))
+
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(files.load_data(filepath), DATA)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,19 @@
+import unittest
+
+from tests.helpers import DataDirTestCase, make_data
+from utils import history
+
+class RecordTest(DataDirTestCase):
+    def test_record_of_changed_courses_matches_full_record(self):
+        data = make_data(10)
+        base = history.record("Example", data)
+
+        data["Course 3"]["assessments"]["Final"]["grades"] = [12.0]
+        version_hash = history.record("Example", data, {"Course 3"}, base)
+
+        self.assertEqual(history.reconstruct("Example", version_hash), data)
+        self.assertEqual(history.record("Example", data), version_hash)
+        self.assertEqual(len(history.versions("Example")), 2)
+
+if __name__ == "__main__":
+    unittest.main()
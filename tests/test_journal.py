@@ -0,0 +1,102 @@
+import io
+import json
+import unittest
+from contextlib import redirect_stdout
+
+from tests.helpers import DataDirTestCase, make_data
+from utils import file_management as files
+from utils import journal
+
+class ReplayTest(unittest.TestCase):
+    def test_records_are_applied_in_order(self):
+        data = make_data(1)
+        skipped = journal.replay(data, [
+            {"op": "grade", "course": "Course 0", "assessment": "Final", "index": 0, "grade": 40.0},
+            {"op": "grade", "course": "Course 0", "assessment": "Final", "index": 0, "grade": 75.0},
+            {"op": "scale", "course": "Course 0", "letter": "A", "minimum": 85},
+            {"op": "dropped", "course": "Course 0", "assessment": "Quiz", "dropped": 1},
+        ])
+
+        course = data["Course 0"]
+        self.assertEqual(skipped, 0)
+        self.assertEqual(course["assessments"]["Final"]["grades"], [75.0])
+        self.assertEqual(course["scale"]["A"], 85)
+        self.assertEqual(course["assessments"]["Quiz"]["dropped"], 1)
+
+    def test_records_that_no_longer_fit_are_skipped(self):
+        data = make_data(1)
+        expected = json.loads(json.dumps(data))
+        skipped = journal.replay(data, [
+            {"op": "grade", "course": "Course 9", "assessment": "Final", "index": 0, "grade": 40.0},
+            {"op": "grade", "course": "Course 0", "assessment": "Final", "index": 1, "grade": 40.0},
+            {"op": "grade", "course": "Course 0", "assessment": "Final", "index": 0, "grade": "40"},
+            {"op": "scale", "course": "Course 0", "letter": "E", "minimum": 40},
+            {"op": "rename", "course": "Course 0"},
+        ])
+
+        self.assertEqual(skipped, 5)
+        self.assertEqual(data, expected)
+
+class JournalTest(DataDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.data = make_data(3)
+        with redirect_stdout(io.StringIO()):
+            files.write_data(self.data, "Example")
+
+    def recovered(self) -> dict:
+        with redirect_stdout(io.StringIO()):
+            return files.recover_journal(files.load_data(files.data_filepath("Example")), "Example")
+
+    def test_committed_records_are_replayed_on_load(self):
+        edits = journal.Journal("Example")
+        edits.grade("Course 1", "Final", 0, 12.0)
+        edits.commit()
+        edits.close()
+        self.data["Course 1"]["assessments"]["Final"]["grades"] = [12.0]
+
+        self.assertEqual(self.recovered(), self.data)
+
+    def test_partial_last_record_is_dropped(self):
+        edits = journal.Journal("Example")
+        edits.grade("Course 1", "Final", 0, 12.0)
+        edits.commit()
+        edits.file.write(b'{"op":"grade","cour')
+        edits.close()
+
+        edits = journal.Journal("Example")
+        committed, uncommitted, committed_size, size = journal.read("Example")
+        self.assertEqual(len(committed), 1)
+        self.assertEqual(uncommitted, [])
+        self.assertEqual(committed_size, size)
+        self.assertEqual(edits.num_records, 1)
+        edits.close()
+
+    def test_compaction_keeps_records_appended_since(self):
+        edits = journal.Journal("Example")
+        for i in range(journal.COMPACT_THRESHOLD):
+            edits.grade("Course 0", "Final", 0, float(i))
+        edits.commit()
+        self.assertTrue(edits.needs_compaction())
+        size = edits.committed_size
+
+        # the data file is written with the committed records,
+        # while another edit is made
+        self.data["Course 0"]["assessments"]["Final"]["grades"] = [float(journal.COMPACT_THRESHOLD - 1)]
+        with redirect_stdout(io.StringIO()):
+            files.write_data(self.data, "Example")
+        edits.grade("Course 2", "Final", 0, 12.0)
+        edits.commit()
+        edits.forget(size)
+        self.assertFalse(edits.needs_compaction())
+        edits.close()
+
+        committed, uncommitted, _committed_size, _size = journal.read("Example")
+        self.assertEqual([record["course"] for record in committed], ["Course 2"])
+        self.assertEqual(uncommitted, [])
+
+        self.data["Course 2"]["assessments"]["Final"]["grades"] = [12.0]
+        self.assertEqual(self.recovered(), self.data)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import io
+import unittest
+from contextlib import redirect_stdout
+
+from tests.helpers import DataDirTestCase, make_data
+from utils import engine
+from utils import file_management as files
+from utils import journal
+from utils import manifest
+from utils.models import courses_from_json
+
+class DescribeTest(DataDirTestCase):
+    def test_save_of_dirty_courses_matches_full_description(self):
+        data = make_data(20)
+        with redirect_stdout(io.StringIO()):
+            files.write_data(data, "Example")
+
+        # an edit journaled in an earlier session, and one made since
+        edits = journal.Journal("Example")
+        edits.grade("Course 3", "Final", 0, 12.0)
+        edits.commit()
+        edits.close()
+        data["Course 3"]["assessments"]["Final"]["grades"] = [12.0]
+        data["Course 9"]["assessments"]["Final"]["grades"] = [99.0]
+
+        with redirect_stdout(io.StringIO()):
+            files.write_data(data, "Example", {"Course 9"})
+
+        filepath = os.path.join("data", "Example.json")
+        with open(filepath, 'rb') as f:
+            expected = manifest.describe(filepath, f.read(), data)
+        described = manifest.read()["Example"]
+        described.pop("version")
+        self.assertEqual(described, expected)
+
+    def test_totals_match_the_stats_engine(self):
+        data = make_data(20)
+        for assessment in data["Course 2"]["assessments"].values():
+            assessment["grades"] = [None] * len(assessment["grades"])
+        data["Course 5"]["assessments"]["Midterm"]["drops"] = {
+            "policy": "replace-lowest-with-final", "final": "Final"
+        }
+
+        totals = manifest._totals(data)
+        summaries = engine.summarize(courses_from_json(data))
+
+        self.assertIsNone(totals["Course 2"][2])
+        for course, (_graded, _grades, average) in totals.items():
+            if average is not None:
+                self.assertAlmostEqual(average, summaries[course]["weighted_average"])
+
+if __name__ == "__main__":
+    unittest.main()
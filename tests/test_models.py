@@ -0,0 +1,68 @@
+import unittest
+
+from utils.models import Course, GradeScale
+
+MINIMUMS = {"A+": 90, "A": 80, "A-": 80, "B": 70, "P": 0, "F": 0}
+
+def scan_letter(minimums: dict, grade: float) -> str | None:
+    '''The letter grade found by scanning the whole scale.'''
+    letter_grade = None
+    maximum = 0
+    for letter, value in minimums.items():
+        if grade >= value and value > maximum:
+            maximum = value
+            letter_grade = letter
+    return letter_grade
+
+class GradeScaleTest(unittest.TestCase):
+    def test_letter_matches_a_scan_of_the_scale(self):
+        scale = GradeScale(MINIMUMS)
+        for grade in (-5, 0, 0.5, 69.99, 70, 79.5, 80, 85, 90, 100, 120):
+            with self.subTest(grade = grade):
+                self.assertEqual(scale.letter(grade), scan_letter(MINIMUMS, grade))
+
+    def test_first_of_equal_minimums_is_earned(self):
+        scale = GradeScale(MINIMUMS)
+        self.assertEqual(scale.letter(80), "A")
+        self.assertEqual(scale.next_letter(75), ("A", 5))
+
+    def test_minimum_of_zero_is_never_earned(self):
+        scale = GradeScale(MINIMUMS)
+        self.assertIsNone(scale.letter(0))
+        self.assertIsNone(scale.letter(50))
+        self.assertEqual(scale.next_letter(0), ("B", 70))
+        self.assertEqual(scale.next_letter(-10), ("B", 80))
+
+    def test_next_letter_above_the_highest(self):
+        scale = GradeScale(MINIMUMS)
+        self.assertEqual(scale.next_letter(89), ("A+", 1))
+        self.assertIsNone(scale.next_letter(90))
+
+    def test_setting_a_minimum_rebuilds_the_lookup(self):
+        scale = GradeScale(MINIMUMS)
+        scale["A-"] = 75
+        self.assertEqual(scale.letter(77), "A-")
+        self.assertEqual(scale.next_letter(72), ("A-", 3))
+        self.assertEqual(scale.descending()[:3], [("A+", 90), ("A", 80), ("A-", 75)])
+
+class ConvertersTest(unittest.TestCase):
+    def test_json_round_trip_keeps_every_key(self):
+        data = {
+            "assessments": {
+                "Quiz": {
+                    "weight": 40, "amount": 3, "dropped": 1, "grades": [85, None, 72.5],
+                    "drops": {"policy": "replace-lowest-with-final", "final": "Final"}
+                },
+                "Final": {"weight": 60, "amount": 1, "dropped": 0, "grades": [None]},
+            },
+            "scale": {"A": 80, "B": 70},
+            "term": "Fall"
+        }
+        converted = Course.from_json(data).to_json()
+
+        self.assertEqual(converted, data)
+        # grades are written back as floats
+        self.assertIs(type(converted["assessments"]["Quiz"]["grades"][0]), float)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+
+from tests.helpers import make_data
+from utils import solver
+from utils import stats
+from utils.models import courses_from_json
+
+def quiz_course(grades: list) -> dict:
+    return courses_from_json({
+        "Math 101": {
+            "assessments": {
+                "Quiz": {"weight": 40, "amount": len(grades), "dropped": 2, "grades": grades},
+                "Final": {"weight": 60, "amount": 1, "dropped": 0, "grades": [None]},
+            },
+            "scale": {"A": 80}
+        }
+    })["Math 101"].assessments
+
+class SolveTest(unittest.TestCase):
+    def test_final_grade_matches_stats(self):
+        for name, course in courses_from_json(make_data(20)).items():
+            prepared = solver.prepare(course.assessments)
+            for remaining_grade in (0, 12.5, 40, 55.5, 70, 99.9, 100):
+                with self.subTest(course = name, remaining_grade = remaining_grade):
+                    self.assertAlmostEqual(
+                        solver.final_grade(prepared, remaining_grade),
+                        stats.final_grade(course.assessments, remaining_grade)
+                    )
+
+    def test_needed_grade_reaches_the_target_exactly(self):
+        for name, course in courses_from_json(make_data(20)).items():
+            prepared = solver.prepare(course.assessments)
+            low, high = stats.grade_bounds(course.assessments)
+            for target in (50, 60, 70, 80):
+                needed = solver.solve(prepared, target)
+                with self.subTest(course = name, target = target):
+                    if target < low:
+                        self.assertLessEqual(needed, 0)
+                    elif target > high:
+                        self.assertGreater(needed, 100)
+                    else:
+                        self.assertAlmostEqual(stats.final_grade(course.assessments, needed), target)
+
+    def test_pending_grades_that_could_be_dropped(self):
+        # low remaining quizzes are dropped instead of the graded ones,
+        # which the linear estimate does not account for
+        assessments = quiz_course([90, 90, 90, None, None, None])
+        needed = solver.solve(solver.prepare(assessments), 50)
+
+        self.assertAlmostEqual(stats.final_grade(assessments, needed), 50)
+        self.assertLess(needed, stats.needed_for_target(assessments, 50) - 10)
+
+    def test_unreachable_and_achieved_targets(self):
+        assessments = quiz_course([0, 0, 0, 0, None, None])
+        prepared = solver.prepare(assessments)
+
+        self.assertGreater(solver.solve(prepared, 100), 100)
+        self.assertLessEqual(solver.solve(prepared, 0), 0)
+
+    def test_nothing_remaining(self):
+        assessments = quiz_course([50, 60, 70, 80])
+        assessments["Final"].set(0, 90)
+
+        self.assertIsNone(solver.solve(solver.prepare(assessments), 80))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+import os
+import io
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+from tests.helpers import DataDirTestCase, make_data
+from utils.storage import SqliteStorage
+
+class SqliteStorageTest(DataDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.storage = SqliteStorage()
+
+    def tearDown(self):
+        self.storage.db.close()
+
+    def test_invalid_data_is_restored_from_backup(self):
+        data = make_data(3)
+        self.storage.write("Example", data)
+        # the second write backs up the first
+        self.storage.write("Example", data)
+        with self.storage.db:
+            self.storage.db.execute("UPDATE assessments SET weight = 'invalid'")
+
+        with redirect_stdout(io.StringIO()) as output, mock.patch("builtins.input", return_value="y"):
+            loaded = self.storage.load("Example")
+
+        self.assertEqual(loaded, data)
+        self.assertEqual(self.storage.export_data("Example"), data)
+        self.assertIn("Restored data from the backup", output.getvalue())
+        self.assertTrue(os.path.exists(os.path.join("data", "corrupt", "Example(corrupt).json")))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import os
+import io
+import gzip
+import json
+import unittest
+from contextlib import redirect_stdout
+
+from tests.helpers import DATA, DataDirTestCase, make_data
+from utils import sync
+from utils.storage import JsonStorage
+
+class SyncTest(DataDirTestCase):
+    def setUp(self):
+        super().setUp()
+        os.mkdir("usb")
+        self.storage = JsonStorage()
+
+    def write_here(self, data: dict):
+        with redirect_stdout(io.StringIO()):
+            self.storage.write("Example", data)
+
+    def write_there(self, data: dict):
+        sync.write_remote("usb", "Example", data)
+
+    def read_here(self) -> dict:
+        with redirect_stdout(io.StringIO()):
+            return self.storage.load("Example")
+
+    def read_there(self) -> dict:
+        return sync.read_remote("usb", "Example")
+
+    def sync(self, prefer: str | None = None) -> list[tuple[str, str, str]]:
+        with redirect_stdout(io.StringIO()):
+            changes, _received = sync.sync(self.storage, "usb", prefer = prefer)
+        return changes
+
+    def synced_data(self) -> dict:
+        '''Writes the same data on both sides, and syncs them once.'''
+        data = make_data(2)
+        self.write_here(data)
+        self.write_there(data)
+        self.assertEqual(self.sync(), [])
+        return data
+
+    def test_data_on_one_side_is_sent(self):
+        data = make_data(2)
+        self.write_here(data)
+
+        self.assertEqual(self.sync(), [
+            ("Example", "Course 0", sync.SENT),
+            ("Example", "Course 1", sync.SENT),
+        ])
+        self.assertEqual(self.read_there(), data)
+
+    def test_course_changed_there_is_received(self):
+        data = self.synced_data()
+        data["Course 1"]["assessments"]["Final"]["grades"] = [12.0]
+        self.write_there(data)
+
+        self.assertEqual(self.sync(), [("Example", "Course 1", sync.RECEIVED)])
+        self.assertEqual(self.read_here(), data)
+
+    def test_course_changed_here_is_sent(self):
+        data = self.synced_data()
+        data["Course 0"]["assessments"]["Final"]["grades"] = [12.0]
+        self.write_here(data)
+
+        self.assertEqual(self.sync(), [("Example", "Course 0", sync.SENT)])
+        self.assertEqual(self.read_there(), data)
+
+    def test_course_removed_on_one_side_is_removed_on_the_other(self):
+        data = self.synced_data()
+        del data["Course 0"]
+        self.write_there(data)
+
+        self.assertEqual(self.sync(), [("Example", "Course 0", sync.REMOVED_HERE)])
+        self.assertEqual(self.read_here(), data)
+
+    def test_course_changed_on_both_sides_is_a_conflict(self):
+        data = self.synced_data()
+        here = json.loads(json.dumps(data))
+        here["Course 0"]["assessments"]["Final"]["grades"] = [12.0]
+        self.write_here(here)
+        there = json.loads(json.dumps(data))
+        there["Course 0"]["assessments"]["Final"]["grades"] = [34.0]
+        self.write_there(there)
+
+        # left as it is on both sides, until a side is preferred
+        for _ in range(2):
+            self.assertEqual(self.sync(), [("Example", "Course 0", sync.CONFLICT)])
+            self.assertEqual(self.read_here(), here)
+            self.assertEqual(self.read_there(), there)
+
+        self.assertEqual(self.sync(sync.THERE), [("Example", "Course 0", sync.RECEIVED)])
+        self.assertEqual(self.read_here(), there)
+        self.assertEqual(self.sync(), [])
+
+    def test_conflict_is_sent_when_here_is_preferred(self):
+        data = self.synced_data()
+        here = json.loads(json.dumps(data))
+        del here["Course 1"]
+        self.write_here(here)
+        there = json.loads(json.dumps(data))
+        there["Course 1"]["assessments"]["Final"]["grades"] = [34.0]
+        self.write_there(there)
+
+        self.assertEqual(self.sync(sync.HERE), [("Example", "Course 1", sync.REMOVED_THERE)])
+        self.assertEqual(self.read_there(), here)
+
+    def test_corrupted_remote_file_is_skipped(self):
+        content = bytearray(gzip.compress(json.dumps(DATA).encode()))
+        # an invalid deflate block type, right after the 10 byte gzip header
+        content[10] = 0x07
+        with open(os.path.join("usb", "Broken.json.gz"), 'wb') as f:
+            f.write(content)
+        with open(os.path.join("usb", "Other.json"), 'w') as f:
+            json.dump(DATA, f)
+
+        with self.assertRaises(sync.SyncError):
+            sync.read_remote("usb", "Broken")
+
+        self.assertEqual(self.sync(), [("Other", "Math 101", sync.RECEIVED)])
+
+if __name__ == "__main__":
+    unittest.main()
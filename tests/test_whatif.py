@@ -0,0 +1,61 @@
+import unittest
+
+from tests.helpers import make_data
+from utils import engine
+from utils import solver
+from utils import whatif
+from utils.cache import StatsCache
+from utils.models import courses_from_json
+
+class OverlayTest(unittest.TestCase):
+    def test_overlay_leaves_the_assessment_unchanged(self):
+        assessment = courses_from_json(make_data(1))["Course 0"].assessments["Quiz"]
+        before = assessment.grade_list()
+
+        changed = whatif.overlay(assessment, {0: 12.0, 1: None})
+
+        self.assertEqual(assessment.grade_list(), before)
+        self.assertEqual(changed.grade_list(), [12.0, None, *before[2:]])
+        self.assertIsNot(changed.grades, assessment.grades)
+
+class EvaluateTest(unittest.TestCase):
+    def test_scenarios_leave_the_course_and_cache_unchanged(self):
+        data = make_data(2)
+        courses = courses_from_json(data)
+        cache = StatsCache(courses)
+        summary = cache.summary("Course 0")
+
+        scenarios = [{"Final": {0: 100.0}}, {"Final": {0: 0.0}, "Quiz": {0: None}}]
+        whatif.evaluate(cache, "Course 0", scenarios)
+
+        self.assertEqual(courses["Course 0"].to_json(), courses_from_json(data)["Course 0"].to_json())
+        self.assertEqual(cache.summary("Course 0"), summary)
+
+    def test_scenarios_match_a_changed_course(self):
+        courses = courses_from_json(make_data(2))
+        cache = StatsCache(courses)
+        scenarios = [{"Final": {0: 100.0}}, {"Final": {0: 0.0}, "Quiz": {0: None, 3: 55.0}}]
+
+        for scenario, result in zip(scenarios, whatif.evaluate(cache, "Course 0", scenarios)):
+            changed = courses_from_json(make_data(2))["Course 0"]
+            for name, changes in scenario.items():
+                for i, grade in changes.items():
+                    changed.assessments[name].set(i, grade)
+            expected = engine.summarize({"": changed})[""]
+            prepared = solver.prepare(changed.assessments)
+
+            with self.subTest(scenario = scenario):
+                self.assertAlmostEqual(result["weighted_average"], expected["weighted_average"])
+                self.assertAlmostEqual(result["achieved"], expected["achieved"])
+                for letter, minimum in changed.scale.items():
+                    self.assertAlmostEqual(result["needed"][letter], solver.solve(prepared, minimum))
+
+    def test_unknown_grades_are_rejected(self):
+        cache = StatsCache(courses_from_json(make_data(1)))
+        with self.assertRaises(whatif.ScenarioError):
+            whatif.evaluate(cache, "Course 0", [{"Exam": {0: 50.0}}])
+        with self.assertRaises(whatif.ScenarioError):
+            whatif.evaluate(cache, "Course 0", [{"Final": {1: 50.0}}])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+'''
+Multi-semester archive.
+
+data/archive.zip packs many data sets into one file. Each data set is
+stored as <name>/index.json, listing its courses in order, and one
+member per course, <name>/<position>.json, in the data file format.
+The zip's central directory at the end of the file holds the offset
+of every member, so a single course is read and decompressed without
+reading the rest of the archive.
+'''
+import io
+import os
+import json
+import zipfile
+
+from utils import file_management as files
+from utils.validation import parse_data
+
+ARCHIVE_PATH = os.path.join("data", "archive.zip")
+
+INDEX = "index.json"
+
+class ArchiveError(Exception): pass
+
+class Archive:
+    '''The archive file, opened once and read as needed.'''
+    def __init__(self, path = ARCHIVE_PATH):
+        self.path = path
+        self._zip = None
+        self._indexes = {}
+
+    @property
+    def zip(self) -> zipfile.ZipFile | None:
+        '''The open archive, or None if there is none.'''
+        if self._zip is None and os.path.exists(self.path):
+            try:
+                self._zip = zipfile.ZipFile(self.path)
+            except (OSError, zipfile.BadZipFile) as e:
+                raise ArchiveError(f"Could not open {self.path}: {e}")
+        return self._zip
+
+    def close(self):
+        if self._zip is not None:
+            self._zip.close()
+        self._zip = None
+        self._indexes = {}
+
+    def names(self) -> list[str]:
+        '''Returns the names of the archived data sets.'''
+        if self.zip is None:
+            return []
+        suffix = "/" + INDEX
+        return sorted(
+            member[:-len(suffix)] for member in self.zip.namelist()
+            if member.endswith(suffix)
+        )
+
+    def courses(self, name: str) -> list[str]:
+        '''Returns the names of an archived data set's courses, in order.'''
+        courses = self._indexes.get(name)
+        if courses is None:
+            try:
+                index = json.loads(self._read(f"{name}/{INDEX}"))
+                courses = index["courses"]
+                if not all(isinstance(course, str) for course in courses):
+                    raise TypeError("course names must be strings")
+            except (ValueError, KeyError, TypeError) as e:
+                raise ArchiveError(f"Invalid index for {name} in {self.path}: {e}")
+            self._indexes[name] = courses
+        return courses
+
+    def read_course(self, name: str, course: str) -> dict:
+        '''
+        Reads and validates one course of an archived data set.
+        Returns it as data with only that course.
+        '''
+        courses = self.courses(name)
+        if course not in courses:
+            raise ArchiveError(f"No course named {course} in archived {name}")
+
+        data, error = parse_data(self._read(f"{name}/{courses.index(course)}.json"))
+        if error is None and list(data) != [course]:
+            error = f"expected only {course}"
+        if error is not None:
+            raise ArchiveError(f"Invalid data for {course} in archived {name}:\n\n{error}")
+        return data
+
+    def read(self, name: str) -> dict:
+        '''Reads and validates every course of an archived data set.'''
+        data = {}
+        for course in self.courses(name):
+            data.update(self.read_course(name, course))
+        return data
+
+    def pack(self, name: str, data: dict):
+        '''
+        Adds valid data to the archive, replacing the data set of the
+        same name. The archive is rewritten and moved into place, so an
+        interrupted write leaves the previous archive intact.
+        '''
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as packed:
+            if self.zip is not None:
+                for info in self.zip.infolist():
+                    if not info.filename.startswith(f"{name}/"):
+                        packed.writestr(info, self.zip.read(info))
+
+            packed.writestr(f"{name}/{INDEX}", json.dumps({"courses": list(data)}))
+            for i, (course, course_data) in enumerate(data.items()):
+                packed.writestr(
+                    f"{name}/{i}.json",
+                    json.dumps({course: course_data}, separators=(",", ":"))
+                )
+
+        self.close()
+        files.atomic_write(self.path, buffer.getvalue())
+
+    def _read(self, member: str) -> bytes:
+        if self.zip is None:
+            raise ArchiveError(f"No archive found at {self.path}")
+        try:
+            return self.zip.read(member)
+        except KeyError:
+            raise ArchiveError(f"Missing {member} in {self.path}")
+        except (OSError, zipfile.BadZipFile) as e:
+            raise ArchiveError(f"Could not read {member} from {self.path}: {e}")
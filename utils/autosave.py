@@ -0,0 +1,59 @@
+'''
+Debounced background autosave.
+
+Edits only note the time they were made. A background thread waits
+until no edits have been made for DELAY seconds, then saves once,
+so bursts of edits are coalesced into one save and commands never
+wait on the disk.
+'''
+import threading
+import time
+from typing import Callable
+
+# seconds without edits before changes are saved
+DELAY = 2.0
+
+class Autosaver:
+    '''Calls save on a background thread once edits have stopped for delay seconds.'''
+    def __init__(self, save: Callable[[], None], delay = DELAY):
+        self.save = save
+        self.delay = delay
+        self._condition = threading.Condition()
+        self._last_edit = None
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="autosave", daemon=True)
+        self._thread.start()
+
+    def touch(self):
+        '''Notes an edit, postponing the save.'''
+        with self._condition:
+            self._last_edit = time.monotonic()
+            self._condition.notify()
+
+    def stop(self):
+        '''Stops the thread. Edits that have not been saved yet are not saved.'''
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                # wait for an edit, then for edits to stop
+                while not self._stopped:
+                    if self._last_edit is None:
+                        self._condition.wait()
+                        continue
+                    remaining = self._last_edit + self.delay - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+
+                if self._stopped:
+                    return
+                self._last_edit = None
+
+            try:
+                self.save()
+            except Exception as e:
+                print(f"\nERROR: Autosave failed: {e}")
@@ -0,0 +1,161 @@
+from utils import drops
+from utils import engine
+from utils import solver
+from utils import stats
+from utils.models import Course
+
+class StatsCache:
+    '''
+    Memoizes the stats of loaded courses.
+
+    Per-assessment entries (see engine.summarize) and drop masks
+    are stored until the assessment changes, or any assessment of a
+    course with drop policies (see drops.resolve). Course totals, grade
+    bounds and target solvers are stored until the course changes, and letter grades
+    until the course or its scale changes.
+    '''
+    def __init__(self, courses: dict[str, Course]):
+        self.courses = courses
+        self.clear()
+
+    def clear(self):
+        self._assessments = {}
+        self._drops = {}
+        self._summaries = {}
+        self._letters = {}
+        self._bounds = {}
+        self._solvers = {}
+
+    # ============ #
+    # Invalidation #
+    # ============ #
+
+    def invalidate(self, course: str, assessment: str | None = None):
+        '''
+        Forgets the stats of an assessment after its grades or
+        drop policy change, or of every assessment in the course
+        if none is given.
+        '''
+        # drop policies span the assessments of a course
+        if assessment is None or drops.has_policies(self.courses[course].assessments):
+            names = list(self.courses[course].assessments)
+        else:
+            names = [assessment]
+
+        for name in names:
+            self._assessments.pop((course, name), None)
+            self._drops.pop((course, name), None)
+
+        self._summaries.pop(course, None)
+        self._letters.pop(course, None)
+        self._bounds.pop(course, None)
+        self._solvers.pop(course, None)
+
+    def invalidate_scale(self, course: str):
+        '''Forgets the letter grades of a course after its scale changes.'''
+        self._letters.pop(course, None)
+
+    # ======= #
+    # Lookups #
+    # ======= #
+
+    def summary(self, course: str) -> dict:
+        '''Returns the summary of a course (see engine.summarize).'''
+        return self.summaries([course])[course]
+
+    def summaries(self, courses: list[str] | None = None) -> dict[str, dict]:
+        '''
+        Returns the summaries of the given courses, or all courses.
+        Stale assessments of every course are recomputed in one engine pass.
+        '''
+        if courses is None:
+            courses = list(self.courses)
+
+        self._fill(courses)
+
+        summaries = {}
+        for course in courses:
+            summary = self._summaries.get(course)
+            if summary is None:
+                summary = engine.combine(self._entries(course))
+                self._summaries[course] = summary
+            summaries[course] = summary
+
+        return summaries
+
+    def entries(self, course: str) -> dict[str, dict]:
+        '''Returns the entry of each assessment in a course (see engine.summarize).'''
+        self._fill([course])
+        return self._entries(course)
+
+    def letters(self, course: str) -> dict[str, str | None]:
+        '''Returns the letter grades of a course's weighted average and achieved totals.'''
+        letters = self._letters.get(course)
+        if letters is None:
+            summary = self.summary(course)
+            data = self.courses[course]
+            letters = {
+                "weighted_average": data.scale.letter(summary["weighted_average"]),
+                "achieved": data.scale.letter(summary["achieved"]),
+            }
+            self._letters[course] = letters
+        return letters
+
+    def drops(self, course: str, assessment: str) -> tuple[list, list]:
+        '''Returns the kept and dropped grades of an assessment (see stats.filter_dropped).'''
+        data = drops.resolve(self.courses[course].assessments)[assessment]
+        return drops.split(data.grades, self.drop_mask(course, assessment))
+
+    def drop_mask(self, course: str, assessment: str) -> list[bool]:
+        '''Returns which grades of an assessment are dropped (see drops.drop_lowest).'''
+        key = (course, assessment)
+        mask = self._drops.get(key)
+        if mask is None:
+            data = drops.resolve(self.courses[course].assessments)[assessment]
+            mask = drops.drop_lowest(data)
+            self._drops[key] = mask
+        return mask
+
+    def bounds(self, course: str) -> tuple[float, float]:
+        '''Returns the minimum and maximum grades achievable in a course (see stats.grade_bounds).'''
+        bounds = self._bounds.get(course)
+        if bounds is None:
+            bounds = stats.grade_bounds(self.courses[course].assessments)
+            self._bounds[course] = bounds
+        return bounds
+
+    def solver(self, course: str) -> dict:
+        '''Returns the prepared target solver of a course (see solver.prepare).'''
+        prepared = self._solvers.get(course)
+        if prepared is None:
+            prepared = solver.prepare(self.courses[course].assessments)
+            self._solvers[course] = prepared
+        return prepared
+
+    def _entries(self, course: str) -> dict[str, dict]:
+        return {
+            name: self._assessments[(course, name)]
+            for name in self.courses[course].assessments
+        }
+
+    def _fill(self, courses: list[str]):
+        '''Computes every missing assessment entry of the given courses.'''
+        stale = {}
+        for course in courses:
+            assessments = {
+                name: data
+                for name, data in self.courses[course].assessments.items()
+                if (course, name) not in self._assessments
+            }
+            if assessments and drops.has_policies(self.courses[course].assessments):
+                # invalidated together, and computed with the whole course
+                stale[course] = self.courses[course]
+            elif assessments:
+                stale[course] = Course(assessments, self.courses[course].scale)
+
+        if not stale:
+            return
+
+        for course, summary in engine.summarize(stale).items():
+            for name, entry in summary["assessments"].items():
+                self._assessments[(course, name)] = entry
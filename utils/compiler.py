@@ -0,0 +1,146 @@
+'''
+Bulk compilation of outlines.
+
+Every outline in outlines/ is parsed and validated in a pool of worker
+processes, one per core by default, so compiling the outlines of a
+whole program scales with the number of cores. The data is then written
+by the calling process, which owns the storage, and the errors of every
+outline are gathered into one report.
+
+Usage (from the repository root): python -m utils.compiler [overwrite]
+'''
+import os
+import sys
+import glob
+from concurrent.futures import ProcessPoolExecutor
+
+import jsonschema
+from tabulate import tabulate
+
+from utils import file_management as files
+from utils.outline_parser import OutlineParser, OutlineParseError
+from utils.storage import from_env
+from utils.validation import validate_outline
+
+# below this many outlines, starting the workers costs more than it saves
+MIN_PARALLEL = 8
+
+def list_outlines() -> list[str]:
+    '''Returns the filenames of the outlines in outlines/.'''
+    return sorted(os.path.basename(path) for path in glob.glob("outlines/*.txt"))
+
+def compile_outline(filename) -> tuple[dict | None, str | None]:
+    '''
+    Parses and validates an outline in outlines/.
+    Returns its data, or None and the reason it is invalid.
+    '''
+    parser = OutlineParser()
+    try:
+        data = parser.parse_file(filename)
+    except OutlineParseError as e:
+        return None, f"Line {parser.line_num}: {e}"
+    except (KeyError, ValueError):
+        return None, f"Line {parser.line_num}: Invalid syntax: '{parser.line}'"
+    except OSError as e:
+        return None, f"Could not read the outline: {e}"
+
+    error = validate_outline(data)
+    if isinstance(error, jsonschema.ValidationError):
+        field = " -> ".join(str(x) for x in error.path) if error.path else "Root"
+        return None, f"Invalid format in '{field}': {error.message}"
+    if error is not None:
+        return None, str(error)
+    return data, None
+
+def compile_outlines(
+    filenames: list[str],
+    workers: int | None = None
+) -> dict[str, tuple[dict | None, str | None]]:
+    '''
+    Compiles outlines (see compile_outline) across worker processes.
+    Returns the result of each outline, by filename, in order.
+    '''
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(filenames) < MIN_PARALLEL:
+        return {filename: compile_outline(filename) for filename in filenames}
+
+    # a few chunks per worker balance the load without a round trip per outline
+    chunksize = max(1, len(filenames) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return dict(zip(
+            filenames,
+            executor.map(compile_outline, filenames, chunksize=chunksize)
+        ))
+
+def compile_all(
+    storage,
+    overwrite = False,
+    loaded: str | None = None,
+    workers: int | None = None
+) -> tuple[list[str], list[str], list[tuple[str, str]]]:
+    '''
+    Compiles every outline in outlines/ and writes the valid ones to the
+    given storage (see utils.storage), named after their outlines.
+    Existing data is only replaced if overwrite is true, and the
+    loaded data never is.
+
+    Returns the names of the data written, the names of the existing
+    data that was skipped, and the invalid outlines with their errors.
+    '''
+    names = {filename: os.path.splitext(filename)[0] for filename in list_outlines()}
+    pending = [
+        filename for filename, name in names.items()
+        if name != loaded and (overwrite or not storage.exists(name))
+    ]
+    skipped = [name for filename, name in names.items() if filename not in pending]
+
+    written = []
+    errors = []
+    for filename, (data, error) in compile_outlines(pending, workers).items():
+        if error is not None:
+            errors.append((filename, error))
+            continue
+
+        name = names[filename]
+        if storage.write(name, data):
+            # edits to overwritten data no longer apply
+            storage.discard_edits(name)
+            written.append(name)
+        else:
+            errors.append((filename, "Could not write its data."))
+
+    return written, skipped, errors
+
+def print_report(written: list[str], skipped: list[str], errors: list[tuple[str, str]]):
+    '''Prints the errors of a bulk compilation, and what was compiled.'''
+    if errors:
+        print(tabulate(
+            errors,
+            headers=["Outline", "Error"],
+            tablefmt="rounded_grid",
+            disable_numparse=True
+        ))
+
+    total = len(written) + len(skipped) + len(errors)
+    if total == 0:
+        print("No outlines found in outlines/.")
+        return
+
+    counts = [f"{len(written)} written"]
+    if skipped:
+        counts.append(f"{len(skipped)} skipped (existing data)")
+    if errors:
+        counts.append(f"{len(errors)} invalid")
+    print(f"Compiled {total} outline{'s' if total != 1 else ''}: {', '.join(counts)}.")
+
+def main(args: list[str]):
+    '''Compiles every outline into the storage named by PYGRADES_STORAGE.'''
+    if args not in ([], ["overwrite"]):
+        print("Usage: python -m utils.compiler [overwrite]")
+        return
+
+    files.setup_dirs()
+    print_report(*compile_all(from_env(), overwrite = args == ["overwrite"]))
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,193 @@
+'''
+Drop selection engine.
+
+Grades are selected with heapq instead of repeated scans, as index
+masks (True where a grade is dropped) rather than lists of values,
+so duplicate grades are never ambiguous.
+
+Assessments can also set a drop policy, stored in JSON as
+"drops": {"policy": <name>, ...options} (see POLICIES). Policies
+span the assessments of a course, so utils.stats, utils.engine and
+utils.solver apply them to the whole course with resolve before
+computing the stats of its assessments.
+'''
+import heapq
+from array import array
+
+from utils.models import Assessment, Course, is_graded
+
+def lowest(grades, num_to_drop: int) -> list[bool]:
+    '''
+    Marks the lowest num_to_drop graded entries.
+    Ties are broken by position, earliest first.
+    '''
+    mask = [False] * len(grades)
+    if num_to_drop <= 0:
+        return mask
+
+    graded = ((grade, i) for i, grade in enumerate(grades) if is_graded(grade))
+    for _grade, i in heapq.nsmallest(num_to_drop, graded):
+        mask[i] = True
+
+    return mask
+
+def drop_count(assessment: Assessment, maximize = True) -> int:
+    '''
+    Returns how many graded items of the assessment are dropped.
+    By default, keeps as many grades as possible.
+    If maximize is false, drops as many as possible.
+    '''
+    grades = assessment.grades
+    num_graded = len(assessment.graded())
+    num_dropped = assessment.dropped
+    if maximize:
+        return max(0, num_graded - (len(grades) - num_dropped))
+    return min(num_dropped, num_graded)
+
+def drop_lowest(assessment: Assessment, maximize = True) -> list[bool]:
+    '''Drops the lowest grades of the assessment (see drop_count).'''
+    return lowest(assessment.grades, drop_count(assessment, maximize))
+
+def split(grades, mask: list[bool]) -> tuple[list, list]:
+    '''Returns the kept and dropped grades, in their original order.'''
+    kept = []
+    dropped = []
+    for grade, is_dropped in zip(grades, mask):
+        if is_dropped:
+            dropped.append(grade)
+        else:
+            kept.append(grade)
+    return kept, dropped
+
+# ============= #
+# Drop Policies #
+# ============= #
+
+def policy(assessment: Assessment) -> dict | None:
+    '''Returns the drop policy set on an assessment, if any.'''
+    return assessment.extra.get("drops") if assessment.extra else None
+
+def has_policies(assessments: dict[str, Assessment]) -> bool:
+    return any(a.extra and "drops" in a.extra for a in assessments.values())
+
+def resolve(assessments: dict[str, Assessment]) -> dict[str, Assessment]:
+    '''
+    Applies the drop policies of a course's assessments. Returns the
+    assessments to compute stats with: the same dict if no policy is set.
+
+    Assessments that set a policy are replaced by copies without it,
+    so resolving the result again changes nothing.
+    '''
+    configured = {}
+    for name, a in assessments.items():
+        options = policy(a)
+        if options is not None and options.get("policy") in POLICIES:
+            configured.setdefault(options["policy"], {})[name] = options
+
+    if not configured:
+        return assessments
+
+    resolved = dict(assessments)
+    for names in configured.values():
+        for name in names:
+            a = assessments[name]
+            resolved[name] = Assessment(a.weight, a.amount, a.dropped, a.grades)
+
+    for policy_name, apply in POLICIES.items():
+        if policy_name in configured:
+            apply(resolved, configured[policy_name])
+
+    return resolved
+
+def resolve_course(course: Course) -> Course:
+    '''Returns the course with its drop policies applied (see resolve).'''
+    assessments = resolve(course.assessments)
+    if assessments is course.assessments:
+        return course
+    return Course(assessments, course.scale)
+
+def lowest_per_category(assessments: dict[str, Assessment], configured: dict[str, dict]):
+    '''
+    Pools the drops of the assessments in each "category": the category
+    drops as many grades as its assessments do together, the lowest
+    graded ones across the category. Drops that no graded item takes
+    yet stay with assessments that still have ungraded items, their
+    own first. Every assessment keeps at least one item.
+    '''
+    categories = {}
+    for name, options in configured.items():
+        categories.setdefault(options.get("category"), []).append(name)
+
+    for names in categories.values():
+        budget = sum(int(assessments[name].dropped) for name in names)
+        spare = {name: len(assessments[name].grades) - 1 for name in names}
+        dropped = dict.fromkeys(names, 0)
+
+        pooled = sorted(
+            (grade, n, i)
+            for n, name in enumerate(names)
+            for i, grade in enumerate(assessments[name].grades)
+            if is_graded(grade)
+        )
+        for _grade, n, _i in pooled:
+            if budget == 0:
+                break
+            name = names[n]
+            if spare[name] > 0:
+                dropped[name] += 1
+                spare[name] -= 1
+                budget -= 1
+
+        # the remaining drops go to ungraded items
+        ungraded = {
+            name: min(spare[name], len(assessments[name].grades) - len(assessments[name].graded()))
+            for name in names
+        }
+        for own in (True, False):
+            for name in names:
+                wanted = int(assessments[name].dropped) - dropped[name] if own else budget
+                given = max(0, min(budget, wanted, ungraded[name]))
+                dropped[name] += given
+                ungraded[name] -= given
+                budget -= given
+
+        for name in names:
+            a = assessments[name]
+            assessments[name] = Assessment(a.weight, a.amount, dropped[name], a.grades)
+
+def replace_lowest_with_final(assessments: dict[str, Assessment], configured: dict[str, dict]):
+    '''
+    Replaces the lowest kept grade of an assessment with the average of
+    the kept grades of its "final" assessment, once the final is graded
+    and its average is higher.
+    '''
+    for name, options in configured.items():
+        final = assessments.get(options.get("final"))
+        if final is None or options.get("final") == name:
+            continue
+
+        kept, _ = split(final.grades, drop_lowest(final))
+        kept = [grade for grade in kept if is_graded(grade)]
+        if not kept:
+            continue
+        replacement = sum(kept) / len(kept)
+
+        a = assessments[name]
+        mask = drop_lowest(a)
+        lowest_kept = min(
+            ((grade, i) for i, grade in enumerate(a.grades) if is_graded(grade) and not mask[i]),
+            default = None
+        )
+        if lowest_kept is None or lowest_kept[0] >= replacement:
+            continue
+
+        grades = array('d', a.grades)
+        grades[lowest_kept[1]] = replacement
+        assessments[name] = Assessment(a.weight, a.amount, a.dropped, grades)
+
+# applied in this order, so a final's average
+# is taken after the drops of its category
+POLICIES = {
+    "lowest-per-category": lowest_per_category,
+    "replace-lowest-with-final": replace_lowest_with_final,
+}
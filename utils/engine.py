@@ -0,0 +1,278 @@
+'''
+Array-backed statistics engine.
+
+Packs every assessment of the given courses into NumPy arrays
+(NaN for ungraded entries, a mask for dropped ones) and computes all
+per-assessment and per-course totals in one vectorized pass.
+Results match the functions in utils.stats (up to floating-point
+rounding), which are used instead when NumPy is not installed.
+'''
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from utils import drops
+from utils import stats
+from utils.models import Course
+
+HAS_NUMPY = np is not None
+
+def summarize(courses: dict[str, Course]) -> dict[str, dict]:
+    '''
+    Computes the stats of every course in one pass.
+
+    Returns a summary per course name, containing:
+    - "assessments": the stats of each assessment
+      (see _assessment_entry)
+    - "weighted_average", "achieved" and "graded_weight"
+    - "achieved_weighted_sum" and "remaining_fraction_sum",
+      used by needed_for_target
+
+    Drop policies are applied first (see drops.resolve).
+    '''
+    courses = {name: drops.resolve_course(course) for name, course in courses.items()}
+    if not HAS_NUMPY:
+        return {name: _summarize_python(course) for name, course in courses.items()}
+
+    packed = pack_courses(courses)
+    if packed is None:
+        return {name: _empty_summary() for name in courses}
+
+    return _summarize_packed(courses, packed)
+
+def needed_for_target(summary: dict, target_grade) -> float | None:
+    '''
+    Same as stats.needed_for_target, using a precomputed summary.
+    Returns None if no ungraded assessments remain.
+    '''
+    return stats.needed_from_sums(
+        summary["achieved_weighted_sum"],
+        summary["remaining_fraction_sum"],
+        target_grade
+    )
+
+def combine(assessments: dict[str, dict]) -> dict:
+    '''
+    Builds a course summary from the entries of its assessments,
+    accumulating totals in the same order as utils.stats.
+    '''
+    summary = _empty_summary()
+    summary["assessments"] = assessments
+
+    weighted_total = 0
+    completed_weight = 0
+    for entry in assessments.values():
+        weighted_total += entry["average"] * entry["weight"] / 100
+        if entry["completed"]:
+            completed_weight += entry["weight"]
+        summary["achieved"] += entry["achieved"]
+        summary["graded_weight"] += entry["graded_weight"]
+        summary["achieved_weighted_sum"] += entry["achieved_weighted"]
+        summary["remaining_fraction_sum"] += entry["remaining_fraction"]
+
+    if completed_weight > 0:
+        weighted_total /= completed_weight
+    summary["weighted_average"] = weighted_total * 100
+
+    return summary
+
+def pack_courses(courses: dict[str, Course]) -> dict | None:
+    '''
+    Packs the assessments of all courses into arrays, one row per assessment.
+    Returns None if there are no assessments.
+    '''
+    rows = []
+    course_index = []
+    for i, course in enumerate(courses.values()):
+        for data in course.assessments.values():
+            rows.append(data)
+            course_index.append(i)
+
+    if len(rows) == 0:
+        return None
+
+    width = max(len(data.grades) for data in rows)
+
+    grades = np.full((len(rows), width), np.nan)
+    present = np.zeros((len(rows), width), dtype=bool)
+    for r, data in enumerate(rows):
+        row = np.frombuffer(data.grades, dtype=float)
+        grades[r, :len(row)] = row
+        present[r, :len(row)] = True
+
+    return {
+        "grades": grades,
+        "present": present,
+        "length": present.sum(axis=1),
+        "weight": np.array([data.weight for data in rows], dtype=float),
+        "amount": np.array([data.amount for data in rows], dtype=float),
+        "dropped": np.array([data.dropped for data in rows], dtype=float),
+        "course": np.array(course_index),
+        "num_courses": len(courses),
+    }
+
+def _drop_mask(grades, graded, num_to_drop):
+    '''Marks the lowest num_to_drop graded entries of each row.'''
+    filled = np.where(graded, grades, np.inf)
+    order = np.argsort(filled, axis=1, kind="stable")
+    rank = np.empty_like(order)
+    positions = np.broadcast_to(np.arange(grades.shape[1]), grades.shape)
+    np.put_along_axis(rank, order, positions, axis=1)
+    return graded & (rank < num_to_drop[:, None])
+
+def _row_sum(values, mask):
+    '''Sums the masked values of each row from left to right.'''
+    return np.cumsum(np.where(mask, values, 0.0), axis=1)[:, -1]
+
+def _summarize_packed(courses: dict[str, Course], packed: dict) -> dict[str, dict]:
+    grades = packed["grades"]
+    weight = packed["weight"]
+    amount = packed["amount"]
+    dropped = packed["dropped"]
+    length = packed["length"]
+    course = packed["course"]
+    num_courses = packed["num_courses"]
+
+    graded = packed["present"] & ~np.isnan(grades)
+    num_graded = graded.sum(axis=1)
+
+    # keep as many grades as possible (stats.filter_dropped)
+    num_dropped = np.maximum(0, num_graded - (length - dropped))
+    kept = graded & ~_drop_mask(grades, graded, num_dropped)
+    num_kept = num_graded - num_dropped
+    kept_sum = _row_sum(grades, kept)
+
+    to_keep = amount - dropped
+    achieved = kept_sum / (to_keep * 100) * weight
+    average = np.divide(
+        kept_sum, num_kept,
+        out=np.zeros_like(kept_sum),
+        where=num_kept > 0
+    )
+
+    to_drop = dropped - num_dropped
+    graded_weight = num_graded / (length - to_drop) * weight
+
+    # drop as many grades as possible (stats.needed_sums)
+    num_dropped_min = np.minimum(dropped, num_graded)
+    kept_min = graded & ~_drop_mask(grades, graded, num_dropped_min)
+    kept_min_sum = _row_sum(grades, kept_min)
+
+    remaining = to_keep - num_kept
+    remaining = np.where(num_dropped < to_drop, remaining + to_drop, remaining)
+    remaining = np.minimum(remaining, to_keep)
+
+    achieved_weighted = kept_min_sum * weight / to_keep
+    remaining_fraction = remaining * weight / to_keep
+
+    completed = np.where(num_kept > 0, weight, 0.0)
+
+    def per_course(values):
+        return np.bincount(course, weights=values, minlength=num_courses)
+
+    weighted_total = per_course(average * weight / 100)
+    completed_weight = per_course(completed)
+    weighted_average = np.divide(
+        weighted_total, completed_weight,
+        out=weighted_total.copy(),
+        where=completed_weight > 0
+    ) * 100
+
+    total_achieved = per_course(achieved)
+    total_graded_weight = per_course(graded_weight)
+    achieved_weighted_sum = per_course(achieved_weighted)
+    remaining_fraction_sum = per_course(remaining_fraction)
+
+    summaries = {}
+    row = 0
+    for i, (name, data) in enumerate(courses.items()):
+        assessments = {}
+        for a_name, a_data in data.assessments.items():
+            assessments[a_name] = _assessment_entry(
+                weight = a_data.weight,
+                achieved = float(achieved[row]),
+                average = float(average[row]),
+                graded = int(num_graded[row]),
+                completed = bool(num_kept[row] > 0),
+                graded_weight = float(graded_weight[row]),
+                achieved_weighted = float(achieved_weighted[row]),
+                remaining_fraction = float(remaining_fraction[row])
+            )
+            row += 1
+
+        summaries[name] = {
+            "assessments": assessments,
+            "weighted_average": float(weighted_average[i]),
+            "achieved": float(total_achieved[i]),
+            "graded_weight": float(total_graded_weight[i]),
+            "achieved_weighted_sum": float(achieved_weighted_sum[i]),
+            "remaining_fraction_sum": float(remaining_fraction_sum[i]),
+        }
+
+    return summaries
+
+def _summarize_python(course: Course) -> dict:
+    assessments = course.assessments
+
+    summary = _empty_summary()
+    for name, data in assessments.items():
+        kept, _ = stats.filter_dropped(data)
+        achieved_weighted, remaining_fraction = stats.needed_terms(data)
+        summary["assessments"][name] = _assessment_entry(
+            weight = data.weight,
+            achieved = stats.achieved_weight(data),
+            average = stats.interim_weight(kept),
+            graded = len(stats.filter_ungraded(data.grades)),
+            completed = len(stats.filter_ungraded(kept)) > 0,
+            graded_weight = stats.graded_weight(data),
+            achieved_weighted = achieved_weighted,
+            remaining_fraction = remaining_fraction
+        )
+
+    achieved_weighted_sum, remaining_fraction_sum = stats.needed_sums(assessments)
+
+    summary.update({
+        "weighted_average": stats.total_weighted_average(assessments),
+        "achieved": stats.total_achieved(assessments),
+        "graded_weight": stats.total_graded_weight(assessments),
+        "achieved_weighted_sum": achieved_weighted_sum,
+        "remaining_fraction_sum": remaining_fraction_sum,
+    })
+
+    return summary
+
+def _empty_summary() -> dict:
+    return {
+        "assessments": {},
+        "weighted_average": 0,
+        "achieved": 0,
+        "graded_weight": 0,
+        "achieved_weighted_sum": 0,
+        "remaining_fraction_sum": 0,
+    }
+
+def _assessment_entry(
+    weight, achieved, average, graded, completed,
+    graded_weight, achieved_weighted, remaining_fraction
+) -> dict:
+    '''
+    The stats of one assessment:
+    - "weight": weight of the assessment in the course
+    - "achieved": achieved weight (stats.achieved_weight)
+    - "average": average of kept grades (stats.interim_weight)
+    - "graded": number of graded items
+    - "completed": whether any kept item is graded
+    - "graded_weight": weight that has been graded (stats.graded_weight)
+    - "achieved_weighted", "remaining_fraction": terms of stats.needed_sums
+    '''
+    return {
+        "weight": weight,
+        "achieved": achieved,
+        "average": average,
+        "graded": graded,
+        "completed": completed,
+        "graded_weight": graded_weight,
+        "achieved_weighted": achieved_weighted,
+        "remaining_fraction": remaining_fraction,
+    }
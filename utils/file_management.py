@@ -1,26 +1,43 @@
 import os
 import glob
+import gzip
 import json
+import lzma
+import shutil
+import time
+import zlib
 
+from utils import history
 from utils import input_output as io
+from utils import journal
+from utils import manifest
+from utils import snapshot
+from utils.models import Course
 from utils.outline_parser import OutlineParser
 from utils.validation import (
-    validate_json, validate_outline, validate_schema,
+    parse_data, validate_outline, validate_schema,
     handle_creation_error, DATA_TEMPLATE
 )
 
-def setup_cmd(startup = True) -> tuple[dict, str]:
+# compressed data files, by extension
+CODECS = {".json.gz": gzip, ".json.xz": lzma}
+DATA_EXTENSIONS = [".json", *CODECS]
+
+# what read_data_file raises for a missing or damaged file
+DECOMPRESS_ERRORS = (OSError, EOFError, lzma.LZMAError, zlib.error)
+
+def setup_cmd(storage, startup = True) -> tuple[dict[str, Course], str]:
     '''
-    Sets up the CLI with valid data.
-    Can raise SystemExit.
+    Sets up the CLI with valid data from the given storage
+    (see utils.storage). Can raise SystemExit.
 
-    Returns the data and filename without extension.
+    Returns the courses and the name of their data.
     '''
     setup_dirs()
 
     chosen_data = None
     while chosen_data is None:
-        chosen_data = select_data(startup)
+        chosen_data = select_data(storage, startup)
         if not chosen_data:
             chosen_outline = select_outline()
             if chosen_outline and "Example" in chosen_outline:
@@ -33,16 +50,47 @@ def setup_cmd(startup = True) -> tuple[dict, str]:
             if not chosen_outline or choice == 'n':
                 print("Please see the README for help with creating an outline.")
                 io.notify_and_exit()
-            chosen_data = create_data(chosen_outline)
+            chosen_data = create_data(storage, chosen_outline)
 
-    data = load_data(chosen_data)
+    courses = storage.open(chosen_data)
 
-    if data is None:
+    if courses is None:
         io.notify_and_exit()
 
-    filename, _ = filename_from_path(chosen_data)
+    return courses, chosen_data
+
+def recover_journal(data: dict, filename) -> dict:
+    '''
+    Replays the journal of a data file on top of its data.
+    Edits that were never saved, because the program did not
+    exit normally, are only replayed if the user wishes.
+    '''
+    skipped = journal.replay(data, journal_records(filename))
+
+    if skipped:
+        print(f"NOTICE: Skipped {skipped} changes that no longer match {filename}.")
+
+    return data
+
+def journal_records(filename) -> list[dict]:
+    '''
+    Returns the journaled edits of a data file to replay, including
+    the ones that were never saved if the user wishes (see recover_journal).
+    '''
+    committed, uncommitted, committed_size, _ = journal.read(filename)
+
+    if uncommitted:
+        message = f"Found {len(uncommitted)} unsaved changes to {filename} from a previous session. Recover them? (y/n) "
+        choice = io.input_until_valid(
+            message = message,
+            func = lambda c:
+                io.yes_or_no(c)
+        )
+        if choice == 'y':
+            return committed + uncommitted
+        journal.truncate(filename, committed_size)
 
-    return data, filename
+    return committed
 
 def setup_dirs():
     if not os.path.exists("outlines"):
@@ -61,9 +109,44 @@ def setup_dirs():
 
 def filename_from_path(path) -> tuple[str, str]:
     filename = os.path.basename(path)
+    for ext in CODECS:
+        if filename.endswith(ext):
+            return filename[:-len(ext)], ext
     [name, ext] = os.path.splitext(filename)
     return name, ext
 
+def data_filepath(name, path = "data", suffix = "") -> str:
+    '''
+    Returns the path of a data file (or of a backup, given its suffix)
+    in whichever format it exists, or uncompressed if it does not.
+    '''
+    for ext in DATA_EXTENSIONS:
+        filepath = os.path.join(path, f"{name}{suffix}{ext}")
+        if os.path.exists(filepath):
+            return filepath
+    return os.path.join(path, f"{name}{suffix}.json")
+
+def find_backup(name) -> str:
+    return data_filepath(name, os.path.join("data", "backup"), "(backup)")
+
+def read_data_file(filepath) -> bytes:
+    '''Returns the contents of a data file, decompressed if needed.'''
+    with open(filepath, 'rb') as f:
+        raw = f.read()
+    codec = CODECS.get(filename_from_path(filepath)[1])
+    return raw if codec is None else codec.decompress(raw)
+
+def serialize(data, ext = ".json") -> tuple[bytes, bytes]:
+    '''
+    Returns data as JSON and as stored in a data file with the given
+    extension. Compressed files are not indented, as no one reads them.
+    '''
+    if ext in CODECS:
+        raw = json.dumps(data, separators=(",", ":")).encode()
+        return raw, CODECS[ext].compress(raw)
+    raw = json.dumps(data, indent=4).encode()
+    return raw, raw
+
 def get_unique_filepath(path, name, ext) -> str:
     count = 1
     filepath = os.path.join(path, f"{name}{ext}")
@@ -72,87 +155,158 @@ def get_unique_filepath(path, name, ext) -> str:
         count += 1
     return filepath
 
-def write_data(data, filename) -> bool:
+def write_data(data, filename, dirty: set[str] | None = None, ext: str | None = None) -> bool:
     '''
-    Writes to data/ and backs up old data.
-    If data is corrupted, writes to data/corrupt/.
+    Writes to data/ and records the data in its backup history
+    (see utils.history). If data is corrupted, writes to data/corrupt/.
     Returns true if successful.
+
+    If dirty is given, only those courses are validated,
+    as the others are known to be valid, and only the courses changed
+    since the existing file are hashed and summarized again.
+
+    The data is written in the format of the existing file unless
+    ext is given (see CODECS), to a temporary file that is moved into
+    place, so an interrupted save never leaves a partially written file.
     '''
     path = "data"
 
-    # backup existing data
-    existing_filepath = os.path.join(path, filename) + ".json"
-    if os.path.exists(existing_filepath):
-        with open(existing_filepath, 'r') as f:
-            backup_data = json.load(f)
-        backup_path = os.path.join(path, "backup")
-        backup_filepath = os.path.join(backup_path, f"{filename}(backup).json")
-        with open(backup_filepath, 'w') as f:
-            json.dump(backup_data, f, indent=4)
+    filename, _ = filename_from_path(filename)
+
+    existing_filepath = data_filepath(filename)
+    existing_ext = filename_from_path(existing_filepath)[1]
+    if ext is None:
+        ext = existing_ext
+    filepath = os.path.join(path, filename + ext)
 
     # check for corrupted data
-    error = validate_schema(data)
+    error = validate_schema(data, dirty)
     if error:
         print("\nERROR: Data is corrupted:\n")
         print(error)
         print()
         # prepare corrupted file to be written
         path = os.path.join(path, "corrupt")
-        filename += "(corrupt)"
+        filepath = get_unique_filepath(path, filename + "(corrupt)", ext)
+        print(f"NOTICE: Corrupted data will be written to {filepath}")
+        print(f"NOTICE: No changes to {existing_filepath} were saved.")
 
-    if ".json" not in filename:
-        filename += ".json"
+    # serialize before touching any files
+    raw, content = serialize(data, ext)
 
-    filepath = os.path.join(path, filename)
+    # courses that differ from the existing file: the dirty ones, and the
+    # ones with journaled edits from earlier sessions (see manifest.describe)
+    changed = None
+    previous = None
+    if dirty is not None and not error:
+        committed, uncommitted, _committed_size, _size = journal.read(filename)
+        changed = set(dirty) | {record.get("course") for record in committed + uncommitted}
+        previous = manifest.entry(filename, existing_filepath)
 
-    if error:
-        # further prepare corrupted file
-        name, ext = filename_from_path(filepath)
-        filepath = get_unique_filepath(path, name, ext)
-        print(f"NOTICE: Corrupted data will be written to {filepath}")
-        print(f"NOTICE: No changes to {existing_filepath} were saved.")
+    atomic_write(filepath, content)
 
-    with open(filepath, 'w') as f:
-        json.dump(data, f, indent=4)
+    if not error:
+        base = previous.get("version") if previous is not None else None
+        version = history.record(filename, data, changed, base)
+        snapshot.store(filename, filepath, raw, data)
+        manifest.update(filename, filepath, raw, data, changed, previous, version)
 
     return error is None
 
-def load_data(filepath) -> dict | None:
-    data = {}
+def backup_file(filepath, backup_filepath):
+    '''
+    Replaces the backup with the given file, without copying
+    its contents if the file system supports hard links.
+    '''
+    temp_filepath = backup_filepath + ".tmp"
+    if os.path.exists(temp_filepath):
+        os.remove(temp_filepath)
 
-    # check for invalid JSON
-    json_error = validate_json(filepath)
-    if json_error:
-        print("\nERROR: Invalid JSON syntax in data file:\n")
-        print(json_error)
-        print()
-        continue_with_backup = handle_corrupted_load(filepath)
-        if not continue_with_backup:
-            return None
+    try:
+        os.link(filepath, temp_filepath)
+    except OSError:
+        shutil.copy2(filepath, temp_filepath)
 
-    with open(filepath, 'r') as f:
-        data = json.load(f)
+    os.replace(temp_filepath, backup_filepath)
 
-    # check for invalid data
-    schema_error = validate_schema(data)
-    if schema_error:
-        print("\nERROR: Invalid schema in data file:\n")
-        print(schema_error)
+def atomic_write(filepath, content: str | bytes):
+    '''
+    Writes content to a temporary file next to filepath,
+    flushes it to disk and moves it into place.
+    '''
+    if isinstance(content, str):
+        content = content.encode()
+
+    directory, name = os.path.split(filepath)
+    temp_filepath = os.path.join(directory, f".{name}.tmp")
+    try:
+        with open(temp_filepath, 'wb') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_filepath, filepath)
+    except BaseException:
+        if os.path.exists(temp_filepath):
+            os.remove(temp_filepath)
+        raise
+
+    # make the rename itself durable (not supported on Windows)
+    if hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(directory or ".", os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+def load_data(filepath) -> dict | None:
+    '''
+    Loads a data file, reading, parsing and validating it once,
+    or from its snapshot if it has not changed since (see utils.snapshot).
+    Validation is skipped if the file is unchanged since it was
+    written or validated (see manifest.is_trusted).
+    If it is corrupted, offers to continue with the backup.
+    '''
+    filename, _ = filename_from_path(filepath)
+    while True:
+        try:
+            raw = read_data_file(filepath)
+            data, error = snapshot.load(filename, filepath, raw), None
+        except DECOMPRESS_ERRORS as e:
+            raw = None
+            data, error = None, e
+
+        if data is None and raw is not None:
+            trusted = manifest.is_trusted(manifest.read().get(filename), raw)
+            data, error = parse_data(raw, trusted)
+            if error is None:
+                snapshot.store(filename, filepath, raw, data)
+
+        if error is None:
+            # describe files that were changed outside of write_data
+            if manifest.entry(filename, filepath) is None:
+                manifest.update(filename, filepath, raw, data)
+            return data
+
+        if raw is None:
+            print("\nERROR: Could not decompress data file:\n")
+        elif isinstance(error, json.decoder.JSONDecodeError):
+            print("\nERROR: Invalid JSON syntax in data file:\n")
+        else:
+            print("\nERROR: Invalid schema in data file:\n")
+        print(error)
         print()
+
+        # continue with backup data if requested
         cont = handle_corrupted_load(filepath)
-        if cont:
-            # continue with backup data if requested
-            data = load_data(filepath)
-        else:
+        if not cont or not os.path.exists(filepath):
             return None
-    
-    return data
 
 def handle_corrupted_load(filepath) -> bool:
     '''
     Assumes the given filepath is corrupted.
     Creates a known corrupted version of the file,
-    and tries to restore from backup.
+    and tries to restore the newest valid version from
+    its backup history (or its older single backup).
 
     Returns whether there was a backup and the user
     wishes to continue with it.
@@ -164,19 +318,21 @@ def handle_corrupted_load(filepath) -> bool:
     path = os.path.join("data", "corrupt")
     corrupt_filepath = get_unique_filepath(path, name + "(corrupt)", ext)
     os.rename(filepath, corrupt_filepath)
+    manifest.remove(name)
 
     print(f"NOTICE: Moved {filepath} to {corrupt_filepath}")
 
-    # write backup to filepath
-    backup_path = os.path.join("data", "backup")
-    backup_filepath = os.path.join(backup_path, f"{name}(backup).json")
-    if os.path.exists(backup_filepath):
-        backup = {}
-        with open(backup_filepath, 'r') as f:
-            backup = json.load(f)
-        write_data(backup, name)
-
-        print(f"NOTICE: Restored data from backup.\n")
+    # write backup to filepath, in the same format
+    version, data = history.newest_valid(name)
+    backup = find_backup(name)
+    if version is not None or os.path.exists(backup):
+        if version is not None:
+            write_data(data, name, ext = ext)
+            saved = time.strftime('%Y-%m-%d %H:%M', time.localtime(version["saved"]))
+            print(f"NOTICE: Restored data from the version saved {saved}.\n")
+        else:
+            write_data(json.loads(read_data_file(backup)), name, ext = ext)
+            print(f"NOTICE: Restored data from backup.\n")
 
         cont = io.input_until_valid(
             "Continue with backup data? (y/n) ",
@@ -217,23 +373,63 @@ def select_outline() -> str | None:
     
     return chosen_outline
 
-def select_data(startup = True) -> str | None:
+def list_data(path = "data") -> list[str]:
+    '''Returns the names of the data files in a directory, compressed or not.'''
+    data_filepaths = []
+    for ext in DATA_EXTENSIONS:
+        data_filepaths += glob.glob(os.path.join(glob.escape(path), f"*{ext}"))
+    data_filepaths = list(filter(lambda f: "(corrupt)" not in f, data_filepaths))
+    # dict keeps the first of the same data in several formats
+    return list(dict.fromkeys(filename_from_path(f)[0] for f in data_filepaths))
+
+def archive_data(name, ext = ".json.xz") -> bool:
+    '''
+    Compresses a data file that is not loaded, and its backup,
+    writing its journaled edits into it (see CODECS).
+    Returns true if successful.
+    '''
+    filepath = data_filepath(name)
+    if filepath.endswith(ext):
+        print(f"{name} is already archived as {os.path.basename(filepath)}.")
+        return False
+
+    data = load_data(filepath)
+    if data is None:
+        return False
+    data = recover_journal(data, name)
+
+    # write_data records the data in its backup history, and a
+    # single backup kept by older versions is compressed as well
+    if not write_data(data, name, ext = ext):
+        return False
+    if os.path.exists(filepath):
+        os.remove(filepath)
+    journal.remove(name)
+
+    backup = find_backup(name)
+    if os.path.exists(backup) and not backup.endswith(ext):
+        _raw, content = serialize(json.loads(read_data_file(backup)), ext)
+        atomic_write(os.path.join("data", "backup", f"{name}(backup){ext}"), content)
+        os.remove(backup)
+
+    return True
+
+def select_data(storage, startup = True) -> str | None:
     '''
-    Finds a data file to load.
-    Returns the filepath, if found.
+    Finds data to load in the given storage.
+    Returns its name, if found.
     '''
-    data_filepaths = glob.glob("data/*.json")
-    data_filepaths = list(filter(lambda f: "corrupted" not in f, data_filepaths))
-    data_filenames = [os.path.basename(f) for f in data_filepaths]
+    data_names = storage.list()
+    previews = storage.previews(data_names)
 
-    if len(data_filenames) == 0:
+    if len(data_names) == 0:
         return None
     
-    elif len(data_filenames) == 1:
-        # avoid prompting for the file that was just switched from
+    elif len(data_names) == 1:
+        # avoid prompting for the data that was just switched from
         if not startup: return None
 
-        message = f"Load data from {data_filenames[0][:-len(".json")]}? (Y/N) "
+        message = f"Load data from {data_names[0]}{previews.get(data_names[0], '')}? (Y/N) "
         choice = io.input_until_valid(
             message = message,
             repeat_message = "Invalid input. " + message,
@@ -242,43 +438,38 @@ def select_data(startup = True) -> str | None:
         )
 
         if choice == 'y':
-            return data_filepaths[0]
+            return data_names[0]
         else:
             return None
 
     else:
         print("Multiple data files found:")
-        print(io.numbered_list(data_filenames))
+        print(io.numbered_list(data_names, suffix = lambda name: previews.get(name, "")))
 
         message = "Choose one to load (0 to load a new outline): "
         choice = io.input_until_valid(
             message = message,
             repeat_message = "Invalid input. " + message,
             func = lambda c:
-                io.in_range(c, 0, len(data_filenames) + 1)
+                io.in_range(c, 0, len(data_names) + 1)
         )
 
         if int(choice) > 0:
-            return data_filepaths[int(choice) - 1]
+            return data_names[int(choice) - 1]
         else:
             return None
 
-def create_data(outline_filename) -> str | None:
+def create_data(storage, outline_filename) -> str | None:
     '''
-    Creates a data file based on an outline.
+    Creates data in the given storage based on an outline.
     Will raise SystemExit if the outline is invalid.
-    Returns the filepath of the created file.
+    Returns the name of the created data.
     '''
     print(f"Creating data based on {outline_filename}...")
-    filename_without_extension = os.path.splitext(outline_filename)[0]
-
-    data_files = glob.glob("data/*.json")
-    data_files = [os.path.basename(path) for path in data_files]
-
-    data_filename = filename_without_extension + ".json"
+    name = os.path.splitext(outline_filename)[0]
 
-    if data_filename in data_files:
-        message = f"Data corresponding to {data_filename} already exists. Overwrite it? (Y/N) "
+    if storage.exists(name):
+        message = f"Data corresponding to {name} already exists. Overwrite it? (Y/N) "
         choice = io.input_until_valid(
             message = message,
             repeat_message = "Invalid input. " + message,
@@ -299,6 +490,8 @@ def create_data(outline_filename) -> str | None:
     if error is not None:
         handle_creation_error(error, course_data)
     
-    write_data(course_data, data_filename)
+    storage.write(name, course_data)
+    # edits to overwritten data no longer apply
+    storage.discard_edits(name)
 
-    return os.path.join("data", data_filename)
+    return name
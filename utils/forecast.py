@@ -0,0 +1,125 @@
+'''
+Monte Carlo grade forecasts.
+
+Remaining grades are drawn from a normal distribution fitted to the
+student's own grades in each assessment, and the final grade of every
+draw is computed at once on the sample matrix, drops included. Drop
+policies are applied as they stand with the grades so far.
+Requires NumPy.
+'''
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from utils import drops
+from utils import stats
+from utils.models import Course, GradeScale
+
+HAS_NUMPY = np is not None
+
+DRAWS = 100_000
+SEED = 0
+
+# used when a course has no grades to fit yet
+DEFAULT_MEAN = 70
+DEFAULT_SPREAD = 15
+
+# caps the size of the sample matrix held in memory at once
+MAX_CHUNK_SIZE = 4_000_000
+
+def forecast(course: Course, draws = DRAWS, seed = SEED) -> dict:
+    '''
+    Simulates the remaining assessments of a course.
+
+    Returns a dict containing:
+    - "probabilities": chance of landing in each scale grade,
+      with None for landing below every grade
+    - "mean": the average final grade
+    - "low", "high": the 5th and 95th percentiles of the final grade
+    '''
+    assessments = drops.resolve(course.assessments)
+    rng = np.random.default_rng(seed)
+
+    finals = np.zeros(draws)
+    total_weight = 0
+
+    pooled = [g for a in assessments.values() for g in stats.filter_ungraded(a.grades)]
+
+    for _name, a in assessments.items():
+        graded = np.array(stats.filter_ungraded(a.grades), dtype=float)
+        num_remaining = len(a.grades) - len(graded)
+        num_dropped = a.dropped
+        num_kept = len(a.grades) - num_dropped
+        weight = a.weight
+        total_weight += weight
+
+        if num_remaining == 0:
+            # every draw is the same
+            kept_sum = graded.sum() - np.sort(graded)[:num_dropped].sum()
+            finals += kept_sum / num_kept * weight
+            continue
+
+        mean, spread = _fit(graded, pooled)
+
+        # sample in chunks of draws to bound memory
+        chunk = max(1, MAX_CHUNK_SIZE // max(1, len(a.grades)))
+        for start in range(0, draws, chunk):
+            rows = min(chunk, draws - start)
+            samples = rng.normal(mean, spread, size=(rows, num_remaining)).clip(0, 100)
+            full = np.concatenate((np.broadcast_to(graded, (rows, len(graded))), samples), axis=1)
+
+            total = full.sum(axis=1)
+            if num_dropped > 0:
+                lowest = np.partition(full, num_dropped - 1, axis=1)[:, :num_dropped]
+                total -= lowest.sum(axis=1)
+
+            finals[start:start + rows] += total / num_kept * weight
+
+    if total_weight > 0:
+        finals /= total_weight
+
+    return {
+        "probabilities": _bucket(course.scale, finals),
+        "mean": float(finals.mean()),
+        "low": float(np.percentile(finals, 5)),
+        "high": float(np.percentile(finals, 95)),
+    }
+
+def _fit(graded, pooled: list) -> tuple[float, float]:
+    '''
+    Returns the mean and spread of the grades of an assessment,
+    falling back to the grades of the whole course.
+    '''
+    if len(pooled) >= 2:
+        pooled_spread = float(np.std(pooled, ddof=1))
+    else:
+        pooled_spread = DEFAULT_SPREAD
+
+    if len(graded) >= 2:
+        return float(graded.mean()), float(graded.std(ddof=1))
+    elif len(graded) == 1:
+        return float(graded[0]), pooled_spread
+    elif len(pooled) > 0:
+        return float(np.mean(pooled)), pooled_spread
+    else:
+        return DEFAULT_MEAN, DEFAULT_SPREAD
+
+def _bucket(scale: GradeScale, finals) -> dict[str | None, float]:
+    '''Returns the share of final grades in each scale grade.'''
+    ascending = scale.ascending()
+    minimums = np.array([minimum for _letter, minimum in ascending], dtype=float)
+
+    # number of minimums reached, so 0 is below every grade
+    reached = np.searchsorted(minimums, finals, side="right")
+    counts = np.bincount(reached, minlength=len(ascending) + 1)
+
+    shares = {
+        letter: float(counts[i + 1] / len(finals))
+        for i, (letter, _minimum) in enumerate(ascending)
+    }
+
+    probabilities = {letter: shares[letter] for letter in scale}
+    probabilities[None] = float(counts[0] / len(finals))
+
+    return probabilities
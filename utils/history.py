@@ -0,0 +1,179 @@
+'''
+Versioned backup history of data files.
+
+Every time a data file is written, its data is recorded as a version in
+data/backup/history/<name>/. Objects are stored by content hash:
+- each course is a compressed object, shared by every version in which
+  it is unchanged, so a version only adds the courses that changed
+- each version is a list of its courses and their hashes
+
+log.json lists the last HISTORY_SIZE versions, oldest first. Writing
+the same data again adds no version. Finding the objects that no version
+uses anymore reads every version, so they are only deleted once every
+HISTORY_SIZE versions that are pruned.
+'''
+import os
+import json
+import gzip
+import time
+
+from utils import file_management as files
+from utils.snapshot import digest
+from utils.validation import validate_schema
+
+# number of versions kept per data file
+HISTORY_SIZE = 20
+
+HISTORY_PATH = os.path.join("data", "backup", "history")
+
+class HistoryError(Exception): pass
+
+def history_path(name) -> str:
+    return os.path.join(HISTORY_PATH, name)
+
+def log_path(name) -> str:
+    return os.path.join(history_path(name), "log.json")
+
+def object_path(name, object_hash: str) -> str:
+    return os.path.join(history_path(name), f"{object_hash}.gz")
+
+def versions(name) -> list[dict]:
+    '''
+    Returns the versions of a data file, oldest first, each containing:
+    - "hash": the hash of the version
+    - "saved": when it was written, in seconds since the epoch
+    - "courses": its number of courses
+    '''
+    return _read_log(name)["versions"]
+
+def record(name, data: dict, changed: set[str] | None = None, base: str | None = None) -> str:
+    '''
+    Records valid data as the newest version of a data file, unless it is
+    the same as the newest version. Returns the hash of the newest version.
+
+    If changed is given, only those courses are hashed, and the others
+    are taken from base, the version the data was changed from, if it is
+    still the newest.
+    '''
+    log = _read_log(name)
+    logged = log["versions"]
+
+    known = {}
+    if changed is not None and base is not None and logged and logged[-1]["hash"] == base:
+        try:
+            known = dict(json.loads(_read_object(name, base)))
+        except (HistoryError, ValueError, TypeError):
+            known = {}
+
+    courses = []
+    objects = {}
+    for course, course_data in data.items():
+        if course in known and course not in changed:
+            courses.append([course, known[course]])
+            continue
+        raw = json.dumps(course_data, separators=(",", ":")).encode()
+        course_hash = digest(raw)
+        courses.append([course, course_hash])
+        objects[course_hash] = raw
+
+    tree = json.dumps(courses, separators=(",", ":")).encode()
+    version_hash = digest(tree)
+    objects[version_hash] = tree
+
+    if logged and logged[-1]["hash"] == version_hash:
+        return version_hash
+
+    os.makedirs(history_path(name), exist_ok=True)
+    for object_hash, raw in objects.items():
+        if not os.path.exists(object_path(name, object_hash)):
+            _write_object(name, object_hash, raw)
+
+    logged.append({"hash": version_hash, "saved": time.time(), "courses": len(data)})
+    log["pruned"] += len(logged[:-HISTORY_SIZE])
+    log["versions"] = logged[-HISTORY_SIZE:]
+    if log["pruned"] >= HISTORY_SIZE:
+        _collect(name, log["versions"])
+        log["pruned"] = 0
+    files.atomic_write(log_path(name), json.dumps(log, indent=4))
+
+    return version_hash
+
+def reconstruct(name, version_hash: str) -> dict:
+    '''
+    Returns the data of a version, checking every object against its hash.
+    Raises HistoryError if it cannot be reconstructed.
+    '''
+    try:
+        courses = json.loads(_read_object(name, version_hash))
+        return {
+            course: json.loads(_read_object(name, course_hash))
+            for course, course_hash in courses
+        }
+    except (ValueError, TypeError) as e:
+        raise HistoryError(f"Invalid version {version_hash} of {name}: {e}")
+
+def newest_valid(name) -> tuple[dict, dict] | tuple[None, None]:
+    '''
+    Returns the logged version of a data file that can be reconstructed
+    and is valid, along with its data.
+    '''
+    for version in reversed(versions(name)):
+        try:
+            data = reconstruct(name, version["hash"])
+        except HistoryError:
+            continue
+        if validate_schema(data) is None:
+            return version, data
+    return None, None
+
+def _read_log(name) -> dict:
+    '''
+    Returns the log of a data file: its "versions" (see versions),
+    and the number of versions "pruned" since objects were deleted.
+    '''
+    try:
+        with open(log_path(name), 'rb') as f:
+            log = json.loads(f.read())
+    except (OSError, ValueError):
+        log = None
+    # logs used to only list the versions
+    if isinstance(log, list):
+        log = {"versions": log, "pruned": 0}
+    if not isinstance(log, dict) or not isinstance(log.get("versions"), list):
+        log = {"versions": [], "pruned": 0}
+    log.setdefault("pruned", 0)
+    return log
+
+def _read_object(name, object_hash: str) -> bytes:
+    try:
+        with open(object_path(name, object_hash), 'rb') as f:
+            raw = gzip.decompress(f.read())
+    except files.DECOMPRESS_ERRORS as e:
+        raise HistoryError(f"Could not read object {object_hash} of {name}: {e}")
+    if digest(raw) != object_hash:
+        raise HistoryError(f"Object {object_hash} of {name} is corrupted")
+    return raw
+
+def _write_object(name, object_hash: str, raw: bytes):
+    # objects are not flushed to disk one by one: a version
+    # that lost some of them is skipped by newest_valid
+    path = object_path(name, object_hash)
+    temp_path = path + ".tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(gzip.compress(raw, mtime=0))
+    os.replace(temp_path, path)
+
+def _collect(name, logged: list[dict]):
+    '''Deletes the objects that none of the logged versions use.'''
+    used = {"log.json"}
+    for version in logged:
+        used.add(f"{version['hash']}.gz")
+        try:
+            courses = json.loads(_read_object(name, version["hash"]))
+        except (HistoryError, ValueError):
+            continue
+        used.update(f"{course_hash}.gz" for _course, course_hash in courses)
+
+    for filename in os.listdir(history_path(name)):
+        if filename not in used:
+            os.remove(os.path.join(history_path(name), filename))
@@ -0,0 +1,266 @@
+'''
+Write-ahead journal of edits to a data file.
+
+Every grade, scale and dropnum edit is appended to data/<name>.journal
+as one JSON line and flushed to disk, so saving only has to mark the
+edits so far as committed. The journal is replayed on top of the data
+file when it is loaded, and folded into the data file once it grows
+past COMPACT_THRESHOLD records, or when the data file is closed.
+'''
+import io
+import os
+import json
+from typing import Callable
+
+# number of edits after which saving rewrites the data file
+COMPACT_THRESHOLD = 100
+
+COMMIT = {"op": "commit"}
+
+def journal_path(filename, path = "data") -> str:
+    return os.path.join(path, f"{filename}.journal")
+
+def read(filename, path = "data") -> tuple[list[dict], list[dict], int, int]:
+    '''
+    Reads the journal of a data file.
+
+    Returns the committed records, the records after the last commit,
+    and the sizes in bytes of the committed part and of every record.
+    A partially written last record is ignored.
+    '''
+    filepath = journal_path(filename, path)
+    if not os.path.exists(filepath):
+        return [], [], 0, 0
+
+    with open(filepath, 'rb') as f:
+        return _scan(f)
+
+def replay(data: dict, records: list[dict]) -> int:
+    '''
+    Applies journal records to data, as stored in JSON.
+    Returns the number of records that no longer fit the data.
+    '''
+    skipped = 0
+    for record in records:
+        if not apply(data, record):
+            skipped += 1
+    return skipped
+
+def apply(data: dict, record: dict) -> bool:
+    '''Applies a journal record to data. Returns false if it does not fit.'''
+    try:
+        course = data[record["course"]]
+        op = record["op"]
+
+        # replayed values must keep the data valid (see validation.DATA_SCHEMA)
+        if op == "grade":
+            grades = course["assessments"][record["assessment"]]["grades"]
+            grade = record["grade"]
+            if record["index"] not in range(len(grades)) or not (grade is None or _is_number(grade)):
+                return False
+            grades[record["index"]] = grade
+
+        elif op == "scale":
+            if record["letter"] not in course["scale"] or not _is_number(record["minimum"]):
+                return False
+            course["scale"][record["letter"]] = record["minimum"]
+
+        elif op == "dropped":
+            if not _is_number(record["dropped"]):
+                return False
+            course["assessments"][record["assessment"]]["dropped"] = record["dropped"]
+
+        else:
+            return False
+
+    except (KeyError, TypeError):
+        return False
+
+    return True
+
+def _is_number(value) -> bool:
+    return type(value) in (int, float)
+
+def truncate(filename, size: int):
+    '''Cuts the journal of a data file down to its first size bytes.'''
+    filepath = journal_path(filename)
+    if os.path.exists(filepath):
+        os.truncate(filepath, size)
+
+def remove(filename, path = "data"):
+    '''Deletes the journal of a data file, if there is one.'''
+    filepath = journal_path(filename, path)
+    if os.path.exists(filepath):
+        os.remove(filepath)
+
+class Journal:
+    '''
+    The open journal of the loaded data file.
+
+    Records are flushed to disk as they are appended, unless sync is
+    false, in which case they are only flushed to disk on commit.
+    The generation changes whenever records are forgotten.
+    '''
+    def __init__(self, filename, sync = True):
+        self.filename = filename
+        self.filepath = journal_path(filename)
+        self.sync = sync
+        self.generation = 0
+
+        committed, uncommitted, committed_size, size = read(filename)
+        # drop a partially written last record before appending
+        truncate(filename, size)
+
+        self.num_records = len(committed) + len(uncommitted)
+        self.num_committed = len(committed)
+        self.committed_size = committed_size
+        self.file = open(self.filepath, 'ab')
+
+    def grade(self, course: str, assessment: str, index: int, grade: float | None):
+        self.append({
+            "op": "grade", "course": course, "assessment": assessment,
+            "index": index, "grade": grade
+        })
+
+    def scale(self, course: str, letter: str, minimum: float):
+        self.append({
+            "op": "scale", "course": course, "letter": letter, "minimum": minimum
+        })
+
+    def dropped(self, course: str, assessment: str, dropped: int):
+        self.append({
+            "op": "dropped", "course": course, "assessment": assessment, "dropped": dropped
+        })
+
+    def append(self, record: dict):
+        '''Appends a record and flushes it to disk.'''
+        self.file.write(_encode(record))
+        if self.sync or record == COMMIT:
+            self._sync()
+        else:
+            self.file.flush()
+        if record != COMMIT:
+            self.num_records += 1
+
+    def commit(self):
+        '''Marks every record so far as saved.'''
+        if self.file.tell() == self.committed_size:
+            return
+        self.append(COMMIT)
+        self.num_committed = self.num_records
+        self.committed_size = self.file.tell()
+
+    def commit_unsynced(self) -> Callable[[], None]:
+        '''
+        Marks every record so far as saved like commit, but only hands
+        them to the OS. Returns the function that flushes them to disk,
+        which still works once the journal is closed or replaced, so it
+        can be called without holding up new records.
+        '''
+        if self.file.tell() == self.committed_size:
+            return lambda: None
+        self.file.write(_encode(COMMIT))
+        self.file.flush()
+        self.num_committed = self.num_records
+        self.committed_size = self.file.tell()
+
+        fd = os.dup(self.file.fileno())
+        def flush():
+            try:
+                _fsync(fd)
+            finally:
+                os.close(fd)
+        return flush
+
+    def discard(self) -> list[dict]:
+        '''Forgets the records since the last commit, and returns them.'''
+        _committed, uncommitted, _committed_size, _size = read(self.filename)
+        self.file.truncate(self.committed_size)
+        self.file.seek(self.committed_size)
+        self._sync()
+        self.num_records = self.num_committed
+        return uncommitted
+
+    def clear(self):
+        '''Forgets every record, after they were written to the data file.'''
+        self.file.truncate(0)
+        self.file.seek(0)
+        self._sync()
+        self.num_records = 0
+        self.num_committed = 0
+        self.committed_size = 0
+        self.generation += 1
+
+    def forget(self, size: int):
+        '''
+        Forgets the records in the first size bytes of the journal,
+        after they were written to the data file. Records appended
+        since then are kept.
+        '''
+        self.file.flush()
+        with open(self.filepath, 'rb') as f:
+            f.seek(size)
+            tail = f.read()
+
+        if not tail:
+            self.clear()
+            return
+
+        temp_filepath = self.filepath + ".tmp"
+        with open(temp_filepath, 'wb') as f:
+            f.write(tail)
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.file.close()
+        os.replace(temp_filepath, self.filepath)
+        self.file = open(self.filepath, 'ab')
+
+        committed, uncommitted, committed_size, _size = _scan(io.BytesIO(tail))
+        self.num_records = len(committed) + len(uncommitted)
+        self.num_committed = len(committed)
+        self.committed_size = committed_size
+        self.generation += 1
+
+    def needs_compaction(self, closing = False) -> bool:
+        '''Returns true if the records should be written into the data file.'''
+        return self.num_records >= (1 if closing else COMPACT_THRESHOLD)
+
+    def close(self):
+        self.file.close()
+
+    def _sync(self):
+        self.file.flush()
+        _fsync(self.file.fileno())
+
+def _fsync(fd: int):
+    # fdatasync skips metadata where it is available
+    if hasattr(os, "fdatasync"):
+        os.fdatasync(fd)
+    else:
+        os.fsync(fd)
+
+def _scan(f) -> tuple[list[dict], list[dict], int, int]:
+    '''Reads journal records from a binary file (see read).'''
+    committed, uncommitted = [], []
+    committed_size = 0
+    size = 0
+
+    for line in f:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            break
+        size += len(line)
+
+        if record == COMMIT:
+            committed += uncommitted
+            uncommitted = []
+            committed_size = size
+        else:
+            uncommitted.append(record)
+
+    return committed, uncommitted, committed_size, size
+
+def _encode(record: dict) -> bytes:
+    return (json.dumps(record, separators=(",", ":")) + "\n").encode()
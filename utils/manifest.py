@@ -0,0 +1,198 @@
+'''
+Manifest of the data files in data/.
+
+data/.manifest.json describes every data file written or loaded: its
+size and mtime when it was described, its number of courses, when it
+was last saved, and totals to preview it with. The totals are kept per
+course, so a save only summarizes the courses it changed. The chooser
+reads the manifest instead of opening the data files.
+
+An entry only describes a file while its size and mtime still match.
+Entries also keep the content hash of valid files and the schema version
+they were checked against, so loading a file that is unchanged since
+PyGrades wrote or validated it can skip validation (see is_trusted).
+'''
+import os
+import json
+import time
+import heapq
+import threading
+
+from utils import engine
+from utils.models import courses_from_json
+from utils.snapshot import digest
+from utils.validation import SCHEMA_VERSION
+
+MANIFEST_PATH = os.path.join("data", ".manifest.json")
+
+# the autosave thread also writes data files
+_lock = threading.Lock()
+
+def read() -> dict[str, dict]:
+    '''Returns the entries of the manifest, by data name.'''
+    try:
+        with open(MANIFEST_PATH, 'rb') as f:
+            manifest = json.loads(f.read())
+        return manifest if isinstance(manifest, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def entry(name, filepath) -> dict | None:
+    '''Returns the entry of a data file, if it is up to date.'''
+    described = read().get(name)
+    if described is None or not is_current(described, filepath):
+        return None
+    return described
+
+def is_current(described: dict, filepath) -> bool:
+    try:
+        stat = os.stat(filepath)
+    except OSError:
+        return False
+    return (described.get("size"), described.get("mtime_ns")) == (stat.st_size, stat.st_mtime_ns)
+
+def is_trusted(described: dict | None, raw: bytes) -> bool:
+    '''Returns whether the contents of a data file are known to be valid.'''
+    return (
+        described is not None
+        and described.get("schema") == SCHEMA_VERSION
+        and described.get("hash") == digest(raw)
+    )
+
+def describe(
+    filepath,
+    raw: bytes,
+    data: dict,
+    changed: set[str] | None = None,
+    previous: dict | None = None
+) -> dict:
+    '''
+    Returns the entry of a data file containing valid data.
+
+    If changed is given, only those courses are summarized, and the totals
+    of the others are taken from previous, the entry of the file it replaced.
+    '''
+    stat = os.stat(filepath)
+
+    known = previous.get("totals", {}) if previous is not None and changed is not None else {}
+    totals = {course: known[course] for course in data if course in known and course not in changed}
+    totals.update(_totals({course: data[course] for course in data if course not in totals}))
+    totals = {course: totals[course] for course in data}
+
+    # average over the courses that have grades
+    averages = [average for _graded, _grades, average in totals.values() if average is not None]
+    average = sum(averages) / len(averages) if averages else None
+
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        # data files are only modified when saved
+        "saved": stat.st_mtime,
+        "courses": len(data),
+        "graded": sum(graded for graded, _grades, _average in totals.values()),
+        "grades": sum(grades for _graded, grades, _average in totals.values()),
+        "average": average,
+        "totals": totals,
+        "hash": digest(raw),
+        "schema": SCHEMA_VERSION,
+    }
+
+def update(
+    name,
+    filepath,
+    raw: bytes,
+    data: dict,
+    changed: set[str] | None = None,
+    previous: dict | None = None,
+    version: str | None = None
+):
+    '''
+    Describes a valid data file that was just written or loaded (see
+    describe), along with the version of its backup history it matches.
+    '''
+    described = describe(filepath, raw, data, changed, previous)
+    if version is not None:
+        described["version"] = version
+    with _lock:
+        manifest = read()
+        manifest[name] = described
+        _write(manifest)
+
+def remove(name):
+    '''Forgets a data file that was moved away.'''
+    with _lock:
+        manifest = read()
+        if manifest.pop(name, None) is not None:
+            _write(manifest)
+
+def preview(described: dict | None) -> str:
+    '''Returns a one-line description of a data file for the chooser.'''
+    if described is None:
+        return ""
+
+    courses = described["courses"]
+    text = f"{courses} course{'s' if courses != 1 else ''}, {described['graded']}/{described['grades']} graded"
+    if described["average"] is not None:
+        text += f", {described['average']:.2f}% average"
+    text += f", saved {time.strftime('%Y-%m-%d %H:%M', time.localtime(described['saved']))}"
+    return f" ({text})"
+
+def _totals(data: dict) -> dict[str, list]:
+    '''
+    Returns the number of graded items, the number of items, and the
+    weighted average (None if nothing is graded) of each course.
+
+    Files are described whenever they are loaded, so the averages are
+    computed on the JSON data as in stats.total_weighted_average,
+    without building courses. Only courses with drop policies go
+    through the stats engine.
+    '''
+    totals = {}
+    with_policies = {}
+    for name, course in data.items():
+        num_graded = 0
+        num_grades = 0
+        weighted_total = 0
+        completed_weight = 0
+        for assessment in course["assessments"].values():
+            if "drops" in assessment:
+                with_policies[name] = course
+                break
+            grades = assessment["grades"]
+            graded = [grade for grade in grades if grade is not None]
+            num_grades += len(grades)
+            num_graded += len(graded)
+
+            # keep as many grades as possible (see drops.drop_count)
+            num_dropped = max(0, len(graded) - (len(grades) - int(assessment["dropped"])))
+            num_kept = len(graded) - num_dropped
+            if num_kept > 0:
+                kept_sum = sum(graded) - sum(heapq.nsmallest(num_dropped, graded))
+                weighted_total += kept_sum / num_kept * assessment["weight"] / 100
+                completed_weight += assessment["weight"]
+        else:
+            average = weighted_total / completed_weight * 100 if completed_weight > 0 else None
+            totals[name] = [num_graded, num_grades, average]
+
+    if with_policies:
+        summaries = engine.summarize(courses_from_json(with_policies))
+        for name, course in with_policies.items():
+            grades = [grade for a in course["assessments"].values() for grade in a["grades"]]
+            num_graded = sum(1 for grade in grades if grade is not None)
+            summary = summaries[name]
+            average = summary["weighted_average"] if summary["graded_weight"] > 0 else None
+            totals[name] = [num_graded, len(grades), average]
+
+    return {name: totals[name] for name in data}
+
+def _write(manifest: dict):
+    # the manifest can be rebuilt from the data files, so it is not flushed to disk
+    temp_path = MANIFEST_PATH + ".tmp"
+    try:
+        with open(temp_path, 'w') as f:
+            # dumps is encoded in C, unlike dump
+            f.write(json.dumps(manifest, separators=(",", ":")))
+        os.replace(temp_path, MANIFEST_PATH)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
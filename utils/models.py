@@ -0,0 +1,259 @@
+'''
+Compact course data model.
+
+Grades are stored in array('d') with NaN for ungraded items, and the
+classes use __slots__ to avoid per-instance dicts. The JSON converters
+keep every key, carrying unknown ones along in "extra", but grades are
+always written back as floats: a grade of 85 becomes 85.0.
+'''
+import math
+import threading
+from array import array
+from bisect import bisect_right
+from collections.abc import MutableMapping
+from typing import Callable
+
+UNGRADED = math.nan
+
+def is_graded(grade: float) -> bool:
+    '''Returns whether a stored grade is set (NaN is the only value unequal to itself).'''
+    return grade == grade
+
+class GradeScale:
+    '''
+    Grade scale: an ordered mapping of letter grades to their minimums.
+
+    The minimums are also kept sorted, so letter grades and the distances
+    to neighbouring letters are found with bisect. The index is rebuilt
+    whenever a minimum is set.
+    '''
+    __slots__ = ("minimums", "_letters", "_thresholds")
+
+    def __init__(self, minimums: dict[str, float]):
+        self.minimums = dict(minimums)
+        self._build()
+
+    def _build(self):
+        # ascending; equal minimums are ordered so that the first
+        # letter in the scale comes last and wins the lookup
+        ordered = sorted(
+            enumerate(self.minimums.items()),
+            key = lambda entry: (entry[1][1], -entry[0])
+        )
+        self._letters = [letter for _i, (letter, _minimum) in ordered]
+        self._thresholds = [minimum for _i, (_letter, minimum) in ordered]
+
+    def __getitem__(self, letter: str) -> float:
+        return self.minimums[letter]
+
+    def __setitem__(self, letter: str, minimum: float):
+        self.minimums[letter] = minimum
+        self._build()
+
+    def __contains__(self, letter) -> bool:
+        return letter in self.minimums
+
+    def __iter__(self):
+        return iter(self.minimums)
+
+    def __len__(self) -> int:
+        return len(self.minimums)
+
+    def keys(self):
+        return self.minimums.keys()
+
+    def values(self):
+        return self.minimums.values()
+
+    def items(self):
+        return self.minimums.items()
+
+    def ascending(self) -> list[tuple[str, float]]:
+        '''Returns the letters and minimums from lowest to highest.'''
+        return list(zip(self._letters, self._thresholds))
+
+    def descending(self) -> list[tuple[str, float]]:
+        '''Returns the letters and minimums from highest to lowest.'''
+        return self.ascending()[::-1]
+
+    def _index(self, grade: float) -> int | None:
+        '''Returns the sorted index of the letter a grade earns, if any.'''
+        i = bisect_right(self._thresholds, grade) - 1
+        # a minimum of 0 is never earned (see get_letter_grade)
+        if i < 0 or self._thresholds[i] <= 0:
+            return None
+        return i
+
+    def letter(self, grade: float) -> str | None:
+        '''Returns the letter grade of a grade, or None if it is below the scale.'''
+        i = self._index(grade)
+        return None if i is None else self._letters[i]
+
+    def next_letter(self, grade: float) -> tuple[str, float] | None:
+        '''
+        Returns the next letter above a grade and how far the grade is from it.
+        Returns None if the grade already has the highest letter.
+        '''
+        # minimums of 0 are never earned, so they are never next
+        i = bisect_right(self._thresholds, max(grade, 0))
+        if i == len(self._thresholds):
+            return None
+        # the last of equal minimums is the letter that is earned
+        i = bisect_right(self._thresholds, self._thresholds[i]) - 1
+        return self._letters[i], self._thresholds[i] - grade
+
+    def to_json(self) -> dict:
+        return dict(self.minimums)
+
+class Assessment:
+    __slots__ = ("weight", "amount", "dropped", "grades", "extra")
+
+    JSON_KEYS = ("weight", "amount", "dropped", "grades")
+
+    def __init__(
+        self,
+        weight: float,
+        amount: int,
+        dropped: int,
+        grades: array,
+        extra: dict | None = None
+    ):
+        self.weight = weight
+        self.amount = amount
+        self.dropped = dropped
+        self.grades = grades
+        self.extra = extra
+
+    def get(self, i: int) -> float | None:
+        '''Returns a grade, or None if it is ungraded.'''
+        grade = self.grades[i]
+        return grade if is_graded(grade) else None
+
+    def set(self, i: int, grade: float | None):
+        '''Sets a grade, or unsets it if grade is None.'''
+        self.grades[i] = UNGRADED if grade is None else float(grade)
+
+    def graded(self) -> list[float]:
+        '''Returns the grades that are set, in order.'''
+        return [grade for grade in self.grades if is_graded(grade)]
+
+    def grade_list(self) -> list[float | None]:
+        '''Returns the grades with None for ungraded items, as stored in JSON.'''
+        return [grade if is_graded(grade) else None for grade in self.grades]
+
+    @classmethod
+    def from_json(cls, data: dict) -> "Assessment":
+        extra = {
+            key: value for key, value in data.items()
+            if key not in cls.JSON_KEYS
+        }
+        return cls(
+            weight = data["weight"],
+            amount = data["amount"],
+            dropped = data["dropped"],
+            grades = array('d', (
+                UNGRADED if grade is None else grade
+                for grade in data["grades"]
+            )),
+            extra = extra or None
+        )
+
+    def to_json(self) -> dict:
+        data = {
+            "weight": self.weight,
+            "amount": self.amount,
+            "dropped": self.dropped,
+            "grades": self.grade_list(),
+        }
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+class Course:
+    __slots__ = ("assessments", "scale", "extra")
+
+    JSON_KEYS = ("assessments", "scale")
+
+    def __init__(
+        self,
+        assessments: dict[str, Assessment],
+        scale: GradeScale,
+        extra: dict | None = None
+    ):
+        self.assessments = assessments
+        self.scale = scale
+        self.extra = extra
+
+    @classmethod
+    def from_json(cls, data: dict) -> "Course":
+        extra = {
+            key: value for key, value in data.items()
+            if key not in cls.JSON_KEYS
+        }
+        return cls(
+            assessments = {
+                name: Assessment.from_json(a)
+                for name, a in data["assessments"].items()
+            },
+            scale = GradeScale(data["scale"]),
+            extra = extra or None
+        )
+
+    def to_json(self) -> dict:
+        data = {
+            "assessments": {
+                name: a.to_json() for name, a in self.assessments.items()
+            },
+            "scale": self.scale.to_json(),
+        }
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+class LazyCourses(MutableMapping):
+    '''
+    Courses that are only loaded when they are first looked up.
+    Iterating over the names does not load any course.
+    '''
+    def __init__(self, names: list[str], load: Callable[[str], Course]):
+        self._courses = dict.fromkeys(names)
+        self._load = load
+        # commands and the autosave thread may look up the same course
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name: str) -> Course:
+        course = self._courses[name]
+        if course is None:
+            with self._lock:
+                course = self._courses[name]
+                if course is None:
+                    course = self._load(name)
+                    self._courses[name] = course
+        return course
+
+    def __setitem__(self, name: str, course: Course):
+        self._courses[name] = course
+
+    def __delitem__(self, name: str):
+        del self._courses[name]
+
+    def __iter__(self):
+        return iter(self._courses)
+
+    def __len__(self) -> int:
+        return len(self._courses)
+
+    def __contains__(self, name) -> bool:
+        return name in self._courses
+
+    def loaded(self) -> list[str]:
+        '''Returns the names of the courses loaded so far.'''
+        return [name for name, course in self._courses.items() if course is not None]
+
+def courses_from_json(data: dict) -> dict[str, Course]:
+    '''Converts validated data, as stored in JSON, to courses.'''
+    return {name: Course.from_json(course) for name, course in data.items()}
+
+def courses_to_json(courses: dict[str, Course]) -> dict:
+    '''Converts courses to data that can be stored in JSON.'''
+    return {name: course.to_json() for name, course in courses.items()}
@@ -5,30 +5,35 @@ class OutlineParseError(Exception): pass
 class OutlineParser:
     # Uses state pattern
     def parse(self, filename) -> dict | None:
+        try:
+            return self.parse_file(filename)
+        except OutlineParseError as e:
+            print(f"\nERROR at line {self.line_num}:")
+            print(e)
+            print()
+            return None
+
+    def parse_file(self, filename) -> dict:
+        '''
+        Parses an outline in outlines/. Raises OutlineParseError
+        at the first invalid line (see line_num).
+        '''
         self.state = None
         self.line = None
         self.line_num = 1
         self.courses = {}
         self.current_course = None
-        error = False
 
-        try:
-            with open(os.path.join("outlines", filename), "r") as f:
-                for line in f:
-                    if line:
-                        self.line = line.strip()
-                        transitioned = self._state_transition()
-                        if self.line and not transitioned:
-                            self._state_process()
-                        self.line_num += 1
+        with open(os.path.join("outlines", filename), "r") as f:
+            for line in f:
+                if line:
+                    self.line = line.strip()
+                    transitioned = self._state_transition()
+                    if self.line and not transitioned:
+                        self._state_process()
+                    self.line_num += 1
 
-        except OutlineParseError as e:
-            print(f"\nERROR at line {self.line_num}:")
-            print(e)
-            print()
-            error = True
-
-        return self.courses if not error else None
+        return self.courses
 
     def _state_transition(self):
         transitioned = True
@@ -67,6 +72,10 @@ class OutlineParser:
         
         parts = self.line.split()  
 
+        # a drop policy can follow the weight
+        num_parts = 5 if len(parts) >= 5 and parts[1] == "drop" else 3
+        parts, options = parts[:num_parts], parts[num_parts:]
+
         if len(parts) == 3:
             amount, name, weight = parts[0], parts[1], parts[2]
             drop, dropped = "", 0
@@ -96,6 +105,17 @@ class OutlineParser:
             "dropped": dropped,
             "grades": [None] * amount
         }
+        if options:
+            self.courses[self.current_course]["assessments"][name]["drops"] = self._parse_policy(options)
+
+    def _parse_policy(self, options: list[str]) -> dict:
+        '''Parses the drop policy after an assessment's weight (see utils.drops).'''
+        match options:
+            case ["category", category]:
+                return {"policy": "lowest-per-category", "category": category}
+            case ["replace", "lowest", "with", final]:
+                return {"policy": "replace-lowest-with-final", "final": final}
+        raise OutlineParseError(f"Invalid drop policy: '{self.line}'")
 
     def _parse_scale(self):
         parts = self.line.split()
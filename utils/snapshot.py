@@ -0,0 +1,73 @@
+'''
+Snapshot cache of loaded data files.
+
+Once a data file has been parsed and validated, its data is pickled to
+data/.cache/<name>.bin along with the file's size, mtime and content
+hash. Loading the same file again unpickles the snapshot instead of
+parsing and validating the JSON. Any mismatch, or a snapshot that cannot
+be read, falls back to the JSON file.
+'''
+import os
+import pickle
+import hashlib
+
+from utils.validation import SCHEMA_VERSION
+
+# bump when the snapshot layout changes
+VERSION = 1
+
+CACHE_PATH = os.path.join("data", ".cache")
+
+def snapshot_path(filename) -> str:
+    return os.path.join(CACHE_PATH, f"{filename}.bin")
+
+def digest(raw: bytes) -> str:
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+def key(filepath, raw: bytes) -> tuple:
+    '''Identifies the contents of a data file.'''
+    stat = os.stat(filepath)
+    return (VERSION, SCHEMA_VERSION), stat.st_size, stat.st_mtime_ns, digest(raw)
+
+def load(filename, filepath, raw: bytes) -> dict | None:
+    '''
+    Returns the data of a snapshot taken of the given contents
+    of a data file, or None if there is no fresh snapshot.
+    '''
+    try:
+        stat = os.stat(filepath)
+        with open(snapshot_path(filename), 'rb') as f:
+            version, size, mtime_ns, content_hash = pickle.load(f)
+            # the hash is only checked once the cheap fields match
+            if (version, size, mtime_ns) != ((VERSION, SCHEMA_VERSION), stat.st_size, stat.st_mtime_ns):
+                return None
+            if content_hash != digest(raw):
+                return None
+            return pickle.load(f)
+    except Exception:
+        return None
+
+def store(filename, filepath, raw: bytes, data: dict):
+    '''
+    Takes a snapshot of valid data, as read from (or written to)
+    a data file with the given contents.
+    '''
+    path = snapshot_path(filename)
+    temp_path = path + ".tmp"
+    try:
+        os.makedirs(CACHE_PATH, exist_ok=True)
+        with open(temp_path, 'wb') as f:
+            # the key is pickled separately so stale snapshots are rejected quickly
+            pickle.dump(key(filepath, raw), f, pickle.HIGHEST_PROTOCOL)
+            pickle.dump(data, f, pickle.HIGHEST_PROTOCOL)
+        # a lost snapshot is only a cache miss, so it is not flushed to disk
+        os.replace(temp_path, path)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def remove(filename):
+    '''Deletes the snapshot of a data file, if there is one.'''
+    path = snapshot_path(filename)
+    if os.path.exists(path):
+        os.remove(path)
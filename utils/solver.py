@@ -0,0 +1,126 @@
+'''
+Exact, drop-aware target solver.
+
+The final grade is a non-decreasing, piecewise linear function of a
+uniform grade on every remaining item. Its breakpoints are the existing
+grades, where the remaining grade starts to outrank one of them for a
+kept spot. The final grade is evaluated with prefix sums and bisect,
+and the needed grade is found by binary search over the breakpoints,
+then solved exactly on the linear piece that contains it.
+'''
+import math
+from bisect import bisect_left
+from itertools import accumulate
+
+from utils import drops
+from utils import stats
+from utils.models import Assessment
+
+def prepare(assessments: dict[str, Assessment]) -> dict:
+    '''
+    Precomputes the sorted grades and prefix sums of each assessment.
+    The result can be reused until the assessments change.
+    '''
+    assessments = drops.resolve(assessments)
+    return assemble({name: prepare_row(a) for name, a in assessments.items()})
+
+def prepare_row(assessment: Assessment) -> tuple:
+    '''Precomputes the sorted grades and prefix sums of one assessment.'''
+    grades = assessment.grades
+    graded = sorted(stats.filter_ungraded(grades))
+    return (
+        graded,
+        [0, *accumulate(graded)],
+        len(grades) - len(graded),
+        assessment.dropped,
+        len(grades) - assessment.dropped,
+        assessment.weight
+    )
+
+def assemble(rows: dict[str, tuple]) -> dict:
+    '''
+    Combines the prepared rows of a course's assessments (see prepare_row),
+    so rows of unchanged assessments can be shared between courses.
+    '''
+    breakpoints = {0, 100}
+    num_remaining = 0
+    total_weight = 0
+
+    for graded, _prefix, remaining, _dropped, _kept, weight in rows.values():
+        breakpoints.update(graded)
+        num_remaining += remaining
+        total_weight += weight
+
+    return {
+        "rows": rows,
+        "breakpoints": sorted(breakpoints),
+        "remaining": num_remaining,
+        "total_weight": total_weight,
+    }
+
+def final_grade(prepared: dict, remaining_grade: float) -> float:
+    '''
+    Returns the weighted average the course would end with if every
+    ungraded item received the remaining grade (see stats.final_grade).
+    '''
+    if prepared["total_weight"] == 0:
+        return 0
+
+    total = 0
+    for graded, prefix, num_remaining, num_dropped, num_kept, weight in prepared["rows"].values():
+        # the lowest grades are dropped: graded ones below the remaining
+        # grade first, then remaining items, then the rest of the graded ones
+        below = min(bisect_left(graded, remaining_grade), num_dropped)
+        dropped_remaining = min(num_remaining, num_dropped - below)
+        dropped_graded = num_dropped - dropped_remaining
+
+        lowest_sum = prefix[dropped_graded] + remaining_grade * dropped_remaining
+        kept_sum = prefix[-1] + remaining_grade * num_remaining - lowest_sum
+
+        total += kept_sum / num_kept * weight
+
+    return total / prepared["total_weight"]
+
+def solve(prepared: dict, target_grade: float) -> float | None:
+    '''
+    Returns the exact average needed on each remaining item
+    to achieve the target grade.
+    Returns None if no ungraded items remain.
+
+    The result is above 100 if the target cannot be achieved
+    (infinite if no grade would be enough), and at most 0 if
+    it has already been achieved.
+    '''
+    if prepared["remaining"] == 0:
+        return None
+
+    points = prepared["breakpoints"]
+
+    lo, hi = 0, len(points) - 1
+    f_lo = final_grade(prepared, points[lo])
+    if f_lo >= target_grade:
+        return _extrapolate(prepared, points[lo], f_lo, target_grade, -1)
+
+    f_hi = final_grade(prepared, points[hi])
+    if f_hi < target_grade:
+        return _extrapolate(prepared, points[hi], f_hi, target_grade, 1)
+
+    # f(points[lo]) < target <= f(points[hi])
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        f_mid = final_grade(prepared, points[mid])
+        if f_mid < target_grade:
+            lo, f_lo = mid, f_mid
+        else:
+            hi, f_hi = mid, f_mid
+
+    x_lo, x_hi = points[lo], points[hi]
+    return x_lo + (target_grade - f_lo) * (x_hi - x_lo) / (f_hi - f_lo)
+
+def _extrapolate(prepared: dict, x: float, f_x: float, target_grade: float, direction: int) -> float:
+    '''Solves on the linear piece beyond the outermost breakpoint x.'''
+    slope = (final_grade(prepared, x + direction) - f_x) * direction
+    if slope <= 0:
+        # no remaining grade changes the outcome
+        return math.inf if direction > 0 else x
+    return x + (target_grade - f_x) / slope
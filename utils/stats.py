@@ -1,42 +1,28 @@
-from copy import deepcopy
+import heapq
 
-def course_totals(course: dict) -> tuple[str, str]:
-    '''
-    Returns the total weighted average and achieved grades
-    of a course, formatted to be used in tables.
-    '''
-    assessments = course["assessments"]
-
-    achieved = total_achieved(assessments)
-    weighted_average = total_weighted_average(assessments)
-
-    achieved_letter = get_letter_grade(course, achieved)
-    weighted_average_letter = get_letter_grade(course, weighted_average)
+from utils import drops
+from utils.models import Assessment, Course, is_graded
 
-    achieved_str = ""
-    if achieved_letter:
-        achieved_str += f"({achieved_letter}) "
+def format_total(grade: float, letter: str | None) -> str:
+    '''Formats a total grade, prefixed by its letter grade if it has one.'''
+    s = ""
+    if letter:
+        s += f"({letter}) "
 
-    achieved_str += f"{achieved:.2f} %"
+    s += f"{grade:.2f} %"
 
-    weighted_average_str = ""
-    if weighted_average_letter:
-        weighted_average_str += f"({weighted_average_letter}) "
+    return s
 
-    weighted_average_str += f"{weighted_average:.2f} %"
-
-    return weighted_average_str, achieved_str
-
-def achieved_weight(assessment: dict):
+def achieved_weight(assessment: Assessment):
     '''Returns the achieved weight of the assessment, in percent.'''
-    weight = int(assessment["weight"])
-    amount = assessment["amount"] - assessment["dropped"]
+    weight = int(assessment.weight)
+    amount = assessment.amount - assessment.dropped
 
     kept, _ = filter_dropped(assessment)
 
     points = 0
     for grade in kept:
-        if grade:
+        if is_graded(grade):
             points += grade
 
     achieved_weight = points / (amount * 100) * weight
@@ -59,28 +45,34 @@ def average(l: list):
         sum += n
     return sum / len(l)
 
-def total_graded_weight(assessments: dict):
+def total_graded_weight(assessments: dict[str, Assessment]):
     '''Calculates the weight of the course that has been graded.'''
+    assessments = drops.resolve(assessments)
     total = 0
     for _name, data in assessments.items():
-        grades = data["grades"]
-        weight = data["weight"]
-        _, dropped = filter_dropped(data)
-        to_drop = data["dropped"] - len(dropped)
-        graded = len(filter_ungraded(grades))
-        total += graded / ((len(grades) - to_drop)) * weight
+        total += graded_weight(data)
     return total
 
-def total_weighted_average(assessments: dict):
+def graded_weight(assessment: Assessment):
+    '''Calculates the weight of the assessment that has been graded.'''
+    grades = assessment.grades
+    weight = assessment.weight
+    _, dropped = filter_dropped(assessment)
+    to_drop = assessment.dropped - len(dropped)
+    graded = len(filter_ungraded(grades))
+    return graded / ((len(grades) - to_drop)) * weight
+
+def total_weighted_average(assessments: dict[str, Assessment]):
     '''Calculates the achieved weighted average of a course.'''
+    assessments = drops.resolve(assessments)
     completed_weight = 0
     total = 0
     for _name, data in assessments.items():
-        weight = data["weight"]
+        weight = data.weight
         kept, _ = filter_dropped(data)
         total += interim_weight(kept) * weight / 100
         if len(filter_ungraded(kept)) > 0:
-            completed_weight += data["weight"]
+            completed_weight += data.weight
 
     if completed_weight > 0:
         total /= completed_weight
@@ -88,48 +80,70 @@ def total_weighted_average(assessments: dict):
 
     return total
 
-def total_achieved(assessments: dict):
+def total_achieved(assessments: dict[str, Assessment]):
     '''Calculates the achieved weight of a course.'''
+    assessments = drops.resolve(assessments)
     total = 0
     for _name, data in assessments.items():
         total += achieved_weight(data)
     return total
 
-def needed_for_target(assessments: dict, target_grade) -> float | None:
+def needed_for_target(assessments: dict[str, Assessment], target_grade) -> float | None:
     '''
     Returns the average needed on each remaining grade
     to achieve the target grade.
     Returns None if no ungraded assessments remain.
     '''
+    achieved_weighted_sum, remaining_fraction_sum = needed_sums(assessments)
+    return needed_from_sums(achieved_weighted_sum, remaining_fraction_sum, target_grade)
+
+def needed_sums(assessments: dict[str, Assessment]) -> tuple[float, float]:
+    '''
+    Returns the weighted sum of achieved grades and the
+    weighted fraction of the course that remains, which
+    are shared by every target grade.
+    '''
     achieved_weighted_sum = 0
     remaining_fraction_sum = 0
 
-    for _name, a in assessments.items():
-        # calculate number of ungraded assessments
-        kept, dropped = filter_dropped(a)
-        to_keep = a["amount"] - a["dropped"]
-        completed_grades = filter_ungraded(kept)
-        remaining = to_keep - len(completed_grades)
+    for _name, a in drops.resolve(assessments).items():
+        achieved_weighted, remaining_fraction = needed_terms(a)
+        achieved_weighted_sum += achieved_weighted
+        remaining_fraction_sum += remaining_fraction
+
+    return achieved_weighted_sum, remaining_fraction_sum
+
+def needed_terms(a: Assessment) -> tuple[float, float]:
+    '''Returns the terms an assessment contributes to needed_sums.'''
+    # calculate number of ungraded assessments
+    kept, dropped = filter_dropped(a)
+    to_keep = a.amount - a.dropped
+    completed_grades = filter_ungraded(kept)
+    remaining = to_keep - len(completed_grades)
 
-        # adjust for potential grades that could be dropped
-        to_drop = a["dropped"] - len(dropped)
-        if len(dropped) < to_drop:
-            remaining += to_drop
-        if remaining > to_keep:
-            remaining = to_keep
+    # adjust for potential grades that could be dropped
+    to_drop = a.dropped - len(dropped)
+    if len(dropped) < to_drop:
+        remaining += to_drop
+    if remaining > to_keep:
+        remaining = to_keep
 
-        # accumulate sums
-        weight = a["weight"]
+    weight = a.weight
 
-        # drop lowest completed grades if possible
-        kept_min, _ = filter_dropped(a, maximize=False)
-        kept_min = filter_ungraded(kept_min)
+    # drop lowest completed grades if possible
+    kept_min, _ = filter_dropped(a, maximize=False)
+    kept_min = filter_ungraded(kept_min)
 
-        achieved = sum(kept_min)
-        
-        achieved_weighted_sum += achieved * weight / to_keep
-        remaining_fraction_sum += remaining * weight / to_keep
+    achieved = sum(kept_min)
 
+    return achieved * weight / to_keep, remaining * weight / to_keep
+
+def needed_from_sums(
+    achieved_weighted_sum: float,
+    remaining_fraction_sum: float,
+    target_grade
+) -> float | None:
+    '''Solves for the needed average using the sums from needed_sums.'''
     if remaining_fraction_sum == 0:
         return None
     
@@ -137,58 +151,62 @@ def needed_for_target(assessments: dict, target_grade) -> float | None:
 
     return x
 
-def max_grade_possible(assessments: dict) -> float:
+def max_grade_possible(assessments: dict[str, Assessment]) -> float:
     '''Returns the maximum grade achievable.'''
-    # brute force by simulating remaining grades as 100%
-    sim = deepcopy(assessments)
-    for _name, a in sim.items():
-        grades = a["grades"]
-        a["grades"] = list(100 if grade is None else grade for grade in grades)
-    return total_weighted_average(sim)
-
-def filter_dropped(assessment: dict, maximize = True) -> tuple[list, list]:
+    return final_grade(assessments, 100)
+
+def min_grade_possible(assessments: dict[str, Assessment]) -> float:
+    '''Returns the minimum grade achievable.'''
+    return final_grade(assessments, 0)
+
+def grade_bounds(assessments: dict[str, Assessment]) -> tuple[float, float]:
+    '''Returns the minimum and maximum grades achievable.'''
+    return min_grade_possible(assessments), max_grade_possible(assessments)
+
+def final_grade(assessments: dict[str, Assessment], remaining_grade: float) -> float:
+    '''
+    Returns the weighted average the course would end with
+    if every ungraded item received the remaining grade.
+    '''
+    completed_weight = 0
+    total = 0
+    for _name, a in drops.resolve(assessments).items():
+        grades = a.grades
+        weight = a.weight
+        graded = filter_ungraded(grades)
+        num_remaining = len(grades) - len(graded)
+        num_dropped = a.dropped
+
+        # once everything is graded, the lowest grades are dropped,
+        # which may include some of the remaining ones
+        lowest = heapq.nsmallest(num_dropped, graded)
+        lowest += [remaining_grade] * min(num_remaining, num_dropped)
+        lowest = heapq.nsmallest(num_dropped, lowest)
+
+        kept_sum = sum(graded) + remaining_grade * num_remaining - sum(lowest)
+        num_kept = len(grades) - num_dropped
+
+        total += kept_sum / num_kept * weight / 100
+        completed_weight += weight
+
+    if completed_weight > 0:
+        total /= completed_weight
+    total *= 100
+
+    return total
+
+def filter_dropped(assessment: Assessment, maximize = True) -> tuple[list, list]:
     '''
     Returns two lists: grades after dropping, and the dropped grades.
     By default, keeps as many grades as possible.
     If maximize is false, drops as many as possible.
     '''
-    grades: list = assessment["grades"][:]
-    dropped = []
-
-    filtered_grades = filter_ungraded(grades)
-
-    num_graded = len(filtered_grades)
-    num_total = len(grades)
-    num_dropped = assessment["dropped"]
-    if maximize:
-        num_to_drop = max(0, num_graded - (num_total - num_dropped))
-    else:
-        num_to_drop = num_dropped
-
-    if num_to_drop > 0:
-        for grade in filtered_grades:
-            if len(dropped) < num_to_drop:
-                dropped.append(grade)
-            elif grade < max(dropped):
-                dropped[dropped.index(max(dropped))] = grade
-
-        for grade in dropped:
-            grades.remove(grade)
-
-    return grades, dropped
-
-def get_letter_grade(course: dict, grade: float):
-    scale = course["scale"].items()
-    letter_grade = None
-    maximum = 0
-    for letter, value in scale:
-        if grade >= value and value > maximum:
-            maximum = value
-            letter_grade = letter
-    return letter_grade
-
-def filter_ungraded(grades: list):
-    return list(filter(
-        lambda grade: grade is not None,
-        grades
-    ))
\ No newline at end of file
+    mask = drops.drop_lowest(assessment, maximize)
+    return drops.split(assessment.grades, mask)
+
+def get_letter_grade(course: Course, grade: float):
+    '''Returns the letter grade of a grade in the course's scale, if any.'''
+    return course.scale.letter(grade)
+
+def filter_ungraded(grades) -> list[float]:
+    return list(filter(is_graded, grades))
\ No newline at end of file
@@ -0,0 +1,937 @@
+'''
+Storage backends for grade data.
+
+A storage keeps named data (one per outline) as stored in JSON, and
+is selected with the PYGRADES_STORAGE environment variable:
+- "json" (default): data/<name>.json files, see utils.file_management
+- "sqlite": every dataset in data/pygrades.db, with indexed tables for
+  courses, assessments, grades and scales
+- "sharded": data/<name>/ directories with one file per course, which
+  are loaded when first used and only written when edited
+
+Each storage also opens the journal that records edits until they are
+saved. The SQLite journal commits every edit to the database in its own
+transaction, along with the value it replaced, so unsaved edits can
+still be undone.
+
+Data can be moved between the two formats with:
+    python -m utils.storage import <file.json> [name]
+    python -m utils.storage export <name> <file.json>
+'''
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+from abc import ABC, abstractmethod
+from typing import Callable, Iterable
+
+from utils import file_management as files
+from utils import history
+from utils import input_output as io
+from utils import journal
+from utils import manifest
+from utils import snapshot
+from utils.archive import Archive, ArchiveError
+from utils.history import HistoryError
+from utils.journal import Journal
+from utils.models import Course, LazyCourses, courses_from_json, courses_to_json
+from utils.validation import parse_data, validate_schema
+
+ENV_VAR = "PYGRADES_STORAGE"
+
+class StorageError(Exception): pass
+
+class Storage(ABC):
+    '''The interface of a storage backend.'''
+    @abstractmethod
+    def list(self) -> list[str]:
+        '''Returns the names of the stored data.'''
+
+    def exists(self, name: str) -> bool:
+        return name in self.list()
+
+    def previews(self, names: Iterable[str]) -> dict[str, str]:
+        '''Returns a short description of the named data, where one is known.'''
+        return {}
+
+    @abstractmethod
+    def load(self, name: str) -> dict | None:
+        '''Returns valid data, or None if it could not be loaded.'''
+
+    def open(self, name: str) -> dict[str, Course] | None:
+        '''
+        Returns the courses of stored data with its journaled edits
+        (see recover), or None if it could not be loaded.
+        '''
+        data = self.load(name)
+        if data is None:
+            return None
+        return courses_from_json(self.recover(name, data))
+
+    def to_json(self, courses: dict[str, Course], dirty: set[str] | None = None) -> dict:
+        '''
+        Converts courses to the data to write (see write). If dirty is
+        given, the other courses are reused from the last conversion of
+        the same courses, as they have not changed since.
+        '''
+        last_courses, last_data = getattr(self, "_converted", (None, None))
+        if dirty is None or courses is not last_courses:
+            data = courses_to_json(courses)
+        else:
+            data = {
+                name: last_data[name] if name in last_data and name not in dirty else course.to_json()
+                for name, course in courses.items()
+            }
+        self._converted = (courses, data)
+        return data
+
+    @abstractmethod
+    def write(self, name: str, data: dict, dirty: set[str] | None = None) -> bool:
+        '''
+        Backs up and replaces data. If dirty is given, only those courses
+        are validated (and may be the only ones written).
+        Returns true if successful.
+        '''
+
+    @abstractmethod
+    def open_journal(self, name: str, sync = True):
+        '''Returns the journal that records edits to data (see utils.journal.Journal).'''
+
+    @abstractmethod
+    def recover(self, name: str, data: dict) -> dict:
+        '''Returns the loaded data with its journaled edits, asking about unsaved ones.'''
+
+    @abstractmethod
+    def discard_edits(self, name: str):
+        '''Forgets the journaled edits of data that was replaced.'''
+
+    def archive(self, name: str, ext: str) -> bool:
+        '''Compresses data that is not loaded. Returns true if successful.'''
+        raise StorageError("Only JSON data files can be archived.")
+
+    def versions(self, name: str) -> "list[dict]":
+        '''Returns the saved versions of data, oldest first (see utils.history.versions).'''
+        raise StorageError("Backup history is only kept for JSON data files.")
+
+    def version(self, name: str, version_hash: str) -> dict:
+        '''Returns the valid data of a saved version, or raises StorageError.'''
+        raise StorageError("Backup history is only kept for JSON data files.")
+
+class JsonStorage(Storage):
+    '''
+    Data files in data/, with backups in data/backup/.
+    Archived data files are compressed (see file_management.CODECS),
+    or packed into data/archive.zip (see utils.archive).
+
+    Packed data sets are loaded one course at a time, straight from the
+    archive. Once they are saved, a data file takes their place.
+    '''
+    def __init__(self):
+        self.packed = Archive()
+
+    def list(self) -> list[str]:
+        names = files.list_data()
+        return names + [name for name in self._packed_names() if name not in names]
+
+    def exists(self, name: str) -> bool:
+        return os.path.exists(self.filepath(name)) or name in self._packed_names()
+
+    def previews(self, names: Iterable[str]) -> dict[str, str]:
+        described = manifest.read()
+        previews = {}
+        for name in names:
+            if os.path.exists(self.filepath(name)):
+                if name in described and manifest.is_current(described[name], self.filepath(name)):
+                    previews[name] = manifest.preview(described[name])
+            elif name in self._packed_names():
+                num_courses = len(self.packed.courses(name))
+                previews[name] = f" (archived, {num_courses} course{'s' if num_courses != 1 else ''})"
+        return previews
+
+    def filepath(self, name: str) -> str:
+        return files.data_filepath(name)
+
+    def load(self, name: str) -> dict | None:
+        if os.path.exists(self.filepath(name)):
+            return files.load_data(self.filepath(name))
+        try:
+            return self.packed.read(name)
+        except ArchiveError as e:
+            print(f"\nERROR: {e}\n")
+            return None
+
+    def open(self, name: str) -> dict[str, Course] | None:
+        if os.path.exists(self.filepath(name)):
+            return super().open(name)
+
+        try:
+            names = self.packed.courses(name)
+        except ArchiveError as e:
+            print(f"\nERROR: {e}\n")
+            return None
+
+        # journaled edits are replayed on each course when it is loaded
+        pending = {course: [] for course in names}
+        skipped = 0
+        for record in files.journal_records(name):
+            if record.get("course") in pending:
+                pending[record["course"]].append(record)
+            else:
+                skipped += 1
+        if skipped:
+            print(f"NOTICE: Skipped {skipped} changes that no longer match {name}.")
+
+        def load(course: str) -> Course:
+            try:
+                data = self.packed.read_course(name, course)
+            except ArchiveError as e:
+                print(f"\nERROR: {e}\n")
+                io.notify_and_exit()
+            skipped = journal.replay(data, pending.pop(course))
+            if skipped:
+                print(f"NOTICE: Skipped {skipped} changes that no longer match {course}.")
+            return Course.from_json(data[course])
+
+        return LazyCourses(names, load)
+
+    def write(self, name: str, data: dict, dirty: set[str] | None = None) -> bool:
+        return files.write_data(data, name, dirty)
+
+    def versions(self, name: str) -> "list[dict]":
+        return history.versions(name)
+
+    def version(self, name: str, version_hash: str) -> dict:
+        try:
+            data = history.reconstruct(name, version_hash)
+        except HistoryError as e:
+            raise StorageError(str(e))
+        error = validate_schema(data)
+        if error:
+            raise StorageError(f"Version {version_hash} of {name} is invalid:\n\n{error}")
+        return data
+
+    def open_journal(self, name: str, sync = True) -> Journal:
+        return Journal(name, sync)
+
+    def recover(self, name: str, data: dict) -> dict:
+        return files.recover_journal(data, name)
+
+    def discard_edits(self, name: str):
+        journal.remove(name)
+
+    def archive(self, name: str, ext: str) -> bool:
+        if ext == ".zip":
+            return self.pack(name)
+        if not os.path.exists(self.filepath(name)):
+            print(f"{name} is already in {self.packed.path}.")
+            return False
+        return files.archive_data(name, ext)
+
+    def pack(self, name: str) -> bool:
+        '''
+        Moves a data set into the archive, writing its journaled edits
+        into it. Returns true if successful.
+        '''
+        filepath = self.filepath(name)
+        data = self.load(name)
+        if data is None:
+            return False
+        data = self.recover(name, data)
+
+        try:
+            self.packed.pack(name, data)
+        except ArchiveError as e:
+            print(f"\nERROR: {e}\n")
+            return False
+
+        # the archived copy replaces the data file (its backup is kept)
+        if os.path.exists(filepath):
+            os.remove(filepath)
+        journal.remove(name)
+        manifest.remove(name)
+        snapshot.remove(name)
+        return True
+
+    def _packed_names(self) -> "list[str]":
+        try:
+            return self.packed.names()
+        except ArchiveError as e:
+            print(f"\nERROR: {e}\n")
+            return []
+
+class ShardedStorage(Storage):
+    '''
+    Data directories in data/, each with one file per course (a shard)
+    and an index of the courses in order. Shards are backed up in
+    data/backup/<name>/.
+
+    Courses are loaded when they are first looked up, and saving only
+    writes the shards of the courses edited since the last save.
+    '''
+    INDEX = "index.json"
+
+    def list(self) -> list[str]:
+        return sorted(name for name in os.listdir("data") if self.exists(name))
+
+    def exists(self, name: str) -> bool:
+        return os.path.isfile(self.index_path(name))
+
+    def path(self, name: str) -> str:
+        return os.path.join("data", name)
+
+    def index_path(self, name: str) -> str:
+        return os.path.join(self.path(name), self.INDEX)
+
+    def shard(self, course: str) -> str:
+        '''Returns the file name of a course's shard.'''
+        return hashlib.blake2b(course.encode(), digest_size=8).hexdigest() + ".json"
+
+    def load(self, name: str) -> dict | None:
+        names = self._read_index(name)
+        if names is None:
+            return None
+
+        data = {}
+        for course in names:
+            shard = self._read_shard(name, course)
+            if shard is None:
+                return None
+            data.update(shard)
+        return data
+
+    def open(self, name: str) -> LazyCourses | None:
+        names = self._read_index(name)
+        if names is None:
+            return None
+
+        # journaled edits are written into the shards of their courses
+        # right away, so later saves only need to write edited courses
+        records = {}
+        skipped = 0
+        for record in files.journal_records(name):
+            if record.get("course") in names:
+                records.setdefault(record["course"], []).append(record)
+            else:
+                skipped += 1
+
+        data = {}
+        for course, course_records in records.items():
+            shard = self._read_shard(name, course)
+            if shard is None:
+                return None
+            skipped += journal.replay(shard, course_records)
+            data.update(shard)
+
+        if skipped:
+            print(f"NOTICE: Skipped {skipped} changes that no longer match {name}.")
+        if data:
+            if not self.write(name, data, set(data)):
+                return None
+            journal.remove(name)
+
+        def load(course: str) -> Course:
+            shard = self._read_shard(name, course)
+            if shard is None:
+                io.notify_and_exit()
+            return Course.from_json(shard[course])
+
+        courses = LazyCourses(names, load)
+        for course in data:
+            courses[course] = Course.from_json(data[course])
+        return courses
+
+    def to_json(self, courses: dict[str, Course], dirty: set[str] | None = None) -> dict:
+        # unedited courses are not written, so they do not need to be loaded
+        if dirty is None:
+            return courses_to_json(courses)
+        return {course: courses[course].to_json() for course in dirty if course in courses}
+
+    def write(self, name: str, data: dict, dirty: set[str] | None = None) -> bool:
+        courses = list(data) if dirty is None else [c for c in dirty if c in data]
+
+        error = validate_schema({course: data[course] for course in courses})
+        if error:
+            print("\nERROR: Data is corrupted:\n")
+            print(error)
+            print()
+            print(f"NOTICE: No changes to {self.path(name)} were saved.")
+            return False
+
+        os.makedirs(self.path(name), exist_ok=True)
+        os.makedirs(self.backup_path(name), exist_ok=True)
+
+        for course in courses:
+            shard_path = os.path.join(self.path(name), self.shard(course))
+            if os.path.exists(shard_path):
+                files.backup_file(shard_path, os.path.join(self.backup_path(name), self.shard(course)))
+            files.atomic_write(shard_path, json.dumps({course: data[course]}, indent=4))
+
+        # the courses only change when all of them are written
+        if dirty is None:
+            self.backup_index(name)
+            files.atomic_write(self.index_path(name), json.dumps({"courses": courses}, indent=4))
+
+            shards = {self.shard(course) for course in courses}
+            for filename in os.listdir(self.path(name)):
+                if filename.endswith(".json") and filename != self.INDEX and filename not in shards:
+                    os.remove(os.path.join(self.path(name), filename))
+
+        return True
+
+    def backup_path(self, name: str) -> str:
+        return os.path.join("data", "backup", name)
+
+    def backup_index(self, name: str):
+        if self.exists(name):
+            files.backup_file(self.index_path(name), os.path.join(self.backup_path(name), self.INDEX))
+
+    def open_journal(self, name: str, sync = True) -> "ShardJournal":
+        return ShardJournal(name, sync)
+
+    def recover(self, name: str, data: dict) -> dict:
+        return files.recover_journal(data, name)
+
+    def discard_edits(self, name: str):
+        journal.remove(name)
+
+    def _read_index(self, name: str) -> "list[str] | None":
+        try:
+            with open(self.index_path(name), 'rb') as f:
+                index = json.loads(f.read())
+            names = index["courses"]
+            if not all(isinstance(course, str) for course in names):
+                raise TypeError("course names must be strings")
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"\nERROR: Invalid index in {self.path(name)}:\n")
+            print(e)
+            print()
+            return None
+        return names
+
+    def _read_shard(self, name: str, course: str) -> dict | None:
+        '''
+        Reads and validates the shard of a course. If it is corrupted,
+        offers to continue with its backup.
+        '''
+        shard_path = os.path.join(self.path(name), self.shard(course))
+        try:
+            with open(shard_path, 'rb') as f:
+                data, error = parse_data(f.read())
+        except OSError as e:
+            data, error = None, e
+        if error is None and list(data) != [course]:
+            error = f"Expected only {course} in {shard_path}"
+        if error is None:
+            return data
+
+        print(f"\nERROR: Invalid shard for {course}:\n")
+        print(error)
+        print()
+
+        if os.path.exists(shard_path):
+            corrupt_filepath = files.get_unique_filepath(
+                os.path.join("data", "corrupt"), f"{name}-{course}(corrupt)", ".json"
+            )
+            os.rename(shard_path, corrupt_filepath)
+            print(f"NOTICE: Moved {shard_path} to {corrupt_filepath}")
+
+        backup_filepath = os.path.join(self.backup_path(name), self.shard(course))
+        if not os.path.exists(backup_filepath):
+            print("NOTICE: No backup data found. Quitting the program...")
+            return None
+
+        files.backup_file(backup_filepath, shard_path)
+        print(f"NOTICE: Restored {course} from backup.\n")
+        cont = io.input_until_valid(
+            "Continue with backup data? (y/n) ",
+            lambda c: io.yes_or_no(c)
+        )
+        if cont != 'y':
+            return None
+        return self._read_shard(name, course)
+
+class ShardJournal(Journal):
+    '''
+    Journal of a sharded data directory. As only edited shards are
+    written, every save writes them instead of waiting for the journal
+    to grow.
+    '''
+    def needs_compaction(self, closing = False) -> bool:
+        return self.num_records > 0
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS datasets (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS courses (
+    id INTEGER PRIMARY KEY,
+    dataset_id INTEGER NOT NULL REFERENCES datasets(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    extra TEXT,
+    UNIQUE (dataset_id, name)
+);
+CREATE TABLE IF NOT EXISTS assessments (
+    id INTEGER PRIMARY KEY,
+    course_id INTEGER NOT NULL REFERENCES courses(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    weight NUMERIC NOT NULL,
+    amount NUMERIC NOT NULL,
+    dropped NUMERIC NOT NULL,
+    extra TEXT,
+    UNIQUE (course_id, name)
+);
+CREATE TABLE IF NOT EXISTS grades (
+    assessment_id INTEGER NOT NULL REFERENCES assessments(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    grade REAL,
+    PRIMARY KEY (assessment_id, position)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS scales (
+    course_id INTEGER NOT NULL REFERENCES courses(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    letter TEXT NOT NULL,
+    minimum NUMERIC NOT NULL,
+    PRIMARY KEY (course_id, letter)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS backups (
+    dataset_id INTEGER PRIMARY KEY REFERENCES datasets(id) ON DELETE CASCADE,
+    created REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS edits (
+    id INTEGER PRIMARY KEY,
+    dataset_id INTEGER NOT NULL REFERENCES datasets(id) ON DELETE CASCADE,
+    record TEXT NOT NULL,
+    previous TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS courses_dataset ON courses (dataset_id, position);
+CREATE INDEX IF NOT EXISTS assessments_course ON assessments (course_id, position);
+CREATE INDEX IF NOT EXISTS edits_dataset ON edits (dataset_id, id);
+'''
+
+class SqliteStorage(Storage):
+    '''Every dataset in one SQLite database.'''
+    def __init__(self, path = os.path.join("data", "pygrades.db")):
+        self.path = path
+        self._db = None
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        # opened on first use, after setup_dirs has created data/
+        if self._db is None:
+            # shared with the autosave thread, which is serialized by the REPL lock
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA foreign_keys = ON")
+            self._db.execute("PRAGMA journal_mode = WAL")
+            self._db.executescript(SCHEMA)
+        return self._db
+
+    def list(self) -> list[str]:
+        return [name for (name,) in self.db.execute("SELECT name FROM datasets ORDER BY name")]
+
+    def exists(self, name: str) -> bool:
+        return self._dataset_id(name) is not None
+
+    def load(self, name: str) -> dict | None:
+        data = self.export_data(name)
+        if data is None:
+            print(f"\nERROR: No data named {name} in {self.path}.\n")
+            return None
+
+        error = validate_schema(data)
+        if error:
+            print("\nERROR: Invalid schema in stored data:\n")
+            print(error)
+            print()
+            return self._restore_backup(name, data)
+
+        return data
+
+    def write(self, name: str, data: dict, dirty: set[str] | None = None) -> bool:
+        error = validate_schema(data, dirty)
+        if error:
+            print("\nERROR: Data is corrupted:\n")
+            print(error)
+            print()
+            print(f"NOTICE: No changes to {name} were saved.")
+            return False
+
+        self.backup(name)
+        self._store(name, data, dirty)
+        return True
+
+    def _store(self, name: str, data: dict, dirty: set[str] | None = None):
+        with self.db:
+            dataset_id = self._dataset_id(name)
+            if dataset_id is None:
+                dataset_id = self.db.execute(
+                    "INSERT INTO datasets (name) VALUES (?)", (name,)
+                ).lastrowid
+
+            # other courses are unchanged, as every edit is already stored
+            names = list(data) if dirty is None else [c for c in dirty if c in data]
+            if dirty is None:
+                self.db.execute("DELETE FROM courses WHERE dataset_id = ?", (dataset_id,))
+            for course in names:
+                self.db.execute(
+                    "DELETE FROM courses WHERE dataset_id = ? AND name = ?", (dataset_id, course)
+                )
+                self._insert_course(dataset_id, list(data).index(course), course, data[course])
+
+    def backup(self, name: str):
+        data = self.export_data(name)
+        if data is None:
+            return
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO backups (dataset_id, created, data) VALUES (?, ?, ?)",
+                (self._dataset_id(name), time.time(), json.dumps(data))
+            )
+
+    def _restore_backup(self, name: str, corrupted: dict) -> dict | None:
+        '''
+        Replaces corrupted data with its backup, keeping a copy of the
+        corrupted data in data/corrupt/. Returns the backup if the user
+        wishes to continue with it.
+        '''
+        corrupt_filepath = files.get_unique_filepath(
+            os.path.join("data", "corrupt"), f"{name}(corrupt)", ".json"
+        )
+        files.atomic_write(corrupt_filepath, json.dumps(corrupted, indent=4))
+        print(f"NOTICE: Saved the corrupted data to {corrupt_filepath}")
+
+        row = self.db.execute(
+            "SELECT created, data FROM backups WHERE dataset_id = ?", (self._dataset_id(name),)
+        ).fetchone()
+        data = None
+        if row is not None:
+            data, error = parse_data(row[1].encode())
+            if error is not None:
+                data = None
+        if data is None:
+            print("NOTICE: No backup data found. Quitting the program...")
+            return None
+
+        # the unsaved edits were made to the corrupted data
+        self._store(name, data)
+        self.discard_edits(name)
+        saved = time.strftime('%Y-%m-%d %H:%M', time.localtime(row[0]))
+        print(f"NOTICE: Restored data from the backup saved {saved}.\n")
+        cont = io.input_until_valid(
+            "Continue with backup data? (y/n) ",
+            lambda c: io.yes_or_no(c)
+        )
+        if cont != 'y':
+            return None
+        return data
+
+    def open_journal(self, name: str, sync = True) -> "SqliteJournal":
+        return SqliteJournal(self, name, sync)
+
+    def recover(self, name: str, data: dict) -> dict:
+        num_edits = self.db.execute(
+            "SELECT COUNT(*) FROM edits WHERE dataset_id = ?", (self._dataset_id(name),)
+        ).fetchone()[0]
+        if num_edits == 0:
+            return data
+
+        message = f"Found {num_edits} unsaved changes to {name} from a previous session. Recover them? (y/n) "
+        choice = io.input_until_valid(
+            message = message,
+            func = lambda c:
+                io.yes_or_no(c)
+        )
+        if choice == 'y':
+            return data
+
+        self.open_journal(name).discard()
+        return self.load(name)
+
+    def discard_edits(self, name: str):
+        with self.db:
+            self.db.execute("DELETE FROM edits WHERE dataset_id = ?", (self._dataset_id(name),))
+
+    # ========= #
+    # Importing #
+    # ========= #
+
+    def import_data(self, name: str, data: dict) -> bool:
+        '''Stores data in the JSON format under the given name.'''
+        success = self.write(name, data)
+        if success:
+            self.discard_edits(name)
+        return success
+
+    def export_data(self, name: str) -> dict | None:
+        '''Returns stored data in the JSON format, or None if there is none.'''
+        dataset_id = self._dataset_id(name)
+        if dataset_id is None:
+            return None
+
+        data = {}
+        course_ids = {}
+        for course_id, course, extra in self.db.execute(
+            "SELECT id, name, extra FROM courses WHERE dataset_id = ? ORDER BY position",
+            (dataset_id,)
+        ):
+            data[course] = {"assessments": {}, "scale": {}}
+            if extra:
+                data[course].update(json.loads(extra))
+            course_ids[course_id] = data[course]
+
+        assessment_ids = {}
+        for assessment_id, course_id, assessment, weight, amount, dropped, extra in self.db.execute(
+            "SELECT a.id, a.course_id, a.name, a.weight, a.amount, a.dropped, a.extra "
+            "FROM assessments a JOIN courses c ON a.course_id = c.id "
+            "WHERE c.dataset_id = ? ORDER BY a.course_id, a.position",
+            (dataset_id,)
+        ):
+            entry = {"weight": weight, "amount": amount, "dropped": dropped, "grades": []}
+            if extra:
+                entry.update(json.loads(extra))
+            course_ids[course_id]["assessments"][assessment] = entry
+            assessment_ids[assessment_id] = entry["grades"]
+
+        for assessment_id, grade in self.db.execute(
+            "SELECT g.assessment_id, g.grade FROM grades g "
+            "JOIN assessments a ON g.assessment_id = a.id JOIN courses c ON a.course_id = c.id "
+            "WHERE c.dataset_id = ? ORDER BY g.assessment_id, g.position",
+            (dataset_id,)
+        ):
+            assessment_ids[assessment_id].append(grade)
+
+        for course_id, letter, minimum in self.db.execute(
+            "SELECT s.course_id, s.letter, s.minimum FROM scales s "
+            "JOIN courses c ON s.course_id = c.id "
+            "WHERE c.dataset_id = ? ORDER BY s.course_id, s.position",
+            (dataset_id,)
+        ):
+            course_ids[course_id]["scale"][letter] = minimum
+
+        return data
+
+    # ===== #
+    # Edits #
+    # ===== #
+
+    def apply(self, name: str, record: dict) -> dict:
+        '''
+        Applies a journal record (see utils.journal) to stored data,
+        without committing it. Returns the record that undoes it.
+        '''
+        course_id = self._course_id(name, record["course"])
+        op = record["op"]
+
+        if op == "grade":
+            assessment_id = self._assessment_id(course_id, record["assessment"])
+            (previous,) = self.db.execute(
+                "SELECT grade FROM grades WHERE assessment_id = ? AND position = ?",
+                (assessment_id, record["index"])
+            ).fetchone()
+            self.db.execute(
+                "UPDATE grades SET grade = ? WHERE assessment_id = ? AND position = ?",
+                (record["grade"], assessment_id, record["index"])
+            )
+            return {**record, "grade": previous}
+
+        elif op == "scale":
+            (previous,) = self.db.execute(
+                "SELECT minimum FROM scales WHERE course_id = ? AND letter = ?",
+                (course_id, record["letter"])
+            ).fetchone()
+            self.db.execute(
+                "UPDATE scales SET minimum = ? WHERE course_id = ? AND letter = ?",
+                (record["minimum"], course_id, record["letter"])
+            )
+            return {**record, "minimum": previous}
+
+        elif op == "dropped":
+            (previous,) = self.db.execute(
+                "SELECT dropped FROM assessments WHERE id = ?",
+                (self._assessment_id(course_id, record["assessment"]),)
+            ).fetchone()
+            self.db.execute(
+                "UPDATE assessments SET dropped = ? WHERE course_id = ? AND name = ?",
+                (record["dropped"], course_id, record["assessment"])
+            )
+            return {**record, "dropped": previous}
+
+        raise StorageError(f"Unknown edit: {op}")
+
+    def _insert_course(self, dataset_id: int, position: int, name: str, course: dict):
+        extra = {key: value for key, value in course.items() if key not in ("assessments", "scale")}
+        course_id = self.db.execute(
+            "INSERT INTO courses (dataset_id, position, name, extra) VALUES (?, ?, ?, ?)",
+            (dataset_id, position, name, json.dumps(extra) if extra else None)
+        ).lastrowid
+
+        for a_position, (a_name, a) in enumerate(course["assessments"].items()):
+            extra = {
+                key: value for key, value in a.items()
+                if key not in ("weight", "amount", "dropped", "grades")
+            }
+            assessment_id = self.db.execute(
+                "INSERT INTO assessments (course_id, position, name, weight, amount, dropped, extra) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (course_id, a_position, a_name, a["weight"], a["amount"], a["dropped"],
+                 json.dumps(extra) if extra else None)
+            ).lastrowid
+            self.db.executemany(
+                "INSERT INTO grades (assessment_id, position, grade) VALUES (?, ?, ?)",
+                [(assessment_id, i, grade) for i, grade in enumerate(a["grades"])]
+            )
+
+        self.db.executemany(
+            "INSERT INTO scales (course_id, position, letter, minimum) VALUES (?, ?, ?, ?)",
+            [(course_id, i, letter, minimum) for i, (letter, minimum) in enumerate(course["scale"].items())]
+        )
+
+    def _dataset_id(self, name: str) -> int | None:
+        row = self.db.execute("SELECT id FROM datasets WHERE name = ?", (name,)).fetchone()
+        return None if row is None else row[0]
+
+    def _course_id(self, name: str, course: str) -> int:
+        row = self.db.execute(
+            "SELECT c.id FROM courses c JOIN datasets d ON c.dataset_id = d.id "
+            "WHERE d.name = ? AND c.name = ?",
+            (name, course)
+        ).fetchone()
+        if row is None:
+            raise StorageError(f"Unknown course in {name}: {course}")
+        return row[0]
+
+    def _assessment_id(self, course_id: int, assessment: str) -> int:
+        row = self.db.execute(
+            "SELECT id FROM assessments WHERE course_id = ? AND name = ?",
+            (course_id, assessment)
+        ).fetchone()
+        if row is None:
+            raise StorageError(f"Unknown assessment: {assessment}")
+        return row[0]
+
+class SqliteJournal:
+    '''
+    Journal of edits to data in a SqliteStorage (see utils.journal.Journal).
+
+    Each edit is applied to the stored data in its own transaction, and
+    logged with the value it replaced until it is saved. Unless sync is
+    false, in which case edits are only committed when saved.
+    '''
+    def __init__(self, storage: SqliteStorage, name: str, sync = True):
+        self.storage = storage
+        self.db = storage.db
+        self.name = name
+        self.sync = sync
+        # edits are stored as they are made, so there is nothing to compact
+        self.generation = 0
+
+    def grade(self, course: str, assessment: str, index: int, grade: float | None):
+        self.append({
+            "op": "grade", "course": course, "assessment": assessment,
+            "index": index, "grade": grade
+        })
+
+    def scale(self, course: str, letter: str, minimum: float):
+        self.append({
+            "op": "scale", "course": course, "letter": letter, "minimum": minimum
+        })
+
+    def dropped(self, course: str, assessment: str, dropped: int):
+        self.append({
+            "op": "dropped", "course": course, "assessment": assessment, "dropped": dropped
+        })
+
+    def append(self, record: dict):
+        '''Applies an edit and logs it as unsaved.'''
+        previous = self.storage.apply(self.name, record)
+        self.db.execute(
+            "INSERT INTO edits (dataset_id, record, previous) VALUES (?, ?, ?)",
+            (self.storage._dataset_id(self.name), json.dumps(record), json.dumps(previous))
+        )
+        if self.sync:
+            self.db.commit()
+
+    def commit(self):
+        '''Marks every edit so far as saved.'''
+        self.commit_unsynced()()
+
+    def commit_unsynced(self) -> Callable[[], None]:
+        '''Marks every edit so far as saved, and returns the function that commits the transaction.'''
+        self.db.execute(
+            "DELETE FROM edits WHERE dataset_id = ?", (self.storage._dataset_id(self.name),)
+        )
+        return self.db.commit
+
+    def discard(self) -> list[dict]:
+        '''Undoes the edits since the last save, and returns them.'''
+        dataset_id = self.storage._dataset_id(self.name)
+        rows = self.db.execute(
+            "SELECT record, previous FROM edits WHERE dataset_id = ? ORDER BY id DESC",
+            (dataset_id,)
+        ).fetchall()
+
+        with self.db:
+            for _record, previous in rows:
+                self.storage.apply(self.name, json.loads(previous))
+            self.db.execute("DELETE FROM edits WHERE dataset_id = ?", (dataset_id,))
+
+        return [json.loads(record) for record, _previous in reversed(rows)]
+
+    def clear(self):
+        self.commit()
+
+    def needs_compaction(self, closing = False) -> bool:
+        return False
+
+    def close(self):
+        self.db.commit()
+
+STORAGES = {
+    "json": JsonStorage,
+    "sqlite": SqliteStorage,
+    "sharded": ShardedStorage,
+}
+
+def from_env() -> Storage:
+    '''Returns the storage named by PYGRADES_STORAGE, JSON by default.'''
+    kind = os.environ.get(ENV_VAR, "json").lower()
+    if kind not in STORAGES:
+        raise StorageError(
+            f"Unknown {ENV_VAR}: {kind} (expected {' or '.join(STORAGES)})"
+        )
+    return STORAGES[kind]()
+
+def main(args: list[str]):
+    '''Imports JSON data files into the SQLite storage, or exports them.'''
+    usage = (
+        "Usage: python -m utils.storage import <file.json> [name]\n"
+        "       python -m utils.storage export <name> <file.json>"
+    )
+    files.setup_dirs()
+    storage = SqliteStorage()
+
+    if len(args) in (2, 3) and args[0] == "import":
+        name = args[2] if len(args) == 3 else files.filename_from_path(args[1])[0]
+        with open(args[1], 'rb') as f:
+            data = json.loads(f.read())
+        if storage.import_data(name, data):
+            print(f"Imported {args[1]} as {name}.")
+
+    elif len(args) == 3 and args[0] == "export":
+        data = storage.export_data(args[1])
+        if data is None:
+            print(f"No data named {args[1]} in {storage.path}.")
+            return
+        files.atomic_write(args[2], json.dumps(data, indent=4))
+        print(f"Exported {args[1]} to {args[2]}.")
+
+    else:
+        print(usage)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,227 @@
+'''
+Syncing data with another data directory, such as a copy of data/
+kept on removable media.
+
+Data is compared course by course, by the hash of each course. The
+course hashes of the last sync with a directory are kept in
+data/.sync.json as the base that tells which side changed a course:
+- a course changed on one side only is copied to the other side
+- a course removed on one side and unchanged on the other is removed
+  from the other side as well
+- a course changed differently on both sides is a conflict, and is
+  left as it is on both sides unless a side is preferred
+
+Data that only exists on one side is copied to the other, and only the
+data files in which a course changed are written.
+
+The other directory holds data files as in data/ and is written
+directly: its saved journaled edits are written into its data files,
+and it keeps no backups.
+'''
+import os
+import json
+
+from utils import file_management as files
+from utils import journal
+from utils.snapshot import digest
+from utils.validation import parse_data
+
+SYNC_PATH = os.path.join("data", ".sync.json")
+
+# sides to prefer in conflicts
+HERE = "here"
+THERE = "there"
+
+# changes to courses, as reported by sync
+SENT = "sent"
+RECEIVED = "received"
+REMOVED_HERE = "removed here"
+REMOVED_THERE = "removed there"
+CONFLICT = "conflict"
+
+class SyncError(Exception): pass
+
+def course_hashes(data: dict) -> dict[str, str]:
+    '''
+    Returns the hash of every course in data, as stored in JSON.
+    Whole numbers hash the same whether they were read as floats or not,
+    as loaded grades are written back as floats (see utils.models).
+    '''
+    return {
+        course: digest(json.dumps(
+            _canonical(course_data), sort_keys=True, separators=(",", ":")
+        ).encode())
+        for course, course_data in data.items()
+    }
+
+def merge(
+    local: dict,
+    remote: dict,
+    base: dict[str, str],
+    prefer: str | None = None
+) -> tuple[dict, dict, dict[str, str], list[tuple[str, str]]]:
+    '''
+    Merges the local and remote versions of data, course by course, given
+    the course hashes of their last sync (see the module docstring).
+    Conflicts are resolved in favour of the preferred side, if given.
+
+    Returns the merged local and remote data, the hashes of the courses
+    they now agree on, and the changes, as (course, change).
+    '''
+    local_hashes = course_hashes(local)
+    remote_hashes = course_hashes(remote)
+    here, there = dict(local), dict(remote)
+    synced = {}
+    changes = []
+
+    for course in dict.fromkeys([*local, *remote]):
+        local_hash = local_hashes.get(course)
+        remote_hash = remote_hashes.get(course)
+        base_hash = base.get(course)
+
+        if local_hash == remote_hash:
+            pass
+        elif remote_hash == base_hash or (local_hash != base_hash and prefer == HERE):
+            if local_hash is None:
+                del there[course]
+                changes.append((course, REMOVED_THERE))
+            else:
+                there[course] = local[course]
+                changes.append((course, SENT))
+            remote_hash = local_hash
+        elif local_hash == base_hash or prefer == THERE:
+            if remote_hash is None:
+                del here[course]
+                changes.append((course, REMOVED_HERE))
+            else:
+                here[course] = remote[course]
+                changes.append((course, RECEIVED))
+            local_hash = remote_hash
+        else:
+            changes.append((course, CONFLICT))
+            # still a conflict on the next sync
+            if base_hash is not None:
+                synced[course] = base_hash
+            continue
+
+        if local_hash is not None:
+            synced[course] = local_hash
+
+    return here, there, synced, changes
+
+def sync(
+    storage,
+    path,
+    loaded: dict[str, dict] | None = None,
+    prefer: str | None = None
+) -> tuple[list[tuple[str, str, str]], dict[str, dict]]:
+    '''
+    Syncs the data in the given storage (see utils.storage) with the data
+    files in another directory. loaded holds the current data of loaded
+    data sets, which is synced instead of their stored data; their journals
+    are left for the caller to clear.
+
+    Returns the changes, as (data name, course, change), and the merged
+    data of the loaded data sets that received changes.
+    Raises SyncError if the directory cannot be synced with.
+    '''
+    if not os.path.isdir(path):
+        raise SyncError(f"No directory found at {path}.")
+    if os.path.realpath(path) == os.path.realpath("data"):
+        raise SyncError("Cannot sync data/ with itself.")
+
+    loaded = loaded or {}
+    bases = read_bases()
+    key = os.path.realpath(path)
+    base = bases.get(key, {})
+
+    local_names = storage.list()
+    remote_names = files.list_data(path)
+
+    changes = []
+    received = {}
+    for name in dict.fromkeys([*local_names, *remote_names]):
+        if name in loaded:
+            local = loaded[name]
+        elif name in local_names:
+            local = storage.load(name)
+            if local is None:
+                continue
+            local = storage.recover(name, local)
+        else:
+            local = {}
+
+        try:
+            remote = read_remote(path, name) if name in remote_names else {}
+        except SyncError as e:
+            print(f"\nERROR: {e}\n")
+            continue
+
+        # data on one side only is copied, never removed
+        name_base = base.get(name, {}) if local and remote else {}
+        here, there, synced, name_changes = merge(local, remote, name_base, prefer)
+
+        if any(change in (RECEIVED, REMOVED_HERE) for _course, change in name_changes):
+            if not storage.write(name, here):
+                continue
+            if name in loaded:
+                received[name] = here
+            elif name in local_names:
+                storage.discard_edits(name)
+
+        if any(change in (SENT, REMOVED_THERE) for _course, change in name_changes):
+            write_remote(path, name, there)
+
+        base[name] = synced
+        changes += [(name, course, change) for course, change in name_changes]
+
+    bases[key] = base
+    files.atomic_write(SYNC_PATH, json.dumps(bases, indent=4))
+    return changes, received
+
+def read_bases() -> dict[str, dict[str, dict[str, str]]]:
+    '''
+    Returns the course hashes of the last sync with each directory,
+    by the directory's real path, then by data name.
+    '''
+    try:
+        with open(SYNC_PATH, 'rb') as f:
+            bases = json.loads(f.read())
+        return bases if isinstance(bases, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def read_remote(path, name) -> dict:
+    '''
+    Reads and validates data from another directory, with its saved
+    journaled edits. Raises SyncError if it cannot be read.
+    '''
+    filepath = files.data_filepath(name, path)
+    try:
+        raw = files.read_data_file(filepath)
+    except files.DECOMPRESS_ERRORS as e:
+        raise SyncError(f"Could not read {filepath}: {e}")
+
+    data, error = parse_data(raw)
+    if error is not None:
+        raise SyncError(f"Invalid data in {filepath}:\n\n{error}")
+
+    committed, _uncommitted, _committed_size, _size = journal.read(name, path)
+    journal.replay(data, committed)
+    return data
+
+def write_remote(path, name, data: dict):
+    '''Writes data to another directory, in the format of its existing file.'''
+    filepath = files.data_filepath(name, path)
+    _raw, content = files.serialize(data, files.filename_from_path(filepath)[1])
+    files.atomic_write(filepath, content)
+    journal.remove(name, path)
+
+def _canonical(value):
+    if isinstance(value, dict):
+        return {key: _canonical(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_canonical(item) for item in value]
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
@@ -1,10 +1,16 @@
 import json
 import jsonschema
+from typing import Any, Callable, Iterable
 
 import utils.input_output as io
+from utils.drops import POLICIES
 
 class DataError(Exception): pass
 
+# bump when DATA_SCHEMA changes, so that data checked
+# against an older schema is validated again
+SCHEMA_VERSION = 2
+
 DATA_SCHEMA = {
     "type": "object",
     "minProperties": 1,
@@ -26,6 +32,15 @@ DATA_SCHEMA = {
                             "items": {
                                 "type": ["number", "null"]
                             }
+                        },
+                        "drops": {
+                            "type": "object",
+                            "properties": {
+                                "policy": {"enum": list(POLICIES)},
+                                "category": {"type": "string"},
+                                "final": {"type": "string"}
+                            },
+                            "required": ["policy"]
                         }
                     },
                     "required": ["weight", "amount", "dropped", "grades"]
@@ -58,20 +73,134 @@ DATA_TEMPLATE = {
     }
 }
 
-def validate_schema(data: dict) -> jsonschema.ValidationError | None:
-    try:
-        jsonschema.validate(data, DATA_SCHEMA)
+# Python types of the JSON types that compile_schema supports
+PYTHON_TYPES = {
+    "object": (dict,),
+    "array": (list,),
+    "number": (int, float),
+    "string": (str,),
+    "boolean": (bool,),
+    "null": (type(None),),
+}
+
+def compile_schema(schema: dict) -> Callable[[Any], bool]:
+    '''
+    Generates a fast check of whether an instance is valid against a schema.
+
+    Only the keywords used by DATA_SCHEMA are supported. A schema using
+    any other keyword never passes the check, so callers fall back to
+    jsonschema, which stays the reference for what is valid.
+    '''
+    checks = []
+    for keyword, value in schema.items():
+        if keyword == "type":
+            allowed = _allowed_types(value)
+            if allowed is None:
+                return _never
+            checks.append(lambda i, allowed = allowed: type(i) in allowed)
+
+        elif keyword == "enum":
+            checks.append(lambda i, values = value: any(
+                type(i) is type(v) and i == v for v in values
+            ))
+
+        elif keyword == "minProperties":
+            checks.append(lambda i, n = value: type(i) is not dict or len(i) >= n)
+
+        elif keyword == "required":
+            checks.append(lambda i, keys = value: type(i) is not dict or all(key in i for key in keys))
+
+        elif keyword == "properties":
+            properties = {key: compile_schema(sub) for key, sub in value.items()}
+            checks.append(lambda i, properties = properties: type(i) is not dict or all(
+                check(i[key]) for key, check in properties.items() if key in i
+            ))
+
+        elif keyword == "additionalProperties":
+            if value is True:
+                continue
+            if type(value) is not dict:
+                return _never
+            known = schema.get("properties", {})
+            check = compile_schema(value)
+            checks.append(lambda i, known = known, check = check: type(i) is not dict or all(
+                check(sub) for key, sub in i.items() if key not in known
+            ))
+
+        elif keyword == "items":
+            if type(value) is not dict:
+                return _never
+            allowed = _allowed_types(value.get("type")) if value.keys() == {"type"} else None
+            if allowed is not None:
+                # arrays of plain values, like grades, skip a call per item
+                checks.append(lambda i, allowed = allowed: type(i) is not list or all(
+                    type(item) in allowed for item in i
+                ))
+            else:
+                check = compile_schema(value)
+                checks.append(lambda i, check = check: type(i) is not list or all(
+                    check(item) for item in i
+                ))
+
+        else:
+            return _never
+
+    def check(instance) -> bool:
+        for c in checks:
+            if not c(instance):
+                return False
+        return True
+
+    return check
+
+def _allowed_types(types) -> frozenset | None:
+    '''Returns the Python types of JSON types, or None if any is unsupported.'''
+    if type(types) is str:
+        types = [types]
+    if type(types) is not list or any(t not in PYTHON_TYPES for t in types):
         return None
-    except jsonschema.ValidationError as e:
-        return e
-    
-def validate_json(filepath) -> json.decoder.JSONDecodeError | None:
-    with open(filepath, 'r') as f:
-        try:
-            d = json.load(f)
+    return frozenset(p for t in types for p in PYTHON_TYPES[t])
+
+def _never(instance) -> bool:
+    return False
+
+# built once, rather than on every call to jsonschema.validate.
+# The schema only uses draft 7 keywords, which validate faster
+# than the latest draft that jsonschema.validate defaults to.
+DATA_VALIDATOR = jsonschema.Draft7Validator(DATA_SCHEMA)
+
+# checked first, so jsonschema only runs to explain an error
+DATA_CHECK = compile_schema(DATA_SCHEMA)
+
+def validate_schema(data: dict, courses: Iterable[str] | None = None) -> jsonschema.ValidationError | None:
+    '''
+    Returns the most relevant schema error, as jsonschema.validate would raise.
+    If courses are given, only they are validated (the others are known to be valid).
+    '''
+    if courses is not None and type(data) is dict and len(data) > 0:
+        data = {name: data[name] for name in courses if name in data}
+        if not data:
             return None
-        except json.decoder.JSONDecodeError as e:
-            return e
+
+    if DATA_CHECK(data):
+        return None
+    return jsonschema.exceptions.best_match(DATA_VALIDATOR.iter_errors(data))
+
+def parse_data(raw: bytes, trusted = False) -> tuple[
+    dict | None, json.decoder.JSONDecodeError | jsonschema.ValidationError | None
+]:
+    '''
+    Parses and validates the contents of a data file in one pass.
+    Trusted contents, known to be valid, are only parsed.
+    Returns the data and the error found, if any.
+    '''
+    try:
+        data = json.loads(raw)
+    except json.decoder.JSONDecodeError as e:
+        return None, e
+    if trusted:
+        return data, None
+    return data, validate_schema(data)
         
 def validate_outline(courses: dict) -> (
     jsonschema.ValidationError | AssertionError | None
@@ -121,6 +250,11 @@ def validate_outline(courses: dict) -> (
                     assert a["amount"] > a["dropped"], (
                         f"Too many dropped assessments in {c_name} {a_name}."
                     )
+
+                    final = a.get("drops", {}).get("final")
+                    assert final is None or (final in course["assessments"] and final != a_name), (
+                        f"Unknown final {final} to replace the lowest grade of {c_name} {a_name}."
+                    )
                     
                 assert total_weight == 100, (
                     f"Total weight does not add up to 100% in {c_name}."
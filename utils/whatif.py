@@ -0,0 +1,133 @@
+'''
+What-if scenarios.
+
+A scenario overlays hypothetical grades on a course without changing it.
+Only the assessments a scenario changes are recomputed: the cached stats
+of the others are shared, and the changed assessments of every scenario
+are computed together in one engine pass. Courses with drop policies,
+which span assessments, are recomputed whole for each scenario.
+'''
+from array import array
+
+from utils import drops
+from utils import engine
+from utils import solver
+from utils.cache import StatsCache
+from utils.models import Assessment, Course
+
+class ScenarioError(Exception): pass
+
+def overlay(assessment: Assessment, changes: dict[int, float | None]) -> Assessment:
+    '''
+    Returns a copy of an assessment with some of its grades changed
+    (None unsets a grade). The assessment itself is not modified.
+    '''
+    changed = Assessment(
+        weight = assessment.weight,
+        amount = assessment.amount,
+        dropped = assessment.dropped,
+        grades = array('d', assessment.grades),
+        extra = assessment.extra
+    )
+    for i, grade in changes.items():
+        changed.set(i, grade)
+    return changed
+
+def evaluate(
+    cache: StatsCache,
+    course: str,
+    scenarios: list[dict[str, dict[int, float | None]]],
+    targets: dict[str, float] | None = None
+) -> list[dict]:
+    '''
+    Evaluates hypothetical grades in a course, given as scenarios that map
+    assessment names to the grades to change ({index: grade}).
+    Targets default to the course's scale.
+
+    Returns a dict for each scenario, containing:
+    - "weighted_average", "achieved": the resulting totals
+    - "letters": their letter grades (see StatsCache.letters)
+    - "needed": the exact average needed for each target (see solver.solve)
+    '''
+    data = cache.courses[course]
+    scale = data.scale
+
+    if targets is None:
+        # handle sentinel value representing no scale
+        targets = {} if "None" in scale else dict(scale.items())
+
+    # each distinct change to an assessment is computed once
+    changed = {}
+    for scenario in scenarios:
+        for name, changes in scenario.items():
+            key = _key(name, changes)
+            if key not in changed:
+                _check(data, name, changes)
+                changed[key] = overlay(data.assessments[name], changes)
+
+    if drops.has_policies(data.assessments):
+        return [
+            _evaluate_whole(data, {
+                name: changed[_key(name, changes)] for name, changes in scenario.items()
+            }, targets)
+            for scenario in scenarios
+        ]
+
+    keys = list(changed)
+    overlays = {str(i): changed[key] for i, key in enumerate(keys)}
+    summary = engine.summarize({course: Course(overlays, scale)})[course]
+    entries = {key: summary["assessments"][str(i)] for i, key in enumerate(keys)}
+    rows = {key: solver.prepare_row(a) for key, a in changed.items()}
+
+    base_entries = cache.entries(course)
+    base_rows = cache.solver(course)["rows"]
+
+    results = []
+    for scenario in scenarios:
+        keys = {name: _key(name, changes) for name, changes in scenario.items()}
+
+        totals = engine.combine({
+            name: entries[keys[name]] if name in keys else entry
+            for name, entry in base_entries.items()
+        })
+        prepared = solver.assemble({
+            name: rows[keys[name]] if name in keys else row
+            for name, row in base_rows.items()
+        })
+
+        results.append(_result(scale, totals, prepared, targets))
+
+    return results
+
+def _evaluate_whole(course: Course, changed: dict[str, Assessment], targets: dict[str, float]) -> dict:
+    '''Evaluates a scenario on a copy of the whole course.'''
+    assessments = {name: changed.get(name, a) for name, a in course.assessments.items()}
+    totals = engine.summarize({"": Course(assessments, course.scale)})[""]
+    return _result(course.scale, totals, solver.prepare(assessments), targets)
+
+def _result(scale, totals: dict, prepared: dict, targets: dict[str, float]) -> dict:
+    return {
+        "weighted_average": totals["weighted_average"],
+        "achieved": totals["achieved"],
+        "letters": {
+            "weighted_average": scale.letter(totals["weighted_average"]),
+            "achieved": scale.letter(totals["achieved"]),
+        },
+        "needed": {
+            target: solver.solve(prepared, grade)
+            for target, grade in targets.items()
+        },
+    }
+
+def _key(name: str, changes: dict[int, float | None]) -> tuple:
+    return name, tuple(sorted(changes.items()))
+
+def _check(course: Course, name: str, changes: dict[int, float | None]):
+    '''Raises ScenarioError if a scenario changes grades that do not exist.'''
+    if name not in course.assessments:
+        raise ScenarioError(f"Unknown assessment: {name}")
+
+    num_grades = len(course.assessments[name].grades)
+    for i in changes:
+        if i not in range(num_grades):
+            raise ScenarioError(f"Invalid assessment number for {name}: {i + 1}")